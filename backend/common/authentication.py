@@ -2,72 +2,176 @@
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 from django.contrib.auth.models import AnonymousUser
+from django.conf import settings
+from collections import OrderedDict
 from users.models import User
+from utils.auth import JWTTokenManager
+import copy
+import hashlib
 import logging
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+
+class JWTPrincipalError(Exception):
+    """Token could not be resolved to an active user"""
+
+    def __init__(self, message, error_code):
+        super().__init__(message)
+        self.message = message
+        self.error_code = error_code
+
+
+class PrincipalCache:
+    """
+    Per-process LRU+TTL cache of users resolved from JWT access tokens.
+    Entries are dropped on User post_save in this process; other processes
+    rely on the TTL, so keep it short.
+    """
+
+    def __init__(self, max_size=1024, ttl_seconds=60):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._tokens_by_user = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def token_id(token):
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+    def get(self, token):
+        """Return a copy of the cached user for a token, or None"""
+        key = self.token_id(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if expires_at <= time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+        # Hand out a copy so per-request changes never leak into the cache
+        return copy.copy(user)
+
+    def set(self, token, user, token_exp=None):
+        expires_at = time.time() + self.ttl_seconds
+        if token_exp:
+            expires_at = min(expires_at, token_exp)
+
+        key = self.token_id(token)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (copy.copy(user), expires_at)
+            self._tokens_by_user.setdefault(user.pk, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for key in self._tokens_by_user.pop(user_id, set()):
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            user_keys = self._tokens_by_user.get(entry[0].pk)
+            if user_keys is not None:
+                user_keys.discard(key)
+                if not user_keys:
+                    del self._tokens_by_user[entry[0].pk]
+
+
+PRINCIPAL_CACHE_SETTINGS = getattr(settings, 'JWT_PRINCIPAL_CACHE', {})
+
+principal_cache = PrincipalCache(
+    max_size=PRINCIPAL_CACHE_SETTINGS.get('MAX_SIZE', 1024),
+    ttl_seconds=PRINCIPAL_CACHE_SETTINGS.get('TTL_SECONDS', 60),
+)
+
+
+def resolve_jwt_user(token):
+    """
+    Return the active user for a JWT access token, decoding the token and
+    loading the user only on a principal cache miss.
+    Raises JWTPrincipalError when the token or account is not usable.
+    """
+    user = principal_cache.get(token)
+
+    if user is None:
+        payload, error = JWTTokenManager.verify_access_token(token)
+        if error:
+            raise JWTPrincipalError(error, 'INVALID_TOKEN')
+
+        try:
+            user = User.objects.get(id=payload['user_id'])
+        except User.DoesNotExist:
+            raise JWTPrincipalError('User account not found. Please login again.', 'USER_NOT_FOUND')
+
+        principal_cache.set(token, user, payload.get('exp'))
+
+    # Active/locked state is re-checked on every hit since locks expire over time
+    if not user.is_active:
+        raise JWTPrincipalError('Your account has been deactivated. Contact support.', 'ACCOUNT_INACTIVE')
+
+    if hasattr(user, 'is_account_locked') and user.is_account_locked():
+        raise JWTPrincipalError('Your account is locked due to security reasons.', 'ACCOUNT_LOCKED')
+
+    return user
+
+
 class JWTAuthentication(BaseAuthentication):
     """
     JWT Authentication for Django REST Framework
     This replaces your middleware approach
     """
-    
+
     def authenticate(self, request):
         """
         Authenticate the request and return a (user, token) tuple or None
         """
-        logger.info(f"JWT Authentication attempt for path: {request.path}")
-        
         # Skip JWT authentication for admin URLs and static files
         if request.path.startswith('/admin/') or request.path.startswith('/static/'):
-            logger.info("Skipping JWT auth for admin/static path")
             return None
-        
+
         # Get token from Authorization header
         auth_header = request.META.get('HTTP_AUTHORIZATION')
-        logger.info(f"Authorization header: {auth_header[:50] if auth_header else 'None'}")
-        
+
         if not auth_header or not auth_header.startswith('Bearer '):
             # No token provided - return None (anonymous)
-            logger.info("No valid Authorization header found")
             return None
-        
+
         # Extract token
         token = auth_header.split(' ')[1]
-        
+
+        # Reuse the principal JWTAuthenticationMiddleware resolved for this request
+        principal = getattr(request._request, 'jwt_principal', None)
+        if principal is not None and principal[1] == token:
+            return principal
+
         try:
-            # Verify token using JWT decode directly
-            import jwt
-            from django.conf import settings
-            
-            payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=['HS256'])
-            
-            # Token is valid - get user from database
-            try:
-                user = User.objects.get(id=payload['user_id'])
-            except User.DoesNotExist:
-                raise AuthenticationFailed('User account not found. Please login again.')
-            
-            # Check if user is active
-            if not user.is_active:
-                raise AuthenticationFailed('Your account has been deactivated. Contact support.')
-            
-            # Check if account is locked (if method exists)
-            if hasattr(user, 'is_account_locked') and user.is_account_locked():
-                raise AuthenticationFailed('Your account is locked due to security reasons.')
-            
-            logger.info(f"User authenticated via JWT: {user.email} with role: {user.role}")
-            
-            # Return (user, token) tuple
-            return (user, token)
-            
+            user = resolve_jwt_user(token)
+        except JWTPrincipalError as e:
+            raise AuthenticationFailed(e.message)
         except Exception as e:
             logger.error(f"JWT authentication error: {str(e)}")
             raise AuthenticationFailed('Authentication failed. Please try again.')
-    
+
+        logger.debug(f"User authenticated via JWT: {user.email} with role: {user.role}")
+
+        request._request.jwt_principal = (user, token)
+        return (user, token)
+
     def authenticate_header(self, request):
         """
         Return the header for 401 responses
         """
-        return 'Bearer'
\ No newline at end of file
+        return 'Bearer'
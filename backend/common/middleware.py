@@ -3,7 +3,10 @@ from django.contrib.auth.models import AnonymousUser
 from django.http import JsonResponse
 from django.utils.deprecation import MiddlewareMixin
 from users.models import User
-from utils.auth import JWTTokenManager, SecurityUtils, SecurityMonitor
+from utils.auth import SecurityUtils, SecurityMonitor
+from common.authentication import JWTPrincipalError, resolve_jwt_user
+from common.ratelimit import get_rate_limit_settings, get_rate_limiter
+from users.activity import record_activity
 from django.utils import timezone
 import logging
 from django.core.cache import cache
@@ -35,44 +38,13 @@ class JWTAuthenticationMiddleware(MiddlewareMixin):
         token = auth_header.split(' ')[1]
         
         try:
-            # Verify token using JWTTokenManager
-            payload, error_info = JWTTokenManager.verify_access_token(token)
+            # Decodes and loads the user only on a principal cache miss
+            user = resolve_jwt_user(token)
             
-            if error_info:
-                # Token verification failed - return specific error
-                return JsonResponse({
-                    'detail': error_info['message'],
-                    'error_code': error_info['error_code']
-                }, status=401)
-            
-            # Token is valid - get user from database
-            user = User.objects.get(id=payload['user_id'])
-            
-            # Check if user is active
-            if not user.is_active:
-                return JsonResponse({
-                    'detail': 'Your account has been deactivated. Contact support.',
-                    'error_code': 'ACCOUNT_INACTIVE'
-                }, status=401)
-            
-            # Check if account is locked (if method exists)
-            if hasattr(user, 'is_account_locked') and user.is_account_locked():
-                return JsonResponse({
-                    'detail': 'Your account is locked due to security reasons.',
-                    'error_code': 'ACCOUNT_LOCKED'
-                }, status=401)
-            
-            # Set authenticated user
-            request.user = user
-            request.user.backend = 'django.contrib.auth.backends.ModelBackend'
-            
-            logger.info(f"User authenticated: {user.email} with role: {user.role}")
-            return None
-            
-        except User.DoesNotExist:
+        except JWTPrincipalError as e:
             return JsonResponse({
-                'detail': 'User account not found. Please login again.',
-                'error_code': 'USER_NOT_FOUND'
+                'detail': e.message,
+                'error_code': e.error_code
             }, status=401)
             
         except Exception as e:
@@ -81,6 +53,14 @@ class JWTAuthenticationMiddleware(MiddlewareMixin):
                 'detail': 'Authentication failed. Please try again.',
                 'error_code': 'AUTH_ERROR'
             }, status=401)
+        
+        # Set authenticated user and share it with the DRF authentication class
+        request.user = user
+        request.user.backend = 'django.contrib.auth.backends.ModelBackend'
+        request.jwt_principal = (user, token)
+        
+        logger.debug(f"User authenticated: {user.email} with role: {user.role}")
+        return None
 
 
 class SecurityHeadersMiddleware(MiddlewareMixin):
@@ -135,92 +115,60 @@ class RequestLoggingMiddleware(MiddlewareMixin):
 
 class RateLimitMiddleware(MiddlewareMixin):
     """
-    Enhanced Redis-based rate limiting middleware
+    Sliding-window rate limiting middleware
+    Rules come from settings.RATE_LIMITING and are loaded once per process
     """
     
+    def __init__(self, get_response=None):
+        super().__init__(get_response)
+        config = get_rate_limit_settings()
+        self.rate_limits = config['RULES']
+        self.email_limited_paths = set(config['EMAIL_LIMITED_PATHS'])
+    
     def process_request(self, request):
         # Check if rate limiting is disabled for development
         from django.conf import settings
         if getattr(settings, 'DISABLE_RATE_LIMITING', False):
             return None
-            
-        # Define rate limits for different endpoints
-        rate_limits = {
-            '/api/auth/login': {'limit': 3, 'window': 900, 'message': 'Too many login attempts'},
-            '/api/auth/register': {'limit': 3, 'window': 3600, 'message': 'Too many registration attempts'},
-            '/api/auth/forgot-password': {'limit': 3, 'window': 3600, 'message': 'Too many password reset requests'},
-            '/api/auth/reset-password/confirm': {'limit': 3, 'window': 3600, 'message': 'Too many password reset attempts'},
-            '/api/auth/verify-email': {'limit': 3, 'window': 3600, 'message': 'Too many email verification attempts'},
-            '/api/auth/refresh': {'limit': 10, 'window': 300, 'message': 'Too many token refresh attempts'},
-            '/api/auth/resend-verification': {'limit': 3, 'window': 3600, 'message': 'Too many verification email requests'},
-            '/api/auth/2fa/emergency-disable': {'limit': 3, 'window': 3600, 'message': 'Too many emergency 2FA disable requests'},
-            '/api/auth/change-password': {'limit': 3, 'window': 3600, 'message': 'Too many password change attempts'},
-            '/api/auth/account-status': {'limit': 30, 'window': 300, 'message': 'Too many account status checks'},
-            '/api/auth/2fa/admin/approve-emergency': {'limit': 10, 'window': 300, 'message': 'Too many admin 2FA approvals'},
-            # Superadmin endpoints
-            '/api/superadmin/login': {'limit': 5, 'window': 900, 'message': 'Too many superadmin login attempts'},
-            '/api/superadmin/dashboard': {'limit': 30, 'window': 300, 'message': 'Too many dashboard requests'},
-            '/api/superadmin/users': {'limit': 20, 'window': 300, 'message': 'Too many user management requests'},
-        }
         
-        if request.path in rate_limits:
-            # Get email from request first
+        config = self.rate_limits.get(request.path)
+        if config is None:
+            return None
+        
+        limiter = get_rate_limiter()
+        
+        # Check IP-based limit
+        ip_address = SecurityUtils.get_client_ip(request)
+        ip_key = f"{request.path}:ip:{ip_address}"
+        result = limiter.hit(ip_key, config['limit'], config['window'])
+        
+        # Email-based rate limiting for relevant endpoints
+        email = None
+        if result and request.path in self.email_limited_paths:
             email = self._get_email_from_request(request)
-
-            # Check if account is locked before rate limiting
             if email:
-                try:
-                    user = User.objects.get(email=email)
-                    if user.is_account_locked():
-                        # Skip rate limiting - let it go to login view to show proper "account locked" message
-                        return None
-                except User.DoesNotExist:
-                    pass
-                
-            # Now do normal rate limiting
-            ip_address = SecurityUtils.get_client_ip(request)
-            config = rate_limits[request.path]
-            
-            # Create cache keys for IP and email (if in request)
-            ip_cache_key = f"rate_limit_{request.path}_{ip_address}"
-            
-            # Check IP-based limit
-            ip_count = cache.get(ip_cache_key, 0)
-            
-            if ip_count >= config['limit']:
-                # For local memory cache, we can't get TTL, so use default window
-                ttl = config['window']
-                
-                return JsonResponse({
-                    'detail': config['message'],
-                    'retry_after': ttl,
-                    'retry_after_human': self._format_time(ttl)
-                }, status=429)
-            
-            # Email-based rate limiting for relevant endpoints
-            if request.path in ['/api/auth/login', '/api/auth/forgot-password', '/api/auth/register']:
-                email = self._get_email_from_request(request)
-                if email:
-                    email_cache_key = f"rate_limit_{request.path}_email_{email}"
-                    email_count = cache.get(email_cache_key, 0)
-                    
-                    if email_count >= config['limit']:
-                        # For local memory cache, we can't get TTL, so use default window
-                        ttl = config['window']
-                        
-                        return JsonResponse({
-                            'detail': config['message'],
-                            'retry_after': ttl,
-                            'retry_after_human': self._format_time(ttl)
-                        }, status=429)
-                    
-                    # Increment email counter
-                    cache.set(email_cache_key, email_count + 1, config['window'])
-            
-            # Increment IP counter
-            cache.set(ip_cache_key, ip_count + 1, config['window'])
+                result = limiter.hit(f"{request.path}:email:{email}", config['limit'], config['window'])
+                if not result:
+                    # Rejected requests do not count against the (possibly shared) IP
+                    limiter.release(ip_key, config['window'])
         
-        return None
+        if result:
+            return None
+        
+        # Locked accounts skip rate limiting so the login view can show the proper "account locked" message.
+        # Only looked up once a request would be blocked.
+        if email is None:
+            email = self._get_email_from_request(request)
+        if email and User.objects.filter(email=email, account_locked_at__gt=timezone.now()).exists():
+            return None
+        
+        response = JsonResponse({
+            'detail': config['message'],
+            'retry_after': result.retry_after,
+            'retry_after_human': self._format_time(result.retry_after)
+        }, status=429)
+        response['Retry-After'] = str(result.retry_after)
+        return response
     
     def _get_email_from_request(self, request):
         """Extract email from request body"""
@@ -251,9 +199,8 @@ class UserActivityMiddleware(MiddlewareMixin):
     
     def process_request(self, request):
         if hasattr(request, 'user') and request.user.is_authenticated:
-            # Update user's last activity
-            request.user.last_activity = timezone.now()
-            request.user.save(update_fields=['last_activity'])
+            # Record last activity in the cache; users.tasks.flush_user_activity writes it in batches
+            record_activity(request.user)
             
             # Cache user activity for real-time features
             cache.set(f"user_activity_{request.user.id}", timezone.now(), 300)  # 5 minutes
@@ -275,11 +222,11 @@ class SuspiciousActivityMiddleware(MiddlewareMixin):
         ip_address = SecurityUtils.get_client_ip(request)
         
         # Check for rapid requests from same IP (separate from rate limiting)
-        cache_key = f"request_count_{ip_address}"
-        request_count = cache.get(cache_key, 0)
+        config = get_rate_limit_settings()['SUSPICIOUS_ACTIVITY']
+        result = get_rate_limiter().hit(f"suspicious:{ip_address}", config['limit'], config['window'])
         
-        if request_count > 100:  # More than 100 requests per minute
-            logger.warning(f"Suspicious activity detected: {request_count} requests from {ip_address}")
+        if not result:
+            logger.warning(f"Suspicious activity detected: more than {config['limit']} requests from {ip_address}")
 
             SecurityMonitor.log_security_event(
                 'SUSPICIOUS_ACTIVITY',
@@ -289,11 +236,12 @@ class SuspiciousActivityMiddleware(MiddlewareMixin):
             )
             
             # Optional: Block or throttle
-            return JsonResponse({
+            response = JsonResponse({
                 'detail': 'Too many requests detected. Please slow down.',
+                'retry_after': result.retry_after,
             }, status=429)
-        
-        cache.set(cache_key, request_count + 1, 60)  # 1 minute window
+            response['Retry-After'] = str(result.retry_after)
+            return response
         
         return None
 
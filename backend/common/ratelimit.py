@@ -0,0 +1,159 @@
+# common/ratelimit.py
+"""
+Sliding-window rate limiter engines used by RateLimitMiddleware and
+SuspiciousActivityMiddleware. The engine is picked with
+RATE_LIMITING['BACKEND'] and built once per process.
+"""
+import math
+import time
+import uuid
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+
+
+class RateLimitResult:
+    """Outcome of a single rate limited hit"""
+
+    def __init__(self, allowed, retry_after=0):
+        self.allowed = allowed
+        self.retry_after = retry_after
+
+    def __bool__(self):
+        return self.allowed
+
+
+class BaseRateLimiter:
+    key_prefix = 'rate_limit'
+
+    def hit(self, key, limit, window):
+        """
+        Count one request against key and return a RateLimitResult.
+        Rejected requests are not counted.
+        """
+        raise NotImplementedError
+
+    def release(self, key, window):
+        """Take back an allowed hit on key, e.g. when another limit rejected the request"""
+        raise NotImplementedError
+
+    def make_key(self, key):
+        return f"{self.key_prefix}:{key}"
+
+
+class CacheRateLimiter(BaseRateLimiter):
+    """
+    Sliding window counter on top of the Django cache: the previous fixed
+    window is weighted by how much of it still overlaps the sliding window.
+    Only uses cache.add/incr/decr, which are atomic on Redis and locmem.
+    """
+
+    def __init__(self, cache_alias='default'):
+        self.cache = caches[cache_alias]
+
+    def hit(self, key, limit, window):
+        now = time.time()
+        bucket = int(now // window)
+        elapsed = now - bucket * window
+        current_key = self.make_key(f"{key}:{bucket}")
+
+        # add() never resets the TTL of a live bucket
+        self.cache.add(current_key, 0, window * 2)
+        current = self.cache.incr(current_key)
+        previous = self.cache.get(self.make_key(f"{key}:{bucket - 1}"), 0)
+
+        previous_weight = (window - elapsed) / window
+        if current + previous * previous_weight <= limit:
+            return RateLimitResult(True)
+
+        self.cache.decr(current_key)
+        current -= 1
+        return RateLimitResult(False, self._retry_after(current, previous, limit, window, elapsed))
+
+    def release(self, key, window):
+        try:
+            self.cache.decr(self.make_key(f"{key}:{int(time.time() // window)}"))
+        except ValueError:
+            # The window of the hit has already rolled over
+            pass
+
+    @staticmethod
+    def _retry_after(current, previous, limit, window, elapsed):
+        """Seconds until one more request fits in the sliding window"""
+        if current + 1 <= limit and previous:
+            # Wait for enough of the previous window to slide out
+            wait = (window - elapsed) - (limit - current - 1) * window / previous
+        else:
+            # The current window alone is full; it becomes the previous one
+            wait = (window - elapsed) + max(0, window * (1 - (limit - 1) / current))
+        return max(1, math.ceil(wait))
+
+
+class RedisRateLimiter(BaseRateLimiter):
+    """
+    Exact sliding window log kept in a Redis sorted set and updated by a
+    single Lua script, so concurrent workers share one atomic counter.
+    """
+
+    SCRIPT = """
+    local key = KEYS[1]
+    local now = tonumber(ARGV[1])
+    local window = tonumber(ARGV[2])
+    local limit = tonumber(ARGV[3])
+
+    redis.call('ZREMRANGEBYSCORE', key, 0, now - window)
+    local count = redis.call('ZCARD', key)
+    if count < limit then
+        redis.call('ZADD', key, now, ARGV[4])
+        redis.call('PEXPIRE', key, window)
+        return {1, 0}
+    end
+
+    local blocking = redis.call('ZRANGE', key, count - limit, count - limit, 'WITHSCORES')
+    return {0, tonumber(blocking[2]) + window - now}
+    """
+
+    def __init__(self, cache_alias='default'):
+        from django_redis import get_redis_connection
+
+        self.client = get_redis_connection(cache_alias)
+        self.script = self.client.register_script(self.SCRIPT)
+
+    def hit(self, key, limit, window):
+        now_ms = int(time.time() * 1000)
+        allowed, retry_after_ms = self.script(
+            keys=[self.make_key(key)],
+            args=[now_ms, window * 1000, limit, f"{now_ms}:{uuid.uuid4().hex}"]
+        )
+        if allowed:
+            return RateLimitResult(True)
+        return RateLimitResult(False, max(1, math.ceil(int(retry_after_ms) / 1000)))
+
+    def release(self, key, window):
+        # Entries are interchangeable, drop the newest
+        self.client.zpopmax(self.make_key(key))
+
+
+DEFAULT_RATE_LIMITING = {
+    'BACKEND': 'common.ratelimit.CacheRateLimiter',
+    'CACHE_ALIAS': 'default',
+    'RULES': {},
+    'EMAIL_LIMITED_PATHS': [],
+    'SUSPICIOUS_ACTIVITY': {'limit': 100, 'window': 60},
+}
+
+
+def get_rate_limit_settings():
+    return {**DEFAULT_RATE_LIMITING, **getattr(settings, 'RATE_LIMITING', {})}
+
+
+_limiter = None
+
+
+def get_rate_limiter():
+    """Return the process-wide limiter engine configured in settings"""
+    global _limiter
+    if _limiter is None:
+        config = get_rate_limit_settings()
+        _limiter = import_string(config['BACKEND'])(cache_alias=config['CACHE_ALIAS'])
+    return _limiter
@@ -0,0 +1,31 @@
+# common/websocket_auth.py
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.contrib.auth.models import AnonymousUser
+from urllib.parse import parse_qs
+from common.authentication import JWTPrincipalError, resolve_jwt_user
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@database_sync_to_async
+def _get_user(token):
+    try:
+        return resolve_jwt_user(token)
+    except JWTPrincipalError as e:
+        logger.info(f"WebSocket authentication failed: {e.error_code}")
+        return AnonymousUser()
+
+
+class JWTWebSocketMiddleware(BaseMiddleware):
+    """
+    Sets scope['user'] from a JWT access token. Browsers cannot send an
+    Authorization header on a WebSocket handshake, so the token is read from
+    the `token` query parameter.
+    """
+
+    async def __call__(self, scope, receive, send):
+        token = parse_qs(scope.get('query_string', b'').decode()).get('token', [None])[0]
+        scope['user'] = await _get_user(token) if token else AnonymousUser()
+        return await super().__call__(scope, receive, send)
@@ -2,6 +2,8 @@
 ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP is served by Django; WebSocket connections are routed to the messaging
+consumers (see messaging/routing.py).
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -13,4 +15,20 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
-application = get_asgi_application()
+# Initialize Django before importing anything that touches models
+django_asgi_app = get_asgi_application()
+
+from channels.routing import ProtocolTypeRouter, URLRouter
+from channels.security.websocket import OriginValidator
+from django.conf import settings
+from common.websocket_auth import JWTWebSocketMiddleware
+from messaging.routing import websocket_urlpatterns
+
+application = ProtocolTypeRouter({
+    'http': django_asgi_app,
+    # The frontend is on its own origin (WEBSOCKET_ALLOWED_ORIGINS), not ALLOWED_HOSTS
+    'websocket': OriginValidator(
+        JWTWebSocketMiddleware(URLRouter(websocket_urlpatterns)),
+        settings.WEBSOCKET_ALLOWED_ORIGINS
+    ),
+})
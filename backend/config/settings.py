@@ -97,6 +97,33 @@ SECURE_HSTS_SECONDS = 0
 # Development Rate Limiting (disable for testing)
 DISABLE_RATE_LIMITING = False  # Set to False in production
 
+# Rate limiter engine and rules (common.ratelimit / RateLimitMiddleware)
+RATE_LIMITING = {
+    # CacheRateLimiter works on any cache; RedisRateLimiter needs django-redis
+    'BACKEND': 'common.ratelimit.CacheRateLimiter',
+    'CACHE_ALIAS': 'default',
+    'RULES': {
+        '/api/auth/login': {'limit': 3, 'window': 900, 'message': 'Too many login attempts'},
+        '/api/auth/register': {'limit': 3, 'window': 3600, 'message': 'Too many registration attempts'},
+        '/api/auth/forgot-password': {'limit': 3, 'window': 3600, 'message': 'Too many password reset requests'},
+        '/api/auth/reset-password/confirm': {'limit': 3, 'window': 3600, 'message': 'Too many password reset attempts'},
+        '/api/auth/verify-email': {'limit': 3, 'window': 3600, 'message': 'Too many email verification attempts'},
+        '/api/auth/refresh': {'limit': 10, 'window': 300, 'message': 'Too many token refresh attempts'},
+        '/api/auth/resend-verification': {'limit': 3, 'window': 3600, 'message': 'Too many verification email requests'},
+        '/api/auth/2fa/emergency-disable': {'limit': 3, 'window': 3600, 'message': 'Too many emergency 2FA disable requests'},
+        '/api/auth/change-password': {'limit': 3, 'window': 3600, 'message': 'Too many password change attempts'},
+        '/api/auth/account-status': {'limit': 30, 'window': 300, 'message': 'Too many account status checks'},
+        '/api/auth/2fa/admin/approve-emergency': {'limit': 10, 'window': 300, 'message': 'Too many admin 2FA approvals'},
+        # Superadmin endpoints
+        '/api/superadmin/login': {'limit': 5, 'window': 900, 'message': 'Too many superadmin login attempts'},
+        '/api/superadmin/dashboard': {'limit': 30, 'window': 300, 'message': 'Too many dashboard requests'},
+        '/api/superadmin/users': {'limit': 20, 'window': 300, 'message': 'Too many user management requests'},
+    },
+    # Paths that are also limited per email address from the JSON body
+    'EMAIL_LIMITED_PATHS': ['/api/auth/login', '/api/auth/forgot-password', '/api/auth/register'],
+    'SUSPICIOUS_ACTIVITY': {'limit': 100, 'window': 60},  # Requests per IP per minute
+}
+
 # Redis (for caching and rate limiting)
 # REDIS_URL = 'redis://127.0.0.1:6379/1'
 
@@ -216,6 +243,14 @@ VIDEO_PROCESSING = {
     'EXTRACT_DURATION': True,
 }
 
+# Video heartbeat write-behind buffer (needs a shared cache such as Redis)
+LESSON_PROGRESS_BUFFER = {
+    'ENABLED': os.getenv('LESSON_PROGRESS_BUFFER_ENABLED', 'False').lower() == 'true',
+    'ACCESS_CHECK_SECONDS': 300,  # Re-check lesson access/enrollment every 5 minutes
+    'ENTRY_TIMEOUT_SECONDS': 3600,  # Buffered entries expire after an hour idle
+    'FLUSH_BATCH_SIZE': 500,
+}
+
 # Nigerian Bank Codes (for reference)
 NIGERIAN_BANK_CODES = {
     'ACCESS_BANK': '044',
@@ -276,8 +311,10 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'cloudinary_storage',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'cloudinary',
     'django_celery_beat',
+    'channels',
 
     # Third-party apps
     'rest_framework',
@@ -339,6 +376,17 @@ WSGI_APPLICATION = 'config.wsgi.application'
 JWT_ACCESS_TOKEN_LIFETIME = 60  # minutes
 JWT_REFRESH_TOKEN_LIFETIME = 7   # days
 
+# Deferred last-activity tracking (common.middleware.UserActivityMiddleware)
+USER_ACTIVITY_TRACKING = {
+    'FLUSH_INTERVAL_SECONDS': 300,  # At most one last_activity write per user per interval
+}
+
+# Per-process cache of users resolved from access tokens (common.authentication)
+JWT_PRINCIPAL_CACHE = {
+    'MAX_SIZE': 1024,
+    'TTL_SECONDS': 60,  # Bounds staleness across processes after a user change
+}
+
 # Email Settings
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
@@ -348,6 +396,40 @@ EMAIL_HOST_USER = 'nclexkeysintl.academy@gmail.com'
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', 'your-app-password')
 DEFAULT_FROM_EMAIL = 'NCLEX Keys International <nclexkeysintl.academy@gmail.com>'
 
+# Bulk notification emails (utils/notifications.py): messages sent per SMTP batch
+BULK_EMAIL = {
+    'CHUNK_SIZE': 100,
+}
+
+# Video metadata probing (utils/media_probe.py): container headers are read
+# with HTTP Range requests of BLOCK_SIZE bytes instead of downloading the file
+MEDIA_PROBE = {
+    'TIMEOUT': 10,
+    'BLOCK_SIZE': 64 * 1024,
+    'SPOOL_MAX_MEMORY': 8 * 1024 * 1024,
+    'MAX_METADATA_SIZE': 64 * 1024 * 1024,
+}
+
+# Batch video metadata (utils/video_processing.py): concurrent probes and how
+# long results are cached per video URL
+VIDEO_METADATA = {
+    'MAX_WORKERS': 4,
+    'CACHE_TIMEOUT': 60 * 60 * 24 * 7,
+}
+
+# Resumable video uploads (courses/video_uploads.py): chunks are staged on disk
+# and a Celery task sends the assembled file to STORAGE_BACKEND. The Celery
+# workers read the staged files, so STAGING_DIR must point at the same
+# (shared) disk for the web processes and the workers.
+VIDEO_UPLOAD = {
+    'STORAGE_BACKEND': 'courses.video_uploads.CloudinaryVideoStorage',
+    'STAGING_DIR': os.path.join(BASE_DIR, 'media', 'video_uploads'),
+    'MAX_SIZE': 2 * 1024 * 1024 * 1024,
+    'CHUNK_SIZE': 20 * 1024 * 1024,
+    # Unfinished uploads idle this long are failed by expire_stale_video_uploads
+    'STALE_AFTER': 60 * 60 * 24,
+}
+
 # Frontend URL (for email links)
 FRONTEND_URL = os.getenv('FRONTEND_URL', 'https://nclex-cx5hhtc91-peters-projects-db86b6fd.vercel.app')
 
@@ -413,6 +495,31 @@ CACHES = {
 # }
 
 
+# Channel layer for WebSocket push (config/asgi.py). In-memory works within a
+# single process only; set REDIS_URL to share events across workers.
+ASGI_APPLICATION = 'config.asgi.application'
+
+# Browser origins allowed to open the WebSocket (config/asgi.py). The frontend
+# is served from its own origin, not from ALLOWED_HOSTS, so reuse the CORS list.
+WEBSOCKET_ALLOWED_ORIGINS = [*CORS_ALLOWED_ORIGINS, FRONTEND_URL]
+
+if os.getenv('REDIS_URL'):
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {
+                'hosts': [os.getenv('REDIS_URL')],
+            },
+        }
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+        }
+    }
+
+
 # GeoIP2 Settings (for location detection)
 GEOIP_PATH = os.path.join(BASE_DIR, 'geoip')
 
@@ -486,6 +593,7 @@ CELERY_TASK_ROUTES = {
     'management.tasks.process_scheduled_deletions': {'queue': 'high_priority'},
     'management.tasks.send_deletion_reminders': {'queue': 'emails'},
     'management.tasks.database_health_check': {'queue': 'monitoring'},
+    'users.tasks.send_bulk_email_task': {'queue': 'emails'},
 }
 
 # Celery Beat Schedule
@@ -527,6 +635,12 @@ CELERY_BEAT_SCHEDULE = {
 
     # ============= USER MANAGEMENT TASKS =============
     
+    # Write cached last-activity timestamps back to users
+    'flush-user-activity': {
+        'task': 'users.tasks.flush_user_activity_task',
+        'schedule': crontab(minute='*'),  # Every minute (only closed intervals are written)
+    },
+    
     'cleanup-old-records': {
         'task': 'management.tasks.cleanup_old_records',
         'schedule': crontab(hour=2, minute=0),  # Run daily at 2 AM
@@ -609,6 +723,24 @@ CELERY_BEAT_SCHEDULE = {
         'schedule': crontab(hour=14, minute=0, day_of_week=3),  # Wednesday at 2 PM
     },
     
+    # Persist buffered video heartbeats
+    'flush-lesson-progress-buffer': {
+        'task': 'courses.tasks.flush_lesson_progress_buffer',
+        'schedule': crontab(minute='*'),  # Every minute
+    },
+    
+    # Rebuild yesterday's dashboard rollups (CourseDailyStat)
+    'reconcile-course-daily-stats': {
+        'task': 'courses.tasks.reconcile_course_daily_stats',
+        'schedule': crontab(hour=0, minute=30),  # Daily at 12:30 AM
+    },
+    
+    # Fail abandoned chunked video uploads and delete their staging files
+    'expire-stale-video-uploads': {
+        'task': 'courses.tasks.expire_stale_video_uploads',
+        'schedule': crontab(minute=15, hour='*/6'),  # Every 6 hours
+    },
+    
     # Course completion follow-ups
     'send-course-completion-followups': {
         'task': 'courses.tasks.send_completion_followups',
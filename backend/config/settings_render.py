@@ -77,6 +77,9 @@ PAYSTACK_WEBHOOK_SECRET = os.environ.get('PAYSTACK_WEBHOOK_SECRET', '')
 FRONTEND_URL = os.environ.get('FRONTEND_URL', 'https://yourdomain.vercel.app')
 SITE_URL = os.environ.get('SITE_URL', 'https://your-backend-name.onrender.com')
 
+# WebSocket handshakes come from the frontend origin
+WEBSOCKET_ALLOWED_ORIGINS = [*CORS_ALLOWED_ORIGINS, FRONTEND_URL]
+
 # Logging Configuration
 LOGGING = {
     'version': 1,
@@ -132,6 +135,7 @@ CELERY_TIMEZONE = 'UTC'
 
 # Rate Limiting
 RATELIMIT_USE_CACHE = 'default'
+RATE_LIMITING['BACKEND'] = 'common.ratelimit.RedisRateLimiter'  # Atomic Lua sliding window shared by all workers
 
 # File Upload Settings
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
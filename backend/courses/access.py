@@ -0,0 +1,95 @@
+# courses/access.py
+"""
+Sequential access rules of a course evaluated for one user.
+
+CourseAccess loads the course's sections and lessons, whether the user
+started the course, and the set of lessons the user completed (four
+queries), then walks sections and lessons once in order to decide which
+are open:
+
+- preview sections and lessons are always open;
+- a section needs course progress and, with required_previous_completion,
+  every earlier active section fully completed;
+- a lesson needs its section open and, with require_completion, every
+  earlier active lesson of the section that also requires completion to be
+  completed.
+
+Serializers share one CourseAccess per course through their context
+(see for_context), so a lesson listing costs the same queries whatever its
+length.
+"""
+from itertools import groupby
+from .models import CourseLesson, CourseSection, UserCourseProgress, UserLessonProgress
+
+CONTEXT_KEY = 'course_access'
+
+
+class CourseAccess:
+    def __init__(self, user, course_id):
+        self.user = user
+        self.course_id = course_id
+
+        self.started = UserCourseProgress.objects.filter(user=user, course_id=course_id).exists()
+        self.completed = set(UserLessonProgress.objects.filter(
+            user=user, lesson__section__course_id=course_id, is_completed=True
+        ).values_list('lesson_id', flat=True))
+
+        sections = list(CourseSection.objects.filter(course_id=course_id).only(
+            'id', 'order', 'is_active', 'is_preview', 'required_previous_completion'
+        ).order_by('order'))
+        lessons = CourseLesson.objects.filter(section__course_id=course_id).only(
+            'id', 'section_id', 'order', 'is_active', 'is_preview', 'require_completion'
+        ).order_by('section_id', 'order')
+        lessons_by_section = {
+            section_id: list(section_lessons)
+            for section_id, section_lessons in groupby(lessons, key=lambda lesson: lesson.section_id)
+        }
+
+        self.sections = {}
+        self.lessons = {}
+        previous_incomplete = False
+        # Sections sharing an order value do not gate each other
+        for _, same_order in groupby(sections, key=lambda section: section.order):
+            same_order = list(same_order)
+            for section in same_order:
+                self.sections[section.id] = section.is_preview or (
+                    self.started and not (section.required_previous_completion and previous_incomplete)
+                )
+                self._evaluate_lessons(section, lessons_by_section.get(section.id, []))
+            previous_incomplete = previous_incomplete or any(
+                section.is_active and not self._section_completed(lessons_by_section.get(section.id, []))
+                for section in same_order
+            )
+
+    def _section_completed(self, lessons):
+        # Matches CourseSection.get_completion_rate() reaching 100
+        active = sum(1 for lesson in lessons if lesson.is_active)
+        return active == 0 or sum(1 for lesson in lessons if lesson.id in self.completed) >= active
+
+    def _evaluate_lessons(self, section, lessons):
+        section_open = self.sections[section.id]
+        previous_incomplete = False
+        for _, same_order in groupby(lessons, key=lambda lesson: lesson.order):
+            same_order = list(same_order)
+            for lesson in same_order:
+                self.lessons[lesson.id] = lesson.is_preview or (
+                    section_open and not (lesson.require_completion and previous_incomplete)
+                )
+            previous_incomplete = previous_incomplete or any(
+                lesson.is_active and lesson.require_completion and lesson.id not in self.completed
+                for lesson in same_order
+            )
+
+    def is_section_accessible(self, section_id):
+        return self.sections.get(section_id, False)
+
+    def is_lesson_accessible(self, lesson_id):
+        return self.lessons.get(lesson_id, False)
+
+    @classmethod
+    def for_context(cls, context, course_id):
+        """The CourseAccess of context['user'] for a course, built once per serializer context"""
+        cached = context.setdefault(CONTEXT_KEY, {})
+        if course_id not in cached:
+            cached[course_id] = cls(context['user'], course_id)
+        return cached[course_id]
@@ -0,0 +1,62 @@
+# courses/dashboard.py
+"""
+User-independent part of the student dashboard.
+
+Every student sees the same course cards, so they are built in one annotated
+query (enrolled students and average rating as subqueries) and shared through
+the cache for a short time. Counts on the cards may lag by up to
+DASHBOARD_COURSES_TIMEOUT seconds.
+"""
+from django.core.cache import cache
+from django.db.models import Avg, Count, FloatField, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from .models import Course, CourseEnrollment, CourseReview
+
+DASHBOARD_COURSES_KEY = 'student_dashboard_courses'
+DASHBOARD_COURSES_TIMEOUT = 60
+
+
+def _course_subquery(queryset, aggregate, output_field):
+    rows = queryset.filter(course=OuterRef('pk')).order_by().values('course')
+    return Subquery(rows.annotate(value=aggregate).values('value')[:1], output_field=output_field)
+
+
+def build_dashboard_courses():
+    """Course cards of every course, newest first, in one query"""
+    courses = Course.objects.select_related('created_by', 'category').annotate(
+        dashboard_students=Coalesce(
+            _course_subquery(CourseEnrollment.objects.filter(is_active=True), Count('id'), IntegerField()), 0
+        ),
+        dashboard_rating=_course_subquery(CourseReview.objects.all(), Avg('rating'), FloatField()),
+    ).order_by('-created_at')
+
+    return [
+        {
+            'id': course.id,
+            'title': course.title,
+            'description': course.description,
+            'thumbnail': course.thumbnail.url if course.thumbnail else None,
+            'video_url': course.get_video_url(),
+            'course_type': course.course_type,
+            'price': 0,  # No additional cost since they already paid
+            'currency': 'USD',
+            'duration_minutes': course.duration_minutes,
+            'difficulty_level': course.difficulty_level,
+            'category': course.get_category_name(),
+            'is_active': course.is_active,
+            'moderation_status': course.moderation_status,
+            'is_enrolled': True,  # All students have access to all courses
+            'can_access': course.is_active and course.moderation_status == 'approved',
+            'instructor_name': course.created_by.full_name if course.created_by else 'Unknown',
+            'created_at': course.created_at,
+            'total_students': course.dashboard_students,
+            'average_rating': course.dashboard_rating or 0,
+            'total_lessons': course.total_lessons,
+            'access_level': 'full_access'  # Students have full access to all courses
+        }
+        for course in courses
+    ]
+
+
+def get_dashboard_courses():
+    return cache.get_or_set(DASHBOARD_COURSES_KEY, build_dashboard_courses, DASHBOARD_COURSES_TIMEOUT)
@@ -0,0 +1,165 @@
+# courses/exam_trends.py
+"""
+Time series of completed exam attempts.
+
+Attempts are grouped into day, week or month buckets by the database
+(TruncDay/TruncWeek/TruncMonth in the current timezone) in one query backed
+by the (exam, status, completed_at) index. Buckets without attempts are
+zero-filled and rolling averages are computed in one pass over the series.
+Results are cached per exam version, bucket, range and day; signals in
+courses/signals.py bump the version when an attempt completes.
+"""
+from collections import deque
+from datetime import datetime, time, timedelta
+from django.core.cache import cache
+from django.db.models import Avg, Count, FloatField, Q, Sum
+from django.db.models.functions import Cast, TruncDay, TruncMonth, TruncWeek
+from django.utils import timezone
+from .models import UserExamAttempt
+
+TRENDS_VERSION_KEY = 'exam_trends_version_{exam_id}'
+TRENDS_KEY = 'exam_trends_{exam_id}_v{version}_{bucket}_{days}_{today}'
+TRENDS_TIMEOUT = 60 * 60
+
+BUCKETS = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+DEFAULT_BUCKET = 'day'
+
+# Buckets averaged by the rolling series
+ROLLING_WINDOWS = {
+    'day': 7,
+    'week': 4,
+    'month': 3,
+}
+
+
+def bump_exam_trends_version(exam_id):
+    """Invalidate the cached trends of an exam"""
+    key = TRENDS_VERSION_KEY.format(exam_id=exam_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, None)
+
+
+def bucket_start(day, bucket):
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(day, bucket):
+    if bucket == 'week':
+        return day + timedelta(days=7)
+    if bucket == 'month':
+        return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return day + timedelta(days=1)
+
+
+def _completed_attempts(exam_id):
+    return UserExamAttempt.objects.filter(exam_id=exam_id, status='completed').order_by()
+
+
+def build_exam_trends(exam_id, bucket, days):
+    """Zero-filled series of the last `days` days plus a week-over-week comparison"""
+    today = timezone.localdate()
+    first_day = bucket_start(today - timedelta(days=days - 1), bucket)
+    start = timezone.make_aware(datetime.combine(first_day, time.min))
+
+    rows = {
+        timezone.localtime(row['period']).date(): row
+        for row in _completed_attempts(exam_id).filter(completed_at__gte=start).values(
+            period=BUCKETS[bucket]('completed_at')
+        ).annotate(
+            total_attempts=Count('id'),
+            passed_attempts=Count('id', filter=Q(passed=True)),
+            score_total=Sum(Cast('percentage_score', FloatField())),
+            average_time=Avg('time_taken_minutes'),
+        )
+    }
+
+    series = []
+    window = deque()
+    window_attempts = window_passed = 0
+    window_score = 0.0
+    period = first_day
+    while period <= today:
+        row = rows.get(period, {})
+        attempts = row.get('total_attempts', 0)
+        passed = row.get('passed_attempts', 0)
+        score_total = row.get('score_total') or 0.0
+
+        window.append((attempts, passed, score_total))
+        window_attempts += attempts
+        window_passed += passed
+        window_score += score_total
+        if len(window) > ROLLING_WINDOWS[bucket]:
+            old_attempts, old_passed, old_score = window.popleft()
+            window_attempts -= old_attempts
+            window_passed -= old_passed
+            window_score -= old_score
+
+        series.append({
+            'period_start': period,
+            'total_attempts': attempts,
+            'passed_attempts': passed,
+            'pass_rate': round(passed / attempts * 100, 2) if attempts else 0,
+            'average_score': round(score_total / attempts, 2) if attempts else 0,
+            'average_time': round(row['average_time'], 2) if row.get('average_time') is not None else 0,
+            'rolling_average_score': round(window_score / window_attempts, 2) if window_attempts else 0,
+            'rolling_pass_rate': round(window_passed / window_attempts * 100, 2) if window_attempts else 0,
+        })
+        period = next_bucket(period, bucket)
+
+    return {
+        'bucket': bucket,
+        'rolling_window': ROLLING_WINDOWS[bucket],
+        'start_date': first_day,
+        'end_date': today,
+        'trends': series,
+        'weekly_comparison': _weekly_comparison(exam_id),
+    }
+
+
+def _weekly_comparison(exam_id):
+    """This week against the previous one, both windows read in one scan"""
+    now = timezone.now()
+    current = Q(completed_at__gte=now - timedelta(days=7))
+    previous = Q(completed_at__gte=now - timedelta(days=14), completed_at__lt=now - timedelta(days=7))
+
+    totals = _completed_attempts(exam_id).filter(completed_at__gte=now - timedelta(days=14)).aggregate(
+        current_attempts=Count('id', filter=current),
+        current_passed=Count('id', filter=current & Q(passed=True)),
+        current_avg_score=Avg(Cast('percentage_score', FloatField()), filter=current),
+        previous_attempts=Count('id', filter=previous),
+        previous_passed=Count('id', filter=previous & Q(passed=True)),
+        previous_avg_score=Avg(Cast('percentage_score', FloatField()), filter=previous),
+    )
+    return {
+        week: {
+            'attempts': totals[f'{prefix}_attempts'],
+            'pass_rate': (
+                totals[f'{prefix}_passed'] / totals[f'{prefix}_attempts'] if totals[f'{prefix}_attempts'] else None
+            ),
+            'avg_score': totals[f'{prefix}_avg_score'],
+        }
+        for week, prefix in (('current_week', 'current'), ('previous_week', 'previous'))
+    }
+
+
+def get_exam_trends(exam_id, bucket=DEFAULT_BUCKET, days=30):
+    version = cache.get_or_set(TRENDS_VERSION_KEY.format(exam_id=exam_id), 1, None)
+    key = TRENDS_KEY.format(
+        exam_id=exam_id, version=version, bucket=bucket, days=days, today=timezone.localdate().isoformat()
+    )
+
+    trends = cache.get(key)
+    if trends is None:
+        trends = build_exam_trends(exam_id, bucket, days)
+        cache.set(key, trends, TRENDS_TIMEOUT)
+    return trends
@@ -27,6 +27,11 @@ urlpatterns = [
     # Video Management
     path('videos/upload/', instructor_views.upload_video, name='admin_upload_video'),
     path('lessons/upload-video/', instructor_views.upload_lesson_video, name='admin_upload_lesson_video'),
+    path('videos/uploads/', instructor_views.create_video_upload_session, name='admin_create_video_upload'),
+    path('videos/uploads/<uuid:upload_id>/', instructor_views.video_upload_detail, name='admin_video_upload_detail'),
+    path('videos/uploads/<uuid:upload_id>/chunk/', instructor_views.upload_video_chunk, name='admin_upload_video_chunk'),
+    path('lessons/video-metadata/', instructor_views.process_lessons_video_metadata, name='admin_process_video_metadata'),
+    path('lessons/video-metadata/<str:task_id>/', instructor_views.video_metadata_task_status, name='admin_video_metadata_status'),
 
     # Course Analytics & Stats
     path('courses/statistics/', instructor_views.course_statistics, name='admin_course_statistics'),
@@ -6,13 +6,24 @@ from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from django.db import transaction
 from django.utils import timezone
 from django.db.models import Count, Avg, Q, Sum, F
+from django.db.models.functions import TruncMonth
 from django.core.paginator import Paginator
+from django.http import StreamingHttpResponse
 from django.conf import settings
 from django.db import models
 from cloudinary.uploader import upload, destroy
 from cloudinary.utils import cloudinary_url
 from cloudinary import api
-from .models import Course, UserCourseProgress, CourseEnrollment, CourseCategory, CourseReview, CourseAppeal, CourseExam, ExamQuestion, ExamAnswer, UserExamAttempt, UserExamAnswer, ExamCertificate, CourseSection, CourseLesson, UserLessonProgress
+from celery.result import AsyncResult
+from .models import Course, CourseDailyStat, UserCourseProgress, CourseEnrollment, CourseCategory, CourseReview, CourseAppeal, CourseExam, ExamQuestion, ExamAnswer, UserExamAttempt, UserExamAnswer, ExamCertificate, CourseSection, CourseLesson, UserLessonProgress, VideoUpload
+from .exam_trends import BUCKETS as TREND_BUCKETS, DEFAULT_BUCKET, get_exam_trends
+from .question_analytics import LOW_DISCRIMINATION, empty_question_stats, get_question_analytics
+from .video_uploads import (
+    ChunkOffsetError, VideoUploadError, append_chunk, create_video_upload, get_video_upload_settings,
+    stage_uploaded_file, upload_status
+)
+from .roster import DEFAULT_ROSTER_SORT, iter_roster_csv, roster_rows, student_roster
+from .rollups import average_rating, rollup_totals, stats_since
 from .serializers import (
     CourseSerializer, CourseCreateUpdateSerializer, UserCourseProgressSerializer,
     CourseEnrollmentSerializer, CourseStatsSerializer, CourseCategorySerializer,
@@ -21,6 +32,7 @@ from .serializers import (
     UserLessonProgressSerializer, UserLessonProgressUpdateSerializer
 )
 from common.permissions import IsAuthenticated, IsAdmin
+from users.activity import get_last_activity_map
 from users.models import User
 from utils.auth import EmailService
 from django.utils.text import slugify
@@ -55,56 +67,18 @@ def upload_video(request):
         )
     
     try:
-        video_file = serializer.validated_data['video_file']
-        
-        # Create organized folder structure
-        current_date = timezone.now()
-        folder_path = f"courses/videos/{current_date.year}/{current_date.month:02d}"
-        
-        # Upload to Cloudinary with organized structure
-        upload_result = upload(
-            video_file,
-            resource_type="video",
-            folder=folder_path,  # ← ORGANIZED BY YEAR/MONTH
-            public_id=f"course_video_{current_date.strftime('%Y%m%d_%H%M%S')}_{request.user.id}",
-            overwrite=True,
-            transformation=[
-                {'quality': 'auto:good'},
-                {'format': 'mp4'}
-            ],
-            tags=[
-                'course_video',
-                f'uploaded_by_{request.user.id}',
-                f'year_{current_date.year}',
-                f'month_{current_date.month}'
-            ]
-        )
-        
-        # Get optimized video URL
-        video_url, _ = cloudinary_url(
-            upload_result['public_id'],
-            resource_type="video",
-            format="mp4",
-            quality="auto:good"
-        )
+        # Storage and metadata extraction run in the background; poll the upload status
+        upload = stage_uploaded_file(request.user, serializer.validated_data['video_file'], 'course')
         
-        video_info = {
-            'public_id': upload_result['public_id'],
-            'url': video_url,
-            'secure_url': upload_result['secure_url'],
-            'folder': folder_path,
-            'duration': upload_result.get('duration'),
-            'format': upload_result.get('format'),
-            'size': upload_result.get('bytes')
-        }
-        
-        logger.info(f"Video uploaded to {folder_path} by admin {request.user.email}: {upload_result['public_id']}")
+        logger.info(f"Video upload {upload.id} staged by admin {request.user.email}")
         
         return Response({
-            'message': 'Video uploaded successfully.',
-            'video_info': video_info
-        }, status=status.HTTP_201_CREATED)
+            'message': 'Video upload accepted.',
+            'upload': upload_status(upload)
+        }, status=status.HTTP_202_ACCEPTED)
     
+    except VideoUploadError as e:
+        return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         logger.error(f"Video upload error: {str(e)}")
         return Response(
@@ -265,13 +239,7 @@ def list_all_courses(request):
         # Build queryset
         queryset = Course.objects.select_related(
             'created_by', 'updated_by'
-        ).prefetch_related(
-            'user_progress', 'enrollments__user', 'reviews'
-        ).annotate(
-            enrollment_count=Count('user_progress'),
-            review_count=Count('reviews', filter=Q(reviews__is_approved=True)),
-            avg_rating=Avg('reviews__rating', filter=Q(reviews__is_approved=True))
-        )
+        ).with_catalog_stats()
         
         # Apply filters
         if search:
@@ -694,25 +662,27 @@ def course_statistics(request):
     """
     try:
         # Basic stats
-        total_courses = Course.objects.count()
-        active_courses = Course.objects.filter(is_active=True).count()
-        free_courses = Course.objects.filter(course_type='free', is_active=True).count()
-        paid_courses = Course.objects.filter(course_type__in=['paid', 'premium'], is_active=True).count()
-        
-        # Enrollment stats
-        total_enrollments = UserCourseProgress.objects.count()
-        paid_enrollments = CourseEnrollment.objects.filter(payment_status='completed').count()
-        completed_courses = UserCourseProgress.objects.filter(progress_percentage=100).count()
-        
-        # Revenue stats
-        total_revenue = CourseEnrollment.objects.filter(
-            payment_status='completed'
-        ).aggregate(total=Sum('amount_paid'))['total'] or 0
+        course_counts = Course.objects.aggregate(
+            total=Count('id'),
+            active=Count('id', filter=Q(is_active=True)),
+            free=Count('id', filter=Q(course_type='free', is_active=True)),
+            paid=Count('id', filter=Q(course_type__in=['paid', 'premium'], is_active=True))
+        )
+        total_courses = course_counts['total']
+        active_courses = course_counts['active']
+        free_courses = course_counts['free']
+        paid_courses = course_counts['paid']
+        
+        # Enrollment, completion and revenue stats from the daily rollups
+        thirty_days_ago = stats_since(30)
+        rollup = rollup_totals(CourseDailyStat.objects.all(), recent=Q(date__gte=thirty_days_ago))
+        total_enrollments = rollup['progress_started']
+        paid_enrollments = rollup['paid_enrollments']
+        completed_courses = rollup['completions']
+        total_revenue = rollup['revenue']
         
         # Average completion rate
-        avg_completion = UserCourseProgress.objects.aggregate(
-            avg=Avg('progress_percentage')
-        )['avg'] or 0
+        avg_completion = rollup['progress_percentage_total'] / total_enrollments if total_enrollments else 0
         
         # Courses by category
         courses_by_category = dict(
@@ -722,10 +692,7 @@ def course_statistics(request):
         )
         
         # Recent enrollments (last 30 days)
-        thirty_days_ago = timezone.now() - timedelta(days=30)
-        recent_enrollments = UserCourseProgress.objects.filter(
-            started_at__gte=thirty_days_ago
-        ).count()
+        recent_enrollments = rollup['recent_progress_started']
         
         stats_data = {
             'total_courses': total_courses,
@@ -1611,8 +1578,8 @@ def lesson_detail(request, course_id, section_id, lesson_id):
         
         # Add navigation info
         lesson_data['navigation'] = {
-            'next_lesson': lesson.get_next_lesson().id if lesson.get_next_lesson() else None,
-            'previous_lesson': lesson.get_previous_lesson().id if lesson.get_previous_lesson() else None
+            'next_lesson': lesson.get_next_lesson_id(),
+            'previous_lesson': lesson.get_previous_lesson_id()
         }
         
         return Response(lesson_data, status=status.HTTP_200_OK)
@@ -2021,50 +1988,18 @@ def upload_lesson_video(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Create organized folder structure
-        current_date = timezone.now()
-        folder_path = f"courses/lessons/videos/{current_date.year}/{current_date.month:02d}"
-        
-        # Upload to Cloudinary
-        upload_result = upload(
-            video_file,
-            resource_type="video",
-            folder=folder_path,
-            public_id=f"lesson_video_{current_date.strftime('%Y%m%d_%H%M%S')}",
-            overwrite=True,
-            transformation=[
-                {'quality': 'auto:good'},
-                {'format': 'mp4'}
-            ],
-            tags=['lesson_video', f'uploaded_by_{request.user.id}']
-        )
-        
-        # Extract video information
-        video_info = {
-            'public_id': upload_result['public_id'],
-            'url': upload_result['secure_url'],
-            'duration_seconds': upload_result.get('duration'),
-            'format': upload_result.get('format'),
-            'size_bytes': upload_result.get('bytes'),
-            'width': upload_result.get('width'),
-            'height': upload_result.get('height')
-        }
+        # Storage, metadata and thumbnail run in the background; poll the upload status
+        upload = stage_uploaded_file(request.user, video_file, 'lesson')
         
-        # Generate thumbnail
-        try:
-            thumbnail_url = generate_video_thumbnail(upload_result['secure_url'])
-            if thumbnail_url:
-                video_info['thumbnail_url'] = thumbnail_url
-        except Exception as e:
-            logger.warning(f"Thumbnail generation failed: {str(e)}")
-        
-        logger.info(f"Lesson video uploaded by admin {request.user.email}: {upload_result['public_id']}")
+        logger.info(f"Lesson video upload {upload.id} staged by admin {request.user.email}")
         
         return Response({
-            'message': 'Video uploaded successfully.',
-            'video_info': video_info
-        }, status=status.HTTP_201_CREATED)
+            'message': 'Video upload accepted.',
+            'upload': upload_status(upload)
+        }, status=status.HTTP_202_ACCEPTED)
     
+    except VideoUploadError as e:
+        return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         logger.error(f"Lesson video upload error: {str(e)}")
         return Response(
@@ -2073,6 +2008,119 @@ def upload_lesson_video(request):
         )
 
 
+@api_view(['POST'])
+@permission_classes([IsAdmin])
+def create_video_upload_session(request):
+    """
+    Admin: Start a resumable chunked video upload
+    POST /api/admin/videos/uploads/
+    
+    Body: filename, total_size, kind (course or lesson)
+    """
+    try:
+        total_size = int(request.data.get('total_size', 0))
+    except (TypeError, ValueError):
+        return Response({'detail': 'total_size must be a number of bytes.'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        upload = create_video_upload(
+            request.user, request.data.get('filename'), total_size, request.data.get('kind', 'lesson')
+        )
+    except VideoUploadError as e:
+        return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response({
+        'upload': upload_status(upload),
+        'chunk_size': get_video_upload_settings()['CHUNK_SIZE']
+    }, status=status.HTTP_201_CREATED)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdmin])
+def video_upload_detail(request, upload_id):
+    """
+    Admin: Status of a chunked video upload; received_bytes is the offset to resume from
+    GET /api/admin/videos/uploads/{upload_id}/
+    """
+    try:
+        upload = VideoUpload.objects.get(id=upload_id, uploaded_by=request.user)
+    except VideoUpload.DoesNotExist:
+        return Response({'detail': 'Upload not found.'}, status=status.HTTP_404_NOT_FOUND)
+    
+    return Response({'upload': upload_status(upload)})
+
+
+@api_view(['PUT'])
+@permission_classes([IsAdmin])
+@parser_classes([MultiPartParser, FormParser])
+def upload_video_chunk(request, upload_id):
+    """
+    Admin: Send the chunk of a video upload starting at offset
+    PUT /api/admin/videos/uploads/{upload_id}/chunk/
+    """
+    chunk = request.FILES.get('chunk')
+    if chunk is None:
+        return Response({'detail': 'chunk is required.'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        offset = int(request.data.get('offset', ''))
+    except (TypeError, ValueError):
+        return Response({'detail': 'offset must be a byte offset.'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    if not VideoUpload.objects.filter(id=upload_id, uploaded_by=request.user).exists():
+        return Response({'detail': 'Upload not found.'}, status=status.HTTP_404_NOT_FOUND)
+    
+    try:
+        upload = append_chunk(upload_id, offset, chunk)
+    except ChunkOffsetError as e:
+        return Response(
+            {'detail': str(e), 'received_bytes': e.received_bytes},
+            status=status.HTTP_409_CONFLICT
+        )
+    except VideoUploadError as e:
+        return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response({'upload': upload_status(upload)})
+
+
+@api_view(['POST'])
+@permission_classes([IsAdmin])
+def process_lessons_video_metadata(request):
+    """
+    Admin: Extract durations and thumbnails of video lessons in the background
+    POST /api/admin/lessons/video-metadata/
+    """
+    from .tasks import process_video_metadata
+
+    lesson_ids = request.data.get('lesson_ids', [])
+    if not lesson_ids:
+        return Response({'detail': 'lesson_ids is required.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    task = process_video_metadata.delay([str(lesson_id) for lesson_id in lesson_ids])
+    logger.info(f"Video metadata task {task.id} queued by admin {request.user.email} for {len(lesson_ids)} lessons")
+
+    return Response({'task_id': task.id, 'status': task.status}, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdmin])
+def video_metadata_task_status(request, task_id):
+    """
+    Admin: Progress of a video metadata task
+    GET /api/admin/lessons/video-metadata/{task_id}/
+    """
+    task = AsyncResult(task_id)
+    data = {'task_id': task_id, 'status': task.status}
+
+    if task.status == 'PROGRESS':
+        data['progress'] = task.info
+    elif task.successful():
+        data['results'] = task.result
+    elif task.failed():
+        data['detail'] = str(task.result)
+
+    return Response(data)
+
+
 # PAYMENT GATEWAY INTEGRATION VIEWS
 
 @api_view(['POST'])
@@ -2166,44 +2214,35 @@ def payment_analytics(request):
         
         # Date range filters
         days = int(request.GET.get('days', 30))
-        start_date = timezone.now() - timedelta(days=days)
+        start_date = stats_since(days)
         
-        # Revenue analytics
-        total_revenue = CourseEnrollment.objects.filter(
-            payment_status='completed'
-        ).aggregate(total=Sum('amount_paid'))['total'] or 0
+        # Revenue and enrollment analytics from the daily rollups
+        rollup = rollup_totals(CourseDailyStat.objects.all(), recent=Q(date__gte=start_date))
+        total_revenue = rollup['revenue']
+        recent_revenue = rollup['recent_revenue']
         
-        recent_revenue = CourseEnrollment.objects.filter(
-            payment_status='completed',
-            enrolled_at__gte=start_date
-        ).aggregate(total=Sum('amount_paid'))['total'] or 0
-        
-        # Enrollment analytics
-        total_enrollments = CourseEnrollment.objects.count()
-        paid_enrollments = CourseEnrollment.objects.filter(payment_status='completed').count()
-        pending_payments = CourseEnrollment.objects.filter(payment_status='pending').count()
-        failed_payments = CourseEnrollment.objects.filter(payment_status='failed').count()
+        total_enrollments = rollup['enrollments']
+        paid_enrollments = rollup['paid_enrollments']
+        pending_payments = rollup['pending_payments']
+        failed_payments = rollup['failed_payments']
         
         # Average order value
-        avg_order_value = CourseEnrollment.objects.filter(
-            payment_status='completed',
-            amount_paid__gt=0
-        ).aggregate(avg=Avg('amount_paid'))['avg'] or 0
+        avg_order_value = total_revenue / rollup['paying_enrollments'] if rollup['paying_enrollments'] else 0
         
         # Top performing courses by revenue
-        top_courses = Course.objects.annotate(
-            revenue=Sum('enrollments__amount_paid', filter=Q(enrollments__payment_status='completed')),
-            enrollment_count=Count('enrollments', filter=Q(enrollments__payment_status='completed'))
+        top_courses = CourseDailyStat.objects.values('course_id', 'course__title').annotate(
+            revenue=Sum('revenue'),
+            enrollment_count=Sum('paid_enrollments')
         ).filter(revenue__gt=0).order_by('-revenue')[:10]
         
         top_courses_data = []
         for course in top_courses:
             top_courses_data.append({
-                'id': str(course.id),
-                'title': course.title,
-                'revenue': float(course.revenue or 0),
-                'enrollments': course.enrollment_count,
-                'avg_price': float((course.revenue or 0) / max(course.enrollment_count, 1))
+                'id': str(course['course_id']),
+                'title': course['course__title'],
+                'revenue': float(course['revenue'] or 0),
+                'enrollments': course['enrollment_count'],
+                'avg_price': float((course['revenue'] or 0) / max(course['enrollment_count'], 1))
             })
         
         # Payment methods breakdown
@@ -2832,25 +2871,19 @@ def exam_question_analytics(request, course_id, exam_id):
         # Get all questions for this exam
         questions = ExamQuestion.objects.filter(exam=exam, is_active=True).order_by('order')
         
+        # Item statistics of all questions, cached until an attempt completes
+        exam_analytics = get_question_analytics(exam.id)
+        
         analytics_data = []
         
         for question in questions:
-            # Get all user answers for this question from completed attempts
-            user_answers = UserExamAnswer.objects.filter(
-                question=question,
-                attempt__status='completed'
-            ).select_related('attempt')
-            
-            total_attempts = user_answers.count()
-            correct_attempts = user_answers.filter(is_correct=True).count()
+            stats = exam_analytics['questions'].get(str(question.id)) or empty_question_stats()
+            total_attempts = stats['total_attempts']
+            correct_attempts = stats['correct_attempts']
             
             # Calculate success rate
             success_rate = round((correct_attempts / total_attempts * 100), 2) if total_attempts > 0 else 0
             
-            # Calculate average time spent (if available)
-            time_data = user_answers.exclude(time_taken_seconds=0).values_list('time_taken_seconds', flat=True)
-            average_time_spent = round(sum(time_data) / len(time_data), 2) if time_data else 0
-            
             question_stats = {
                 'question_id': question.id,
                 'question_text': question.question_text,
@@ -2859,13 +2892,15 @@ def exam_question_analytics(request, course_id, exam_id):
                 'correct_attempts': correct_attempts,
                 'success_rate': success_rate,
                 'difficulty_level': question.difficulty_level,
-                'average_time_spent': average_time_spent
+                'average_time_spent': stats['average_time_spent'],
+                'p_value': stats['p_value'],
+                'discrimination': stats['discrimination']
             }
             
             analytics_data.append(question_stats)
         
         # Overall exam analytics
-        total_exam_attempts = UserExamAttempt.objects.filter(exam=exam, status='completed').count()
+        total_exam_attempts = exam_analytics['total_attempts']
         
         # Questions sorted by difficulty (lowest success rate first)
         difficult_questions = sorted(analytics_data, key=lambda x: x['success_rate'])[:5]
@@ -2883,7 +2918,11 @@ def exam_question_analytics(request, course_id, exam_id):
                 'average_success_rate': round(sum(q['success_rate'] for q in analytics_data) / len(analytics_data), 2) if analytics_data else 0,
                 'most_difficult_questions': difficult_questions,
                 'easiest_questions': easy_questions,
-                'questions_needing_review': [q for q in analytics_data if q['success_rate'] < 50]
+                'questions_needing_review': [q for q in analytics_data if q['success_rate'] < 50],
+                'low_discrimination_questions': [
+                    q for q in analytics_data
+                    if q['discrimination'] is not None and q['discrimination'] < LOW_DISCRIMINATION
+                ]
             }
         }
         
@@ -2931,19 +2970,19 @@ def question_detail_analytics(request, course_id, exam_id, question_id):
             attempt__status='completed'
         ).select_related('attempt', 'attempt__user')
         
-        total_attempts = user_answers.count()
-        correct_attempts = user_answers.filter(is_correct=True).count()
+        stats = get_question_analytics(exam.id)['questions'].get(str(question.id)) or empty_question_stats()
+        total_attempts = stats['total_attempts']
+        correct_attempts = stats['correct_attempts']
         success_rate = round((correct_attempts / total_attempts * 100), 2) if total_attempts > 0 else 0
         
         # Time analytics
-        time_data = user_answers.exclude(time_taken_seconds=0).values_list('time_taken_seconds', flat=True)
-        average_time_spent = round(sum(time_data) / len(time_data), 2) if time_data else 0
+        average_time_spent = stats['average_time_spent']
         
         # Answer choice analytics (for multiple choice questions)
         answer_choices_stats = []
         if question.question_type == 'multiple_choice':
             for answer in question.answers.all():
-                times_selected = user_answers.filter(selected_answers=answer).count()
+                times_selected = stats['selections'].get(str(answer.id), 0)
                 selection_percentage = round((times_selected / total_attempts * 100), 2) if total_attempts > 0 else 0
                 
                 answer_choices_stats.append({
@@ -2996,7 +3035,9 @@ def question_detail_analytics(request, course_id, exam_id, question_id):
                 'total_attempts': total_attempts,
                 'correct_attempts': correct_attempts,
                 'success_rate': success_rate,
-                'average_time_spent': average_time_spent
+                'average_time_spent': average_time_spent,
+                'p_value': stats['p_value'],
+                'discrimination': stats['discrimination']
             },
             'answer_choices_analytics': answer_choices_stats,
             'recent_attempts': recent_attempts,
@@ -3060,48 +3101,18 @@ def exam_performance_trends(request, course_id, exam_id):
         )
     
     try:
-        from django.db.models import Count, Avg, Q
-        from datetime import datetime, timedelta
-        
-        # Get date range from query params
-        days = int(request.GET.get('days', 30))
-        start_date = timezone.now() - timedelta(days=days)
-        
-        # Daily performance trends
-        daily_trends = UserExamAttempt.objects.filter(
-            exam=exam,
-            status='completed',
-            completed_at__gte=start_date
-        ).extra(
-            select={'day': 'date(completed_at)'}
-        ).values('day').annotate(
-            total_attempts=Count('id'),
-            passed_attempts=Count('id', filter=Q(passed=True)),
-            average_score=Avg('percentage_score'),
-            average_time=Avg('time_taken_minutes')
-        ).order_by('day')
-        
-        # Weekly comparison
-        current_week = UserExamAttempt.objects.filter(
-            exam=exam,
-            status='completed',
-            completed_at__gte=timezone.now() - timedelta(days=7)
-        ).aggregate(
-            attempts=Count('id'),
-            pass_rate=Avg('passed', output_field=models.FloatField()),
-            avg_score=Avg('percentage_score')
-        )
+        # Get date range and bucket size from query params
+        days = min(max(int(request.GET.get('days', 30)), 1), 730)
+        bucket = request.GET.get('bucket', DEFAULT_BUCKET)
+        if bucket not in TREND_BUCKETS:
+            return Response(
+                {'detail': f"bucket must be one of: {', '.join(TREND_BUCKETS)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        previous_week = UserExamAttempt.objects.filter(
-            exam=exam,
-            status='completed',
-            completed_at__gte=timezone.now() - timedelta(days=14),
-            completed_at__lt=timezone.now() - timedelta(days=7)
-        ).aggregate(
-            attempts=Count('id'),
-            pass_rate=Avg('passed', output_field=models.FloatField()),
-            avg_score=Avg('percentage_score')
-        )
+        trends = get_exam_trends(exam.id, bucket=bucket, days=days)
+        current_week = trends['weekly_comparison']['current_week']
+        previous_week = trends['weekly_comparison']['previous_week']
         
         # Calculate trends
         attempts_trend = 0
@@ -3124,10 +3135,12 @@ def exam_performance_trends(request, course_id, exam_id):
             },
             'period': {
                 'days': days,
-                'start_date': start_date.date(),
-                'end_date': timezone.now().date()
+                'bucket': bucket,
+                'rolling_window': trends['rolling_window'],
+                'start_date': trends['start_date'],
+                'end_date': trends['end_date']
             },
-            'daily_trends': list(daily_trends),
+            'trends': trends['trends'],
             'weekly_comparison': {
                 'current_week': current_week,
                 'previous_week': previous_week,
@@ -3366,13 +3379,13 @@ def course_revenue_report(request):
         end_date = request.GET.get('end_date')
         course_type = request.GET.get('course_type')
         
-        # Base queryset
-        queryset = CourseEnrollment.objects.filter(payment_status='completed')
+        # Base queryset: paid enrollments rolled up per course and day
+        queryset = CourseDailyStat.objects.filter(paid_enrollments__gt=0)
         
         if start_date:
-            queryset = queryset.filter(enrolled_at__gte=start_date)
+            queryset = queryset.filter(date__gte=start_date)
         if end_date:
-            queryset = queryset.filter(enrolled_at__lte=end_date)
+            queryset = queryset.filter(date__lte=end_date)
         if course_type:
             queryset = queryset.filter(course__course_type=course_type)
         
@@ -3383,32 +3396,44 @@ def course_revenue_report(request):
             'course__course_type',
             'course__price'
         ).annotate(
-            total_revenue=Sum('amount_paid'),
-            enrollment_count=Count('id'),
-            avg_revenue_per_enrollment=Avg('amount_paid')
+            total_revenue=Sum('revenue'),
+            enrollment_count=Sum('paid_enrollments')
         ).order_by('-total_revenue')
         
+        revenue_by_course = [
+            {**row, 'avg_revenue_per_enrollment': row['total_revenue'] / row['enrollment_count']}
+            for row in revenue_by_course
+        ]
+        
         # Revenue by course type
         revenue_by_type = queryset.values('course__course_type').annotate(
-            total_revenue=Sum('amount_paid'),
-            enrollment_count=Count('id')
+            total_revenue=Sum('revenue'),
+            enrollment_count=Sum('paid_enrollments')
         ).order_by('-total_revenue')
         
         # Monthly revenue trend
-        monthly_revenue = queryset.extra(
-            select={'month': "TO_CHAR(enrolled_at, 'YYYY-MM')"}
-        ).values('month').annotate(
-            revenue=Sum('amount_paid'),
-            enrollments=Count('id')
-        ).order_by('month')
-
+        monthly_revenue = queryset.annotate(month_start=TruncMonth('date')).values('month_start').annotate(
+            revenue=Sum('revenue'),
+            enrollments=Sum('paid_enrollments')
+        ).order_by('month_start')
+        
+        monthly_trend = [
+            {
+                'month': row['month_start'].strftime('%Y-%m'),
+                'revenue': row['revenue'],
+                'enrollments': row['enrollments']
+            }
+            for row in monthly_revenue
+        ]
+        
+        totals = queryset.aggregate(revenue=Sum('revenue'), enrollments=Sum('paid_enrollments'))
         
         return Response({
-            'revenue_by_course': list(revenue_by_course),
+            'revenue_by_course': revenue_by_course,
             'revenue_by_type': list(revenue_by_type),
-            'monthly_trend': list(monthly_revenue),
-            'total_revenue': queryset.aggregate(total=Sum('amount_paid'))['total'] or 0,
-            'total_enrollments': queryset.count()
+            'monthly_trend': monthly_trend,
+            'total_revenue': totals['revenue'] or 0,
+            'total_enrollments': totals['enrollments'] or 0
         }, status=status.HTTP_200_OK)
     
     except Exception as e:
@@ -3666,15 +3691,10 @@ def instructor_dashboard(request):
 def get_all_students(request):
     """
     Instructor: Get all registered students who have paid during registration
-    GET /api/admin/students/
+    GET /api/admin/students/?search=&sort_by=-date_joined (whole roster) or &page=1&per_page=50
+    GET /api/admin/students/?export=csv streams the whole (filtered) roster
     """
     try:
-        from users.models import User
-        
-        logger.info(f"get_all_students called by instructor: {request.user.email}")
-        logger.info(f"User role: {request.user.role}")
-        logger.info(f"User ID: {request.user.id}")
-        
         # Check if user is instructor or admin
         if request.user.role not in ['instructor', 'admin']:
             logger.warning(f"User {request.user.email} with role {request.user.role} tried to access instructor endpoint")
@@ -3683,75 +3703,44 @@ def get_all_students(request):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        # Get all students who have paid during registration
-        # These students have access to all courses uploaded by the instructor
-        students = User.objects.filter(
-            role='student',
-            is_active=True
-        ).select_related().order_by('-date_joined')
+        search = request.GET.get('search', '').strip()
+        sort_by = request.GET.get('sort_by', DEFAULT_ROSTER_SORT)
         
-        logger.info(f"Found {students.count()} students in database")
+        # All registered students have access to all courses uploaded by the instructor
+        students = student_roster(request.user, search=search, sort_by=sort_by)
+        total_courses = Course.objects.filter(created_by=request.user).count()
         
-        # Get courses created by this instructor
-        instructor_courses = Course.objects.filter(created_by=request.user)
-        logger.info(f"Found {instructor_courses.count()} courses created by instructor {request.user.email}")
+        if request.GET.get('export') == 'csv':
+            response = StreamingHttpResponse(iter_roster_csv(students, total_courses), content_type='text/csv')
+            response['Content-Disposition'] = 'attachment; filename="students.csv"'
+            return response
         
-        students_data = []
-        for student in students:
-            logger.info(f"Processing student: {student.email} (ID: {student.id})")
-            
-            # Get total courses available to this student
-            total_courses = instructor_courses.count()
-            
-            # Get courses this student has accessed/progressed in
-            accessed_courses = UserCourseProgress.objects.filter(
-                user=student,
-                course__created_by=request.user
-            ).count()
-            
-            # Get overall progress across all courses
-            total_progress = UserCourseProgress.objects.filter(
-                user=student,
-                course__created_by=request.user
-            ).aggregate(
-                avg_progress=Avg('progress_percentage')
-            )['avg_progress'] or 0
-            
-            # Get last activity across all courses
-            last_activity = UserCourseProgress.objects.filter(
-                user=student,
-                course__created_by=request.user
-            ).order_by('-last_accessed').first()
-
-            last_activity_time = last_activity.last_accessed if last_activity else student.date_joined
-            
-            student_data = {
-                'id': str(student.id),
-                'full_name': student.full_name,
-                'email': student.email,
-                'date_joined': student.date_joined,
-                'last_activity': last_activity_time,
-                'total_courses_available': total_courses,
-                'courses_accessed': accessed_courses,
-                'overall_progress': round(total_progress, 1),
-                'registration_payment_status': 'completed',  # All registered students have paid
-                'access_level': 'full_platform_access'  # Access to all courses
-            }
-            
-            students_data.append(student_data)
-            logger.info(f"Student data prepared: {student_data['email']} - {student_data['full_name']}")
+        # Paging is opt-in: without per_page the admin dashboard gets the whole roster
+        page = int(request.GET.get('page', 1))
+        if 'per_page' in request.GET:
+            per_page = min(int(request.GET['per_page']), 200)
+        else:
+            per_page = max(students.count(), 1)
         
-        response_data = {
-            'students': students_data,
-            'total_students': len(students_data),
-            'total_courses_available': instructor_courses.count(),
-            'platform_access_students': len(students_data)
-        }
+        paginator = Paginator(students, per_page)
+        page_obj = paginator.get_page(page)
+        students_data = roster_rows(page_obj.object_list, total_courses)
         
-        logger.info(f"Returning {len(students_data)} students to instructor {request.user.email}")
-        logger.info(f"Response data: {response_data}")
+        logger.info(f"Returning {len(students_data)} of {paginator.count} students to instructor {request.user.email}")
         
-        return Response(response_data, status=status.HTTP_200_OK)
+        return Response({
+            'students': students_data,
+            'total_students': paginator.count,
+            'total_courses_available': total_courses,
+            'platform_access_students': paginator.count,
+            'pagination': {
+                'current_page': page_obj.number,
+                'total_pages': paginator.num_pages,
+                'per_page': per_page,
+                'has_next': page_obj.has_next(),
+                'has_previous': page_obj.has_previous()
+            }
+        }, status=status.HTTP_200_OK)
         
     except Exception as e:
         logger.error(f"Get all students error: {str(e)}")
@@ -3777,37 +3766,31 @@ def instructor_stats(request):
         start_date = timezone.now() - timedelta(days=days)
         
         # Course statistics
-        total_courses = Course.objects.filter(instructor=user).count()
-        active_courses = Course.objects.filter(instructor=user, is_active=True).count()
-        suspended_courses = Course.objects.filter(instructor=user, status='suspended').count()
-        
-        # Enrollment statistics
-        total_enrollments = CourseEnrollment.objects.filter(
-            course__instructor=user
-        ).count()
-        
-        recent_enrollments = CourseEnrollment.objects.filter(
-            course__instructor=user,
-            enrolled_at__gte=start_date
-        ).count()
-        
-        # Revenue statistics
-        total_revenue = CourseEnrollment.objects.filter(
-            course__instructor=user,
-            payment_status='completed'
-        ).aggregate(total=Sum('amount_paid'))['total'] or 0
-        
-        recent_revenue = CourseEnrollment.objects.filter(
-            course__instructor=user,
-            payment_status='completed',
-            enrolled_at__gte=start_date
-        ).aggregate(total=Sum('amount_paid'))['total'] or 0
-        
-        # Student engagement
-        active_students = CourseEnrollment.objects.filter(
-            course__instructor=user,
-            user__last_activity__gte=start_date
-        ).values('user').distinct().count()
+        course_counts = Course.objects.filter(created_by=user).aggregate(
+            total=Count('id'),
+            active=Count('id', filter=Q(is_active=True)),
+            suspended=Count('id', filter=Q(moderation_status='suspended'))
+        )
+        total_courses = course_counts['total']
+        active_courses = course_counts['active']
+        suspended_courses = course_counts['suspended']
+        
+        # Enrollment and revenue statistics from the daily rollups
+        rollup = rollup_totals(
+            CourseDailyStat.objects.filter(course__created_by=user),
+            recent=Q(date__gte=stats_since(days))
+        )
+        total_enrollments = rollup['enrollments']
+        recent_enrollments = rollup['recent_enrollments']
+        total_revenue = rollup['revenue']
+        recent_revenue = rollup['recent_revenue']
+        
+        # Student engagement, including activity not yet flushed from the cache
+        students = User.objects.filter(
+            id__in=CourseEnrollment.objects.filter(course__created_by=user).values('user')
+        ).only('id', 'last_activity')
+        last_activity = get_last_activity_map(students)
+        active_students = sum(1 for seen in last_activity.values() if seen and seen >= start_date)
         
         stats_data = {
             'period': f'Last {days} days',
@@ -3825,9 +3808,7 @@ def instructor_stats(request):
                 'recent': float(recent_revenue)
             },
             'students': {
-                'total': CourseEnrollment.objects.filter(
-                    course__instructor=user
-                ).values('user').distinct().count(),
+                'total': len(last_activity),
                 'active': active_students
             }
         }
@@ -3855,78 +3836,93 @@ def get_comprehensive_analytics(request):
         # Date range filters
         days = int(request.GET.get('days', 30))
         start_date = timezone.now() - timedelta(days=days)
+        stats_start = stats_since(days)
+        previous_start = stats_start - timedelta(days=days)
         
         # Course Analytics
-        total_courses = Course.objects.count()
-        active_courses = Course.objects.filter(is_active=True).count()
-        pending_courses = Course.objects.filter(moderation_status='pending').count()
-        approved_courses = Course.objects.filter(moderation_status='approved').count()
+        course_counts = Course.objects.aggregate(
+            total=Count('id'),
+            active=Count('id', filter=Q(is_active=True)),
+            pending=Count('id', filter=Q(moderation_status='pending')),
+            approved=Count('id', filter=Q(moderation_status='approved'))
+        )
+        total_courses = course_counts['total']
+        active_courses = course_counts['active']
+        pending_courses = course_counts['pending']
+        approved_courses = course_counts['approved']
         
         # Course performance by category
-        course_categories = Course.objects.values('category__name').annotate(
-            count=Count('id'),
-            avg_rating=Avg('reviews__rating'),
-            total_enrollments=Count('enrollments')
-        ).order_by('-total_enrollments')
+        category_stats = {
+            row['course__category__name']: row
+            for row in CourseDailyStat.objects.values('course__category__name').annotate(
+                total_enrollments=Sum('enrollments'),
+                reviews=Sum('reviews'),
+                rating_total=Sum('rating_total')
+            ).order_by()
+        }
+        course_categories = []
+        for row in Course.objects.values('category__name').annotate(count=Count('id')).order_by():
+            stats = category_stats.get(row['category__name'], {})
+            course_categories.append({
+                'category__name': row['category__name'],
+                'count': row['count'],
+                'avg_rating': average_rating(stats) if stats.get('reviews') else None,
+                'total_enrollments': stats.get('total_enrollments') or 0
+            })
+        course_categories.sort(key=lambda category: category['total_enrollments'], reverse=True)
         
         # Student Analytics
-        total_students = User.objects.filter(role='student').count()
-        active_students = User.objects.filter(
-            role='student',
-            last_login__gte=start_date
-        ).count()
-        new_students_month = User.objects.filter(
-            role='student',
-            date_joined__gte=start_date
-        ).count()
-        
-        # Enrollment Analytics
-        total_enrollments = CourseEnrollment.objects.count()
-        recent_enrollments = CourseEnrollment.objects.filter(
-            enrolled_at__gte=start_date
-        ).count()
-        completed_courses = UserCourseProgress.objects.filter(
-            progress_percentage=100
-        ).count()
-        
-        # Revenue Analytics
-        total_revenue = CourseEnrollment.objects.filter(
-            payment_status='completed'
-        ).aggregate(total=Sum('amount_paid'))['total'] or 0
-        
-        monthly_revenue = CourseEnrollment.objects.filter(
-            payment_status='completed',
-            enrolled_at__gte=start_date
-        ).aggregate(total=Sum('amount_paid'))['total'] or 0
+        user_counts = User.objects.aggregate(
+            total_users=Count('id'),
+            total_students=Count('id', filter=Q(role='student')),
+            active_students=Count('id', filter=Q(role='student', last_login__gte=start_date)),
+            new_students=Count('id', filter=Q(role='student', date_joined__gte=start_date)),
+            total_instructors=Count('id', filter=Q(role='instructor')),
+            total_admins=Count('id', filter=Q(role='admin'))
+        )
+        total_students = user_counts['total_students']
+        active_students = user_counts['active_students']
+        new_students_month = user_counts['new_students']
+        
+        # Enrollment and revenue analytics from the daily rollups
+        rollup = rollup_totals(
+            CourseDailyStat.objects.all(),
+            recent=Q(date__gte=stats_start),
+            previous=Q(date__gte=previous_start, date__lt=stats_start)
+        )
+        total_enrollments = rollup['enrollments']
+        recent_enrollments = rollup['recent_enrollments']
+        completed_courses = rollup['completions']
+        
+        total_revenue = rollup['revenue']
+        monthly_revenue = rollup['recent_revenue']
         
         # Calculate previous period for growth comparison
-        previous_start = start_date - timedelta(days=days)
-        previous_revenue = CourseEnrollment.objects.filter(
-            payment_status='completed',
-            enrolled_at__gte=previous_start,
-            enrolled_at__lt=start_date
-        ).aggregate(total=Sum('amount_paid'))['total'] or 0
+        previous_revenue = rollup['previous_revenue']
         
         revenue_growth = 0
         if previous_revenue > 0:
             revenue_growth = ((monthly_revenue - previous_revenue) / previous_revenue) * 100
         
         # Top performing courses
-        top_courses = Course.objects.annotate(
-            revenue=Sum('enrollments__amount_paid', filter=Q(enrollments__payment_status='completed')),
-            enrollment_count=Count('enrollments'),
-            avg_rating=Avg('reviews__rating')
+        top_courses = CourseDailyStat.objects.values(
+            'course_id', 'course__title', 'course__category__name'
+        ).annotate(
+            revenue=Sum('revenue'),
+            enrollment_count=Sum('enrollments'),
+            reviews=Sum('reviews'),
+            rating_total=Sum('rating_total')
         ).filter(revenue__gt=0).order_by('-revenue')[:5]
         
         top_courses_data = []
         for course in top_courses:
             top_courses_data.append({
-                'id': str(course.id),
-                'title': course.title,
-                'revenue': float(course.revenue or 0),
-                'enrollments': course.enrollment_count,
-                'avg_rating': float(course.avg_rating or 0),
-                'category': course.category.name if course.category else 'Uncategorized'
+                'id': str(course['course_id']),
+                'title': course['course__title'],
+                'revenue': float(course['revenue'] or 0),
+                'enrollments': course['enrollment_count'],
+                'avg_rating': float(average_rating(course)),
+                'category': course['course__category__name'] or 'Uncategorized'
             })
         
         # User engagement metrics
@@ -3955,14 +3951,14 @@ def get_comprehensive_analytics(request):
         # Recent course completions
         recent_completions = UserCourseProgress.objects.filter(
             progress_percentage=100,
-            updated_at__gte=week_ago
-        ).select_related('user', 'course')[:10]
+            completed_at__gte=week_ago
+        ).select_related('user', 'course').order_by('-completed_at')[:10]
         
         for completion in recent_completions:
             recent_activity.append({
                 'type': 'completion',
                 'description': f"{completion.user.full_name} completed {completion.course.title}",
-                'timestamp': completion.updated_at.strftime('%Y-%m-%d %H:%M'),
+                'timestamp': completion.completed_at.strftime('%Y-%m-%d %H:%M'),
                 'user': completion.user.full_name,
                 'course': completion.course.title
             })
@@ -3989,9 +3985,9 @@ def get_comprehensive_analytics(request):
         
         # Platform health metrics
         platform_metrics = {
-            'total_users': User.objects.count(),
-            'total_instructors': User.objects.filter(role='instructor').count(),
-            'total_admins': User.objects.filter(role='admin').count(),
+            'total_users': user_counts['total_users'],
+            'total_instructors': user_counts['total_instructors'],
+            'total_admins': user_counts['total_admins'],
             'system_uptime': '99.9%',  # This would come from monitoring
             'last_backup': timezone.now().strftime('%Y-%m-%d %H:%M')
         }
@@ -0,0 +1,100 @@
+# courses/management/commands/rebuild_course_progress.py
+from collections import defaultdict
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.utils import timezone
+from courses.models import Course, CourseSection, CourseLesson, UserCourseProgress, UserLessonProgress
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the incremental course progress counters from lesson progress records'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--course',
+            type=str,
+            help='Only rebuild progress for this course ID',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of progress rows written per UPDATE (default: 500)',
+        )
+
+    def handle(self, *args, **options):
+        courses = Course.objects.all()
+        if options['course']:
+            courses = courses.filter(id=options['course'])
+
+        total_updated = 0
+        for course in courses.iterator():
+            updated = self.rebuild_course(course, options['batch_size'])
+            total_updated += updated
+            self.stdout.write(f"Rebuilt {updated} progress records for {course.title}")
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt {total_updated} course progress records")
+        )
+
+    def rebuild_course(self, course, batch_size):
+        section_ids = [
+            str(section_id) for section_id in CourseSection.objects.filter(
+                course=course, is_active=True
+            ).values_list('id', flat=True)
+        ]
+
+        section_lesson_totals = dict.fromkeys(section_ids, 0)
+        total_required_lessons = 0
+        for lesson in CourseLesson.objects.filter(
+            section__course=course, section__is_active=True, is_active=True
+        ).values('section_id', 'require_completion'):
+            section_lesson_totals[str(lesson['section_id'])] += 1
+            if lesson['require_completion']:
+                total_required_lessons += 1
+
+        # Completed active lessons grouped per user and section
+        section_counts = defaultdict(dict)
+        required_counts = defaultdict(int)
+        completed_rows = UserLessonProgress.objects.filter(
+            lesson__section__course=course,
+            lesson__section__is_active=True,
+            lesson__is_active=True,
+            is_completed=True
+        ).values('user_id', 'lesson__section_id', 'lesson__require_completion').annotate(completed=Count('id'))
+
+        for row in completed_rows:
+            section_id = str(row['lesson__section_id'])
+            counts = section_counts[row['user_id']]
+            counts[section_id] = counts.get(section_id, 0) + row['completed']
+            if row['lesson__require_completion']:
+                required_counts[row['user_id']] += row['completed']
+
+        now = timezone.now()
+        progress_records = list(UserCourseProgress.objects.filter(course=course))
+        for progress in progress_records:
+            counts = section_counts.get(progress.user_id, {})
+            progress.section_completed_counts = counts
+            progress.completed_lessons_count = required_counts.get(progress.user_id, 0)
+            progress.sections_completed = [
+                section_id for section_id in section_ids
+                if counts.get(section_id, 0) >= section_lesson_totals[section_id]
+            ]
+
+            if total_required_lessons > 0:
+                new_progress = round((progress.completed_lessons_count / total_required_lessons) * 100, 2)
+                progress.progress_percentage = min(100, int(new_progress))
+
+            # bulk_update skips save(), so mirror its completed_at handling
+            if progress.progress_percentage == 100 and not progress.completed_at:
+                progress.completed_at = now
+            elif progress.progress_percentage < 100:
+                progress.completed_at = None
+
+        UserCourseProgress.objects.bulk_update(
+            progress_records,
+            ['section_completed_counts', 'completed_lessons_count', 'sections_completed',
+             'progress_percentage', 'completed_at'],
+            batch_size=batch_size
+        )
+        return len(progress_records)
@@ -0,0 +1,66 @@
+# courses/management/commands/reconcile_course_stats.py
+from datetime import datetime, timedelta
+from django.core.management.base import BaseCommand
+from django.db.models import Min
+from django.utils import timezone
+from courses.models import CourseEnrollment, UserCourseProgress
+from courses.rollups import reconcile_course_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily course rollups (CourseDailyStat) from enrollments, progress and reviews'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date',
+            type=str,
+            help='Reconcile a specific date (YYYY-MM-DD)',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=1,
+            help='Number of days up to yesterday to reconcile (default: 1)',
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Rebuild the whole history up to today',
+        )
+        parser.add_argument(
+            '--course',
+            type=str,
+            help='Only reconcile this course ID',
+        )
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+
+        if options['date']:
+            start_date = end_date = datetime.strptime(options['date'], '%Y-%m-%d').date()
+        elif options['all']:
+            first = min(filter(None, [
+                CourseEnrollment.objects.aggregate(first=Min('enrolled_at'))['first'],
+                UserCourseProgress.objects.aggregate(first=Min('started_at'))['first'],
+            ]), default=None)
+            start_date = timezone.localdate(first) if first else today
+            end_date = today
+        else:
+            end_date = today - timedelta(days=1)
+            start_date = end_date - timedelta(days=options['days'] - 1)
+
+        course_ids = [options['course']] if options['course'] else None
+
+        # Reconcile a month at a time to keep each rebuild transaction short
+        total_rows = 0
+        chunk_start = start_date
+        while chunk_start <= end_date:
+            chunk_end = min(chunk_start + timedelta(days=30), end_date)
+            rows = reconcile_course_stats(chunk_start, chunk_end, course_ids=course_ids)
+            total_rows += rows
+            self.stdout.write(f"Reconciled {rows} course-days from {chunk_start} to {chunk_end}")
+            chunk_start = chunk_end + timedelta(days=1)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Reconciled {total_rows} course-days from {start_date} to {end_date}")
+        )
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0009_rename_courses_categor_33f89e_idx_courses_categor_2870c7_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usercourseprogress',
+            name='completed_lessons_count',
+            field=models.PositiveIntegerField(default=0, help_text='Completed required lessons in active sections (maintained incrementally)'),
+        ),
+        migrations.AddField(
+            model_name='usercourseprogress',
+            name='section_completed_counts',
+            field=models.JSONField(blank=True, default=dict, help_text='Completed active lessons per section ID (maintained incrementally)'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0010_usercourseprogress_completion_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('enrollments', models.IntegerField(default=0)),
+                ('paid_enrollments', models.IntegerField(default=0)),
+                ('paying_enrollments', models.IntegerField(default=0, help_text='Completed payments with a non-zero amount')),
+                ('pending_payments', models.IntegerField(default=0)),
+                ('failed_payments', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('progress_started', models.IntegerField(default=0)),
+                ('progress_percentage_total', models.IntegerField(default=0, help_text='Sum of current progress of progress started that day')),
+                ('completions', models.IntegerField(default=0)),
+                ('reviews', models.IntegerField(default=0)),
+                ('approved_reviews', models.IntegerField(default=0)),
+                ('rating_total', models.IntegerField(default=0)),
+                ('active_users', models.IntegerField(default=0)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='courses.course')),
+            ],
+            options={
+                'db_table': 'course_daily_stats',
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['date'], name='course_dail_date_ea7060_idx')],
+                'unique_together': {('course', 'date')},
+            },
+        ),
+    ]
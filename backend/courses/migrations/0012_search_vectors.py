@@ -0,0 +1,103 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:36
+
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# search_vector is maintained by triggers so bulk writes and raw SQL keep it
+# current. A course's document includes its category name, so renaming a
+# category touches its courses to re-fire their trigger.
+POSTGRES_FORWARD = """
+CREATE OR REPLACE FUNCTION courses_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(NEW.description, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(
+            (SELECT name FROM course_categories WHERE id = NEW.category_id), ''
+        )), 'C');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER courses_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, description, category_id ON courses
+    FOR EACH ROW EXECUTE FUNCTION courses_search_vector_update();
+
+CREATE OR REPLACE FUNCTION course_categories_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    UPDATE courses SET category_id = category_id WHERE category_id = NEW.id;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER course_categories_search_vector_trigger
+    AFTER UPDATE OF name ON course_categories
+    FOR EACH ROW EXECUTE FUNCTION course_categories_search_vector_update();
+
+CREATE OR REPLACE FUNCTION course_exams_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(NEW.description, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER course_exams_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, description ON course_exams
+    FOR EACH ROW EXECUTE FUNCTION course_exams_search_vector_update();
+
+UPDATE courses SET title = title;
+UPDATE course_exams SET title = title;
+
+CREATE INDEX courses_search_vector_gin ON courses USING gin (search_vector);
+CREATE INDEX courses_title_trgm ON courses USING gin (title gin_trgm_ops);
+CREATE INDEX course_exams_search_vector_gin ON course_exams USING gin (search_vector);
+CREATE INDEX course_exams_title_trgm ON course_exams USING gin (title gin_trgm_ops);
+"""
+
+POSTGRES_REVERSE = """
+DROP INDEX IF EXISTS course_exams_title_trgm;
+DROP INDEX IF EXISTS course_exams_search_vector_gin;
+DROP INDEX IF EXISTS courses_title_trgm;
+DROP INDEX IF EXISTS courses_search_vector_gin;
+DROP TRIGGER IF EXISTS course_exams_search_vector_trigger ON course_exams;
+DROP FUNCTION IF EXISTS course_exams_search_vector_update();
+DROP TRIGGER IF EXISTS course_categories_search_vector_trigger ON course_categories;
+DROP FUNCTION IF EXISTS course_categories_search_vector_update();
+DROP TRIGGER IF EXISTS courses_search_vector_trigger ON courses;
+DROP FUNCTION IF EXISTS courses_search_vector_update();
+"""
+
+
+def create_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(POSTGRES_FORWARD)
+
+
+def drop_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(POSTGRES_REVERSE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0011_course_daily_stat'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='course',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='courseexam',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_triggers, drop_search_triggers),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0012_search_vectors'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='userexamattempt',
+            name='user_exam_a_exam_id_929ab1_idx',
+        ),
+        migrations.AddIndex(
+            model_name='userexamattempt',
+            index=models.Index(fields=['exam', 'status', 'completed_at'], name='user_exam_a_exam_id_e00c3a_idx'),
+        ),
+    ]
@@ -1,10 +1,11 @@
 # courses/models.py
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import URLValidator, MinValueValidator, MaxValueValidator
 from django.utils import timezone
 from users.models import User
 from cloudinary.models import CloudinaryField
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.search import SearchVectorField
 import uuid
 import random
 import string
@@ -15,6 +16,41 @@ def set_category_to_all():
     from .models import CourseCategory
     return CourseCategory.objects.get(slug="all")
 
+
+class CourseQuerySet(models.QuerySet):
+    def with_catalog_stats(self):
+        """
+        Annotate the aggregates CourseSerializer exposes so a catalog page
+        is fetched in one round trip instead of six queries per course.
+        """
+        from django.db.models import OuterRef, Subquery, Count, Avg, Sum, Q, IntegerField, FloatField, DecimalField
+        from django.db.models.functions import Coalesce
+
+        def course_subquery(queryset, aggregate, output_field):
+            rows = queryset.filter(course=OuterRef('pk')).order_by().values('course')
+            return Subquery(rows.annotate(value=aggregate).values('value')[:1], output_field=output_field)
+
+        progress = UserCourseProgress.objects.all()
+        paid_enrollments = CourseEnrollment.objects.filter(
+            is_active=True,
+            payment_status='completed',
+            amount_paid__isnull=False
+        )
+        approved_reviews = CourseReview.objects.filter(is_approved=True)
+
+        return self.annotate(
+            progress_count=Coalesce(course_subquery(progress, Count('id'), IntegerField()), 0),
+            completed_progress_count=Coalesce(
+                course_subquery(progress, Count('id', filter=Q(progress_percentage=100)), IntegerField()), 0
+            ),
+            avg_progress=course_subquery(progress, Avg('progress_percentage'), FloatField()),
+            revenue_total=course_subquery(
+                paid_enrollments, Sum('amount_paid'), DecimalField(max_digits=12, decimal_places=2)
+            ),
+            approved_review_count=Coalesce(course_subquery(approved_reviews, Count('id'), IntegerField()), 0),
+            avg_rating=course_subquery(approved_reviews, Avg('rating'), FloatField()),
+        )
+
 # Create your models here.
 class Course(models.Model):
     COURSE_TYPES = (
@@ -183,6 +219,12 @@ class Course(models.Model):
         related_name='updated_courses'
     )
     
+    # Weighted title/description/category document, maintained by a PostgreSQL
+    # trigger (see courses/search.py); always NULL on other databases
+    search_vector = SearchVectorField(null=True, editable=False)
+    
+    objects = CourseQuerySet.as_manager()
+    
     class Meta:
         db_table = 'courses'
         ordering = ['-created_at']
@@ -384,23 +426,8 @@ class CourseSection(models.Model):
         if self.is_preview:
             return True
         
-        # Check if user is enrolled
-        if not UserCourseProgress.objects.filter(user=user, course=self.course).exists():
-            return False
-        
-        # Check if previous sections are completed (if required)
-        if self.required_previous_completion:
-            previous_sections = CourseSection.objects.filter(
-                course=self.course,
-                order__lt=self.order,
-                is_active=True
-            )
-            
-            for prev_section in previous_sections:
-                if prev_section.get_completion_rate(user) < 100:
-                    return False
-        
-        return True
+        from .access import CourseAccess
+        return CourseAccess(user, self.course_id).is_section_accessible(self.id)
 
 class CourseLesson(models.Model):
     """Individual lessons within course sections"""
@@ -533,31 +560,42 @@ class CourseLesson(models.Model):
         if self.is_preview:
             return True
         
-        # Check section accessibility
-        if not self.section.is_accessible_by_user(user):
-            return False
+        from .access import CourseAccess
+        return CourseAccess(user, self.section.course_id).is_lesson_accessible(self.id)
+    
+    def get_next_lesson_id(self):
+        """Id of the next lesson in play order, from the cached course play order"""
+        from .outline import adjacent_lesson_id
         
-        # Check if previous lessons in this section are completed
-        if self.require_completion:
-            previous_lessons = CourseLesson.objects.filter(
-                section=self.section,
-                order__lt=self.order,
-                is_active=True,
-                require_completion=True
-            )
-            
-            for prev_lesson in previous_lessons:
-                try:
-                    progress = UserLessonProgress.objects.get(user=user, lesson=prev_lesson)
-                    if not progress.is_completed:
-                        return False
-                except UserLessonProgress.DoesNotExist:
-                    return False
+        lesson_id = adjacent_lesson_id(self.section.course_id, self.id, 1)
+        if lesson_id is False:
+            # Inactive lessons are not in the play order
+            next_lesson = self._query_next_lesson()
+            return str(next_lesson.id) if next_lesson else None
+        return lesson_id
+    
+    def get_previous_lesson_id(self):
+        """Id of the previous lesson in play order, from the cached course play order"""
+        from .outline import adjacent_lesson_id
         
-        return True
+        lesson_id = adjacent_lesson_id(self.section.course_id, self.id, -1)
+        if lesson_id is False:
+            previous_lesson = self._query_previous_lesson()
+            return str(previous_lesson.id) if previous_lesson else None
+        return lesson_id
     
     def get_next_lesson(self):
         """Get the next lesson in sequence"""
+        lesson_id = self.get_next_lesson_id()
+        return CourseLesson.objects.filter(id=lesson_id).first() if lesson_id else None
+    
+    def get_previous_lesson(self):
+        """Get the previous lesson in sequence"""
+        lesson_id = self.get_previous_lesson_id()
+        return CourseLesson.objects.filter(id=lesson_id).first() if lesson_id else None
+    
+    def _query_next_lesson(self):
+        """Next lesson looked up with queries, for lessons outside the play order"""
         # Try next lesson in same section
         next_in_section = CourseLesson.objects.filter(
             section=self.section,
@@ -580,8 +618,8 @@ class CourseLesson(models.Model):
         
         return None
     
-    def get_previous_lesson(self):
-        """Get the previous lesson in sequence"""
+    def _query_previous_lesson(self):
+        """Previous lesson looked up with queries, for lessons outside the play order"""
         # Try previous lesson in same section
         prev_in_section = CourseLesson.objects.filter(
             section=self.section,
@@ -654,6 +692,13 @@ class UserLessonProgress(models.Model):
     def __str__(self):
         return f"{self.user.full_name} - {self.lesson.title} ({self.watch_percentage}%)"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored completion state so save() can detect a flip
+        instance._stored_is_completed = instance.__dict__.get('is_completed', False)
+        return instance
+    
     def save(self, *args, **kwargs):
         # Auto-complete if watch percentage exceeds minimum
         min_percentage = self.lesson.minimum_watch_percentage
@@ -666,53 +711,29 @@ class UserLessonProgress(models.Model):
         
         super().save(*args, **kwargs)
         
-        # Update course progress
-        self.update_course_progress()
-    
-    def update_course_progress(self):
-        """Update overall course progress for the user"""
-        try:
-            course_progress = UserCourseProgress.objects.get(
-                user=self.user,
-                course=self.lesson.section.course
-            )
-            
-            # Calculate overall progress
-            total_required_lessons = CourseLesson.objects.filter(
-                section__course=course_progress.course,
-                section__is_active=True,
-                is_active=True,
-                require_completion=True
-            ).count()
-            
-            if total_required_lessons == 0:
+        # Only a persisted completion flip changes course progress
+        update_fields = kwargs.get('update_fields')
+        was_completed = getattr(self, '_stored_is_completed', False)
+        if (update_fields is None or 'is_completed' in update_fields) and self.is_completed != was_completed:
+            self._stored_is_completed = self.is_completed
+            self.update_course_progress(1 if self.is_completed else -1)
+    
+    def update_course_progress(self, delta):
+        """Apply a completion flip of this lesson (+1/-1) to the user's course progress"""
+        lesson = self.lesson
+        if not (lesson.is_active and lesson.section.is_active):
+            return
+        
+        with transaction.atomic():
+            try:
+                course_progress = UserCourseProgress.objects.select_for_update().get(
+                    user_id=self.user_id,
+                    course_id=lesson.section.course_id
+                )
+            except UserCourseProgress.DoesNotExist:
                 return
             
-            completed_lessons = UserLessonProgress.objects.filter(
-                user=self.user,
-                lesson__section__course=course_progress.course,
-                lesson__section__is_active=True,
-                lesson__is_active=True,
-                lesson__require_completion=True,
-                is_completed=True
-            ).count()
-            
-            new_progress = round((completed_lessons / total_required_lessons) * 100, 2)
-            
-            if new_progress != course_progress.progress_percentage:
-                course_progress.progress_percentage = min(100, int(new_progress))
-                
-                # Update completed sections list
-                completed_sections = []
-                for section in course_progress.course.sections.filter(is_active=True):
-                    if section.get_completion_rate(self.user) == 100:
-                        completed_sections.append(str(section.id))
-                
-                course_progress.sections_completed = completed_sections
-                course_progress.save()
-        
-        except UserCourseProgress.DoesNotExist:
-            pass
+            course_progress.apply_lesson_completion(lesson, delta)
     
     def add_bookmark(self, position_seconds, title="", description=""):
         """Add a bookmark at specific position"""
@@ -769,6 +790,15 @@ class UserCourseProgress(models.Model):
     
     # Optional: Track specific section IDs or milestones
     sections_completed = models.JSONField(default=list, blank=True, help_text="List of completed section IDs")
+    completed_lessons_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Completed required lessons in active sections (maintained incrementally)"
+    )
+    section_completed_counts = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Completed active lessons per section ID (maintained incrementally)"
+    )
     current_section_id = models.UUIDField(null=True, blank=True, help_text="Current section being studied")
     current_lesson_id = models.UUIDField(null=True, blank=True, help_text="Current lesson being studied")
     total_watch_time_seconds = models.PositiveIntegerField(default=0, help_text="Total time spent watching")
@@ -821,44 +851,135 @@ class UserCourseProgress(models.Model):
         self.progress_percentage = 0
         self.completed_at = None
         self.save(update_fields=['progress_percentage', 'completed_at'])
+    
+    def apply_lesson_completion(self, lesson, delta):
+        """
+        Adjust the completion counters for one lesson flipping to completed
+        (delta=1) or back to incomplete (delta=-1). Only the flipped section
+        is re-evaluated; run the rebuild_course_progress command to fix drift.
+        """
+        section_id = str(lesson.section_id)
+        counts = dict(self.section_completed_counts or {})
+        counts[section_id] = max(0, counts.get(section_id, 0) + delta)
+        self.section_completed_counts = counts
+        update_fields = ['section_completed_counts', 'sections_completed', 'last_accessed']
+        
+        if lesson.require_completion:
+            self.completed_lessons_count = max(0, self.completed_lessons_count + delta)
+            update_fields.append('completed_lessons_count')
+            
+            total_required_lessons = CourseLesson.objects.filter(
+                section__course_id=self.course_id,
+                section__is_active=True,
+                is_active=True,
+                require_completion=True
+            ).count()
+            
+            if total_required_lessons > 0:
+                new_progress = round((self.completed_lessons_count / total_required_lessons) * 100, 2)
+                self.progress_percentage = min(100, int(new_progress))
+                update_fields.extend(['progress_percentage', 'completed_at'])
+        
+        sections_completed = [sid for sid in (self.sections_completed or []) if sid != section_id]
+        if counts[section_id] >= lesson.section.total_lessons:
+            sections_completed.append(section_id)
+        self.sections_completed = sections_completed
+        
+        self.save(update_fields=update_fields)
 
+    def get_progress_tree(self):
+        """
+        Active sections and lessons of the course with this user's lesson progress,
+        loaded in three queries and cached on the instance.
+        Returns {'sections': [(section, [lessons])], 'lessons': [...], 'progress': {lesson_id: progress}}
+        """
+        tree = getattr(self, '_progress_tree', None)
+        if tree is not None:
+            return tree
+        
+        sections = list(CourseSection.objects.filter(course_id=self.course_id, is_active=True).order_by('order'))
+        lessons_by_section = {section.id: [] for section in sections}
+        sections_by_id = {section.id: section for section in sections}
+        
+        lessons = []
+        for lesson in CourseLesson.objects.filter(section__in=sections, is_active=True).order_by('order'):
+            lesson.section = sections_by_id[lesson.section_id]
+            lessons_by_section[lesson.section_id].append(lesson)
+        
+        # Flatten in play order: section order first, then lesson order
+        for section in sections:
+            lessons.extend(lessons_by_section[section.id])
+        
+        progress = {
+            lesson_progress.lesson_id: lesson_progress
+            for lesson_progress in UserLessonProgress.objects.filter(
+                user_id=self.user_id,
+                lesson__in=lessons
+            ).order_by()
+        }
+        
+        self._progress_tree = {
+            'sections': [(section, lessons_by_section[section.id]) for section in sections],
+            'lessons': lessons,
+            'progress': progress,
+        }
+        return self._progress_tree
+    
     def get_current_lesson(self):
         """Get the current lesson user should study next"""
+        tree = self.get_progress_tree()
+        
         if self.current_lesson_id:
+            for lesson in tree['lessons']:
+                if lesson.id == self.current_lesson_id:
+                    return lesson
             try:
                 return CourseLesson.objects.get(id=self.current_lesson_id)
             except CourseLesson.DoesNotExist:
                 pass
         
         # Find first incomplete lesson
-        for section in self.course.sections.filter(is_active=True).order_by('order'):
-            for lesson in section.lessons.filter(is_active=True, require_completion=True).order_by('order'):
-                try:
-                    lesson_progress = UserLessonProgress.objects.get(user=self.user, lesson=lesson)
-                    if not lesson_progress.is_completed:
-                        return lesson
-                except UserLessonProgress.DoesNotExist:
-                    return lesson
+        for lesson in tree['lessons']:
+            if not lesson.require_completion:
+                continue
+            lesson_progress = tree['progress'].get(lesson.id)
+            if lesson_progress is None or not lesson_progress.is_completed:
+                return lesson
         
         return None
     
+    def get_next_lesson_to_study(self):
+        """Get the lesson after the current one in play order"""
+        current_lesson = self.get_current_lesson()
+        if current_lesson is None:
+            return None
+        
+        lessons = self.get_progress_tree()['lessons']
+        for index, lesson in enumerate(lessons):
+            if lesson.id == current_lesson.id:
+                return lessons[index + 1] if index + 1 < len(lessons) else None
+        
+        # Current lesson is no longer active, fall back to the lesson's own lookup
+        return current_lesson.get_next_lesson()
+    
     def get_progress_by_section(self):
         """Get progress breakdown by section"""
+        tree = self.get_progress_tree()
         sections_progress = []
         
-        for section in self.course.sections.filter(is_active=True).order_by('order'):
+        for section, lessons in tree['sections']:
             section_progress = {
                 'section_id': str(section.id),
                 'section_title': section.title,
                 'section_order': section.order,
-                'total_lessons': section.lessons.filter(is_active=True, require_completion=True).count(),
+                'total_lessons': sum(1 for lesson in lessons if lesson.require_completion),
                 'completed_lessons': 0,
                 'completion_percentage': 0,
                 'is_completed': str(section.id) in self.sections_completed,
                 'lessons': []
             }
             
-            for lesson in section.lessons.filter(is_active=True).order_by('order'):
+            for lesson in lessons:
                 lesson_data = {
                     'lesson_id': str(lesson.id),
                     'lesson_title': lesson.title,
@@ -870,8 +991,8 @@ class UserCourseProgress(models.Model):
                     'current_position': 0
                 }
                 
-                try:
-                    lesson_progress = UserLessonProgress.objects.get(user=self.user, lesson=lesson)
+                lesson_progress = tree['progress'].get(lesson.id)
+                if lesson_progress is not None:
                     lesson_data.update({
                         'is_completed': lesson_progress.is_completed,
                         'watch_percentage': lesson_progress.watch_percentage,
@@ -881,9 +1002,6 @@ class UserCourseProgress(models.Model):
                     
                     if lesson_progress.is_completed and lesson.require_completion:
                         section_progress['completed_lessons'] += 1
-                        
-                except UserLessonProgress.DoesNotExist:
-                    pass
                 
                 section_progress['lessons'].append(lesson_data)
             
@@ -1025,6 +1143,49 @@ class CourseReview(models.Model):
         return f"{self.user.full_name} - {self.course.title} ({self.rating}★)"
 
 
+class CourseDailyStat(models.Model):
+    """
+    Daily per-course rollup for the admin dashboards, maintained by
+    courses/rollups.py. Enrollment counters and revenue are keyed by
+    enrolled_at, progress counters by started_at, completions by completed_at
+    and reviews by created_at.
+    """
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='daily_stats')
+    date = models.DateField()
+
+    # Enrollments
+    enrollments = models.IntegerField(default=0)
+    paid_enrollments = models.IntegerField(default=0)
+    paying_enrollments = models.IntegerField(default=0, help_text="Completed payments with a non-zero amount")
+    pending_payments = models.IntegerField(default=0)
+    failed_payments = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+
+    # Progress
+    progress_started = models.IntegerField(default=0)
+    progress_percentage_total = models.IntegerField(default=0, help_text="Sum of current progress of progress started that day")
+    completions = models.IntegerField(default=0)
+
+    # Reviews
+    reviews = models.IntegerField(default=0)
+    approved_reviews = models.IntegerField(default=0)
+    rating_total = models.IntegerField(default=0)
+
+    # Distinct students with lesson activity, written by the reconcile only
+    active_users = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'course_daily_stats'
+        unique_together = ['course', 'date']
+        ordering = ['-date']
+        indexes = [
+            models.Index(fields=['date']),
+        ]
+
+    def __str__(self):
+        return f"{self.course_id} stats - {self.date}"
+
+
 class CourseAppeal(models.Model):
     """Model to track course suspension appeals"""
     APPEAL_STATUS_CHOICES = [
@@ -1122,6 +1283,9 @@ class CourseExam(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='created_exams')
     
+    # Weighted title/description document, maintained by a PostgreSQL trigger (see courses/search.py)
+    search_vector = SearchVectorField(null=True, editable=False)
+    
     class Meta:
         db_table = 'course_exams'
         ordering = ['course', 'exam_type', 'title']
@@ -1172,6 +1336,30 @@ class CourseExam(models.Model):
         from django.db.models import Avg
         avg_score = self.attempts.filter(status='completed').aggregate(avg=Avg('percentage_score'))['avg']
         return round(avg_score, 2) if avg_score else 0
+    
+    def get_answer_key(self):
+        """
+        Compact answer key for scoring, loaded in two queries:
+        {question_id: {'question_type', 'points', 'correct_answers': [(answer_id, answer_text)]}}
+        """
+        answer_key = {
+            question['id']: {
+                'question_type': question['question_type'],
+                'points': question['points'],
+                'correct_answers': []
+            }
+            for question in self.questions.values('id', 'question_type', 'points')
+        }
+        
+        correct_answers = ExamAnswer.objects.filter(
+            question__exam=self,
+            is_correct=True
+        ).order_by('question_id', 'order').values_list('question_id', 'id', 'answer_text')
+        
+        for question_id, answer_id, answer_text in correct_answers:
+            answer_key[question_id]['correct_answers'].append((str(answer_id), answer_text))
+        
+        return answer_key
 
 
 class ExamQuestion(models.Model):
@@ -1235,21 +1423,28 @@ class ExamQuestion(models.Model):
     
     def validate_answer(self, user_answers):
         """Validate user's answer(s) against correct answers"""
-        if self.question_type == 'multiple_choice':
-            correct_answers = set(str(answer.id) for answer in self.get_correct_answers())
+        correct_answers = [(str(answer.id), answer.answer_text) for answer in self.get_correct_answers()]
+        return self.matches_answer_key(self.question_type, correct_answers, user_answers)
+    
+    @staticmethod
+    def matches_answer_key(question_type, correct_answers, user_answers):
+        """
+        Check user's answer(s) against a question's answer key, given as
+        (answer_id, answer_text) pairs of its correct answers in answer order
+        """
+        if question_type == 'multiple_choice':
+            correct_ids = set(answer_id for answer_id, answer_text in correct_answers)
             user_answer_ids = set(str(answer) for answer in (user_answers if isinstance(user_answers, list) else [user_answers]))
-            return correct_answers == user_answer_ids
+            return correct_ids == user_answer_ids
         
-        elif self.question_type == 'true_false':
-            correct_answer = self.get_correct_answers().first()
-            if correct_answer:
-                return str(user_answers).lower().strip() == str(correct_answer.answer_text).lower().strip()
+        elif question_type == 'true_false':
+            if correct_answers:
+                return str(user_answers).lower().strip() == str(correct_answers[0][1]).lower().strip()
             return False
         
-        elif self.question_type == 'fill_blank':
-            correct_answers = self.get_correct_answers().values_list('answer_text', flat=True)
+        elif question_type == 'fill_blank':
             user_answer = str(user_answers).lower().strip()
-            return any(answer.lower().strip() == user_answer for answer in correct_answers)
+            return any(answer_text.lower().strip() == user_answer for answer_id, answer_text in correct_answers)
         
         # Add more validation logic for other question types as needed
         return False
@@ -1327,7 +1522,8 @@ class UserExamAttempt(models.Model):
         unique_together = ['user', 'exam', 'attempt_number']
         indexes = [
             models.Index(fields=['user']),
-            models.Index(fields=['exam']),
+            # Completed attempts of an exam by date (analytics and trends)
+            models.Index(fields=['exam', 'status', 'completed_at']),
             models.Index(fields=['status']),
             models.Index(fields=['passed']),
         ]
@@ -1342,32 +1538,60 @@ class UserExamAttempt(models.Model):
             self.attempt_number = (last_attempt.attempt_number + 1) if last_attempt else 1
         super().save(*args, **kwargs)
     
-    def calculate_score(self):
-        """Calculate and update the score"""
-        user_answers = self.user_answers.all()
+    def calculate_score(self, commit=True):
+        """
+        Score all submitted answers against the exam's answer key in memory.
+        Loads the key and the answers once, writes changed answers with a
+        single bulk_update and updates the attempt totals.
+        """
+        answer_key = self.exam.get_answer_key()
+        user_answers = list(self.user_answers.prefetch_related('selected_answers'))
         
-        total_questions = user_answers.count()
         correct_count = 0
         total_points = 0
         earned_points = 0
+        changed_answers = []
         
         for user_answer in user_answers:
-            total_points += user_answer.question.points
-            if user_answer.is_correct:
+            question_key = answer_key.get(user_answer.question_id)
+            if question_key is None:
+                continue
+            
+            if question_key['question_type'] == 'multiple_choice':
+                submitted = [answer.id for answer in user_answer.selected_answers.all()]
+            else:
+                submitted = user_answer.text_answer or user_answer.answer_data
+            
+            is_correct = ExamQuestion.matches_answer_key(
+                question_key['question_type'], question_key['correct_answers'], submitted
+            )
+            points_earned = question_key['points'] if is_correct else 0
+            
+            if user_answer.is_correct != is_correct or user_answer.points_earned != points_earned:
+                user_answer.is_correct = is_correct
+                user_answer.points_earned = points_earned
+                changed_answers.append(user_answer)
+            
+            total_points += question_key['points']
+            if is_correct:
                 correct_count += 1
-                earned_points += user_answer.question.points
+                earned_points += question_key['points']
+        
+        if changed_answers:
+            UserExamAnswer.objects.bulk_update(changed_answers, ['is_correct', 'points_earned'])
         
-        self.total_questions = total_questions
+        self.total_questions = len(user_answers)
         self.correct_answers = correct_count
         self.total_points = total_points
         self.earned_points = earned_points
         self.percentage_score = (earned_points / total_points * 100) if total_points > 0 else 0
         self.passed = self.percentage_score >= self.exam.passing_score
         
-        self.save(update_fields=[
-            'total_questions', 'correct_answers', 'total_points', 
-            'earned_points', 'percentage_score', 'passed'
-        ])
+        if commit:
+            self.save(update_fields=[
+                'total_questions', 'correct_answers', 'total_points', 
+                'earned_points', 'percentage_score', 'passed'
+            ])
         
         return self.percentage_score
     
@@ -1381,7 +1605,8 @@ class UserExamAttempt(models.Model):
                 time_diff = self.completed_at - self.started_at
                 self.time_taken_minutes = int(time_diff.total_seconds() / 60)
             
-            self.calculate_score()
+            # Score and completion are written in one UPDATE
+            self.calculate_score(commit=False)
             self.save()
     
     def can_review(self):
@@ -1506,4 +1731,48 @@ class ExamCertificate(models.Model):
         """Check if certificate is expired"""
         if self.valid_until:
             return timezone.now() > self.valid_until
-        return False
\ No newline at end of file
+        return False
+
+class VideoUpload(models.Model):
+    """
+    Resumable video upload. Chunks are appended to a staging file
+    (courses/video_uploads.py) and a background task hands the assembled file
+    to the video storage backend once every byte has arrived.
+    """
+    KIND_CHOICES = [
+        ('course', 'Course Video'),
+        ('lesson', 'Lesson Video'),
+    ]
+    STATUS_CHOICES = [
+        ('uploading', 'Uploading'),
+        ('processing', 'Processing'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='video_uploads')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default='lesson')
+    filename = models.CharField(max_length=255)
+    total_size = models.BigIntegerField()
+    received_bytes = models.BigIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='uploading')
+
+    # video_info of the stored video once completed
+    result = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'video_uploads'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['uploaded_by', 'status']),
+            models.Index(fields=['status', 'updated_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.filename} ({self.status})"
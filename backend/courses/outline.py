@@ -0,0 +1,154 @@
+# courses/outline.py
+"""
+Versioned cache of the section/lesson outline of a course.
+
+The outline is identical for every student and only changes when an
+instructor edits, reorders or deletes sections and lessons, so it is built
+once per version and per-user progress is overlaid on top of it. Signals in
+courses/signals.py bump the version; bulk QuerySet.update() callers must
+call bump_course_outline_version() themselves.
+
+The play order (lesson ids of the outline flattened in order, with each
+id's position) is cached under the same version so next/previous lesson
+lookups need neither queries nor the whole outline.
+"""
+import copy
+from django.core.cache import cache
+from .models import CourseLesson, CourseSection, UserLessonProgress
+
+OUTLINE_VERSION_KEY = 'course_outline_version_{course_id}'
+OUTLINE_KEY = 'course_outline_{course_id}_v{version}'
+PLAY_ORDER_KEY = 'course_play_order_{course_id}_v{version}'
+OUTLINE_TIMEOUT = 60 * 60 * 24
+
+
+def get_outline_version(course_id):
+    return cache.get_or_set(OUTLINE_VERSION_KEY.format(course_id=course_id), 1, None)
+
+
+def bump_course_outline_version(course_id):
+    """Invalidate the cached outline of a course; old versions simply expire"""
+    key = OUTLINE_VERSION_KEY.format(course_id=course_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, None)
+
+
+def _file_url(value):
+    if not value:
+        return None
+    if hasattr(value, 'url'):
+        return value.url
+    return str(value)
+
+
+def build_course_outline(course_id):
+    """Serialize the active sections and lessons of a course in two queries"""
+    sections = list(
+        CourseSection.objects.filter(course_id=course_id, is_active=True).order_by('order')
+    )
+    lessons_by_section = {section.id: [] for section in sections}
+
+    for lesson in CourseLesson.objects.filter(section__in=sections, is_active=True).order_by('order'):
+        lessons_by_section[lesson.section_id].append({
+            'id': str(lesson.id),
+            'title': lesson.title,
+            'description': lesson.description,
+            'lesson_type': lesson.lesson_type,
+            'order': lesson.order,
+            'duration_seconds': lesson.duration_seconds,
+            'is_preview': lesson.is_preview,
+            'require_completion': lesson.require_completion,
+            'video_source': lesson.video_source,
+            'video_url': lesson.video_url,
+            'video_file': _file_url(lesson.video_file),
+            'video_streaming_url': lesson.video_streaming_url,
+            'text_content': lesson.text_content,
+            'thumbnail_url': _file_url(lesson.thumbnail),
+        })
+
+    return [
+        {
+            'id': str(section.id),
+            'title': section.title,
+            'description': section.description,
+            'order': section.order,
+            'is_preview': section.is_preview,
+            'total_lessons': section.total_lessons,
+            'total_duration_seconds': section.total_duration_seconds,
+            'lessons': lessons_by_section[section.id],
+        }
+        for section in sections
+    ]
+
+
+def get_course_outline(course_id):
+    """Cached outline (list of sections with their lessons) for a course"""
+    key = OUTLINE_KEY.format(course_id=course_id, version=get_outline_version(course_id))
+    outline = cache.get(key)
+    if outline is None:
+        outline = build_course_outline(course_id)
+        cache.set(key, outline, OUTLINE_TIMEOUT)
+    return outline
+
+
+def get_play_order(course_id):
+    """Cached {'lessons': [lesson ids in play order], 'positions': {lesson id: index}}"""
+    key = PLAY_ORDER_KEY.format(course_id=course_id, version=get_outline_version(course_id))
+    play_order = cache.get(key)
+    if play_order is None:
+        lessons = [lesson['id'] for section in get_course_outline(course_id) for lesson in section['lessons']]
+        play_order = {
+            'lessons': lessons,
+            'positions': {lesson_id: index for index, lesson_id in enumerate(lessons)},
+        }
+        cache.set(key, play_order, OUTLINE_TIMEOUT)
+    return play_order
+
+
+def adjacent_lesson_id(course_id, lesson_id, step):
+    """
+    Id of the lesson step places away in play order (1 next, -1 previous),
+    None at either end, or False if the lesson is not in the play order
+    (inactive lesson or section)
+    """
+    play_order = get_play_order(course_id)
+    index = play_order['positions'].get(str(lesson_id))
+    if index is None:
+        return False
+    index += step
+    if 0 <= index < len(play_order['lessons']):
+        return play_order['lessons'][index]
+    return None
+
+
+def get_course_outline_with_progress(course_id, user):
+    """
+    Copy of the cached outline with the user's lesson progress overlaid,
+    costing a single UserLessonProgress query
+    """
+    outline = copy.deepcopy(get_course_outline(course_id))
+    lesson_ids = [lesson['id'] for section in outline for lesson in section['lessons']]
+
+    progress = {
+        str(lesson_progress['lesson_id']): lesson_progress
+        for lesson_progress in UserLessonProgress.objects.filter(
+            user=user, lesson_id__in=lesson_ids
+        ).order_by().values('lesson_id', 'is_completed', 'watch_percentage', 'last_accessed')
+    }
+
+    for section in outline:
+        completed = 0
+        for lesson in section['lessons']:
+            lesson_progress = progress.get(lesson['id'])
+            lesson['is_completed'] = lesson_progress['is_completed'] if lesson_progress else False
+            lesson['watch_percentage'] = lesson_progress['watch_percentage'] if lesson_progress else 0
+            lesson['last_accessed'] = lesson_progress['last_accessed'] if lesson_progress else None
+            if lesson['is_completed']:
+                completed += 1
+
+        total = len(section['lessons'])
+        section['completion_rate'] = round((completed / total) * 100, 2) if total else 100
+
+    return outline
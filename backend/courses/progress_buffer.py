@@ -0,0 +1,228 @@
+# courses/progress_buffer.py
+"""
+Write-behind buffer for video player heartbeats.
+
+Heartbeats for a (user, lesson) pair are coalesced into a single cache entry
+holding the latest position and the max watch time, and a periodic task
+persists the dirty entries with one bulk_update. Heartbeats that flip lesson
+completion are still written synchronously so course progress stays exact.
+Requires a cache shared by all workers (Redis in production).
+"""
+import logging
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from .models import CourseEnrollment, CourseLesson, UserLessonProgress
+
+logger = logging.getLogger(__name__)
+
+ENTRY_KEY = 'lesson_progress_buffer:{user_id}:{lesson_id}'
+INDEX_KEY = 'lesson_progress_buffer:index'
+GENERATION_KEY = 'lesson_progress_buffer:generation'
+LOCK_KEY = 'lesson_progress_buffer:lock'
+LOCK_TIMEOUT = 10
+LOCK_ATTEMPTS = 5
+
+DEFAULT_BUFFER_SETTINGS = {
+    'ENABLED': False,
+    'ACCESS_CHECK_SECONDS': 300,
+    'ENTRY_TIMEOUT_SECONDS': 3600,
+    'FLUSH_BATCH_SIZE': 500,
+}
+
+
+def get_buffer_settings():
+    return {**DEFAULT_BUFFER_SETTINGS, **getattr(settings, 'LESSON_PROGRESS_BUFFER', {})}
+
+
+def is_enabled():
+    return get_buffer_settings()['ENABLED']
+
+
+def progress_values(entry):
+    """Progress payload returned to the player"""
+    return {
+        'watch_time_seconds': entry['watch_time_seconds'],
+        'current_position_seconds': entry['current_position_seconds'],
+        'watch_percentage': entry['watch_percentage'],
+        'is_completed': entry['is_completed'],
+        'completed_at': entry['completed_at'],
+    }
+
+
+def record_heartbeat(user, course_id, section_id, lesson_id, data):
+    """
+    Apply a heartbeat to the buffered progress of a lesson and return the
+    current progress values. Raises CourseLesson.DoesNotExist and
+    CourseEnrollment.DoesNotExist like the unbuffered endpoint.
+    """
+    config = get_buffer_settings()
+    key = ENTRY_KEY.format(user_id=user.id, lesson_id=lesson_id)
+    now = timezone.now()
+
+    entry = cache.get(key)
+    if (
+        entry is None
+        or entry['course_id'] != str(course_id)
+        or entry['section_id'] != str(section_id)
+        or (now - entry['access_checked_at']).total_seconds() > config['ACCESS_CHECK_SECONDS']
+    ):
+        entry = _load_entry(user, course_id, section_id, lesson_id, entry, now)
+
+    watch_time = data.get('watch_time_seconds')
+    current_position = data.get('current_position_seconds')
+    watch_percentage = data.get('watch_percentage')
+
+    if watch_time is not None:
+        entry['watch_time_seconds'] = max(entry['watch_time_seconds'], int(watch_time))
+
+    if current_position is not None:
+        entry['current_position_seconds'] = int(current_position)
+
+    if watch_percentage is not None:
+        entry['watch_percentage'] = min(100, max(0, int(watch_percentage)))
+
+    entry['last_heartbeat'] = now
+
+    # A completion flip cascades into course progress, so persist it right away
+    if (entry['watch_percentage'] >= entry['minimum_watch_percentage']) != entry['is_completed']:
+        _save_entry(entry)
+        cache.set(key, entry, config['ENTRY_TIMEOUT_SECONDS'])
+    else:
+        _buffer_entry(key, entry, config)
+
+    return progress_values(entry)
+
+
+def _load_entry(user, course_id, section_id, lesson_id, entry, now):
+    """Check lesson access and seed (or refresh) the buffered entry"""
+    lesson = CourseLesson.objects.select_related('section').get(
+        id=lesson_id,
+        section_id=section_id,
+        section__course_id=course_id,
+        is_active=True
+    )
+
+    if not CourseEnrollment.objects.filter(
+        user=user,
+        course_id=lesson.section.course_id,
+        is_active=True,
+        payment_status='completed'
+    ).exists():
+        raise CourseEnrollment.DoesNotExist
+
+    if entry is None:
+        lesson_progress, created = UserLessonProgress.objects.get_or_create(
+            user=user,
+            lesson=lesson
+        )
+        entry = {
+            'progress_id': str(lesson_progress.id),
+            'watch_time_seconds': lesson_progress.watch_time_seconds,
+            'current_position_seconds': lesson_progress.current_position_seconds,
+            'watch_percentage': lesson_progress.watch_percentage,
+            'is_completed': lesson_progress.is_completed,
+            'completed_at': lesson_progress.completed_at,
+            'generation': None,
+        }
+
+    entry.update({
+        'course_id': str(course_id),
+        'section_id': str(section_id),
+        'minimum_watch_percentage': lesson.minimum_watch_percentage,
+        'access_checked_at': now,
+    })
+    return entry
+
+
+def _save_entry(entry):
+    """Write an entry through save() so completion changes reach course progress"""
+    lesson_progress = UserLessonProgress.objects.select_related('lesson', 'lesson__section').get(
+        id=entry['progress_id']
+    )
+    lesson_progress.watch_time_seconds = max(lesson_progress.watch_time_seconds, entry['watch_time_seconds'])
+    lesson_progress.current_position_seconds = entry['current_position_seconds']
+    lesson_progress.watch_percentage = entry['watch_percentage']
+    lesson_progress.save()
+
+    entry['watch_time_seconds'] = lesson_progress.watch_time_seconds
+    entry['is_completed'] = lesson_progress.is_completed
+    entry['completed_at'] = lesson_progress.completed_at
+
+
+def _buffer_entry(key, entry, config):
+    timeout = config['ENTRY_TIMEOUT_SECONDS']
+    cache.set(key, entry, timeout)
+
+    # The flusher bumps the generation after draining the index. Reading it
+    # after the write means a drain that missed this write always re-indexes it.
+    generation = cache.get(GENERATION_KEY, 0)
+    if entry['generation'] == generation:
+        return
+
+    if _with_index_lock(lambda keys: keys.add(key)):
+        entry['generation'] = generation
+        cache.set(key, entry, timeout)
+    else:
+        logger.warning(f"Lesson progress buffer busy, writing {key} directly")
+        _save_entry(entry)
+        cache.set(key, entry, timeout)
+
+
+def _with_index_lock(update):
+    """Run update(keys) on the dirty index while holding the buffer lock"""
+    for attempt in range(LOCK_ATTEMPTS):
+        if cache.add(LOCK_KEY, 1, LOCK_TIMEOUT):
+            try:
+                keys = cache.get(INDEX_KEY) or set()
+                result = update(keys)
+                cache.set(INDEX_KEY, keys, None)
+                return result if result is not None else True
+            finally:
+                cache.delete(LOCK_KEY)
+        time.sleep(0.05 * (attempt + 1))
+    return False
+
+
+def _drain_index(keys):
+    drained = set(keys)
+    keys.clear()
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 1, None)
+    return drained
+
+
+def flush_lesson_progress_buffer():
+    """Persist all buffered heartbeats; returns the number of rows written"""
+    keys = _with_index_lock(_drain_index)
+    if not keys:
+        return 0
+
+    try:
+        progress_records = []
+        for entry in cache.get_many(list(keys)).values():
+            progress_records.append(UserLessonProgress(
+                id=entry['progress_id'],
+                watch_time_seconds=Greatest(F('watch_time_seconds'), Value(entry['watch_time_seconds'])),
+                current_position_seconds=entry['current_position_seconds'],
+                watch_percentage=entry['watch_percentage'],
+                last_accessed=entry['last_heartbeat'],
+            ))
+
+        # bulk_update skips save(): completion flips were already written synchronously
+        UserLessonProgress.objects.bulk_update(
+            progress_records,
+            ['watch_time_seconds', 'current_position_seconds', 'watch_percentage', 'last_accessed'],
+            batch_size=get_buffer_settings()['FLUSH_BATCH_SIZE']
+        )
+    except Exception:
+        # Put the drained keys back so the next flush retries them
+        if not _with_index_lock(lambda index: index.update(keys)):
+            logger.error(f"Lesson progress buffer busy, {len(keys)} entries wait for their next heartbeat")
+        raise
+    return len(progress_records)
@@ -0,0 +1,118 @@
+# courses/question_analytics.py
+"""
+Per-question item analysis for an exam, cached per exam version.
+
+Completed answers are read once as an attempt-by-question score matrix and
+reduced with NumPy: attempts, correct answers, average time, p-value
+(proportion correct) and point-biserial discrimination (correlation of an
+item with the rest of the attempt's score). Option selection counts come
+from one grouped query. Signals in courses/signals.py bump the version when
+an attempt completes.
+"""
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Count
+from .models import UserExamAnswer, UserExamAttempt
+
+ANALYTICS_VERSION_KEY = 'exam_question_analytics_version_{exam_id}'
+ANALYTICS_KEY = 'exam_question_analytics_{exam_id}_v{version}'
+ANALYTICS_TIMEOUT = 60 * 60 * 6
+
+# Items discriminating below this are flagged for review
+LOW_DISCRIMINATION = 0.2
+
+
+def bump_question_analytics_version(exam_id):
+    """Invalidate the cached item analysis of an exam"""
+    key = ANALYTICS_VERSION_KEY.format(exam_id=exam_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, None)
+
+
+def _point_biserial(item_scores, rest_scores):
+    if len(item_scores) < 2 or item_scores.std() == 0 or rest_scores.std() == 0:
+        return None
+    return round(float(np.corrcoef(item_scores, rest_scores)[0, 1]), 3)
+
+
+def build_question_analytics(exam_id):
+    """
+    Item statistics keyed by question id (as str), plus the number of
+    completed attempts, in three queries
+    """
+    rows = list(
+        UserExamAnswer.objects.filter(
+            attempt__exam_id=exam_id,
+            attempt__status='completed'
+        ).order_by().values_list('attempt_id', 'question_id', 'is_correct', 'time_taken_seconds')
+    )
+
+    selections = {}
+    for row in UserExamAnswer.objects.filter(
+        attempt__exam_id=exam_id,
+        attempt__status='completed',
+        selected_answers__isnull=False
+    ).order_by().values('question_id', 'selected_answers').annotate(times_selected=Count('id')):
+        selections.setdefault(str(row['question_id']), {})[str(row['selected_answers'])] = row['times_selected']
+
+    attempt_ids = {attempt_id: index for index, attempt_id in enumerate(dict.fromkeys(row[0] for row in rows))}
+    question_ids = list(dict.fromkeys(row[1] for row in rows))
+    question_index = {question_id: index for index, question_id in enumerate(question_ids)}
+
+    # NaN marks a question the attempt never answered
+    scores = np.full((len(attempt_ids), len(question_ids)), np.nan)
+    times = np.zeros_like(scores)
+    for attempt_id, question_id, is_correct, time_taken in rows:
+        scores[attempt_ids[attempt_id], question_index[question_id]] = is_correct
+        times[attempt_ids[attempt_id], question_index[question_id]] = time_taken
+
+    answered = ~np.isnan(scores)
+    totals = answered.sum(axis=0)
+    correct = np.nansum(scores, axis=0)
+    attempt_scores = np.nansum(scores, axis=1)
+    timed = times > 0
+    time_counts = timed.sum(axis=0)
+    time_sums = np.where(timed, times, 0).sum(axis=0)
+
+    questions = {}
+    for index, question_id in enumerate(question_ids):
+        mask = answered[:, index]
+        item = scores[mask, index]
+        total = int(totals[index])
+        questions[str(question_id)] = {
+            'total_attempts': total,
+            'correct_attempts': int(correct[index]),
+            'average_time_spent': round(float(time_sums[index] / time_counts[index]), 2) if time_counts[index] else 0,
+            'p_value': round(float(correct[index] / total), 3) if total else None,
+            'discrimination': _point_biserial(item, attempt_scores[mask] - item),
+            'selections': selections.get(str(question_id), {}),
+        }
+
+    return {
+        'total_attempts': UserExamAttempt.objects.filter(exam_id=exam_id, status='completed').count(),
+        'questions': questions,
+    }
+
+
+def get_question_analytics(exam_id):
+    version = cache.get_or_set(ANALYTICS_VERSION_KEY.format(exam_id=exam_id), 1, None)
+    key = ANALYTICS_KEY.format(exam_id=exam_id, version=version)
+
+    analytics = cache.get(key)
+    if analytics is None:
+        analytics = build_question_analytics(exam_id)
+        cache.set(key, analytics, ANALYTICS_TIMEOUT)
+    return analytics
+
+
+def empty_question_stats():
+    return {
+        'total_attempts': 0,
+        'correct_attempts': 0,
+        'average_time_spent': 0,
+        'p_value': None,
+        'discrimination': None,
+        'selections': {},
+    }
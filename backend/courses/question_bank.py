@@ -0,0 +1,86 @@
+# courses/question_bank.py
+"""
+Shared, cached question payloads for exam delivery.
+
+The payload of an exam's active questions and answers is immutable between
+edits and identical for every candidate, so it is built in two queries,
+cached per exam version and never contains correct-answer flags. Signals in
+courses/signals.py bump the version when questions or answers change.
+"""
+import random
+from django.core.cache import cache
+from .models import ExamQuestion
+
+QUESTION_BANK_VERSION_KEY = 'exam_question_bank_version_{exam_id}'
+QUESTION_BANK_KEY = 'exam_question_bank_{exam_id}_v{version}'
+QUESTION_BANK_TIMEOUT = 60 * 60 * 24
+
+
+def bump_question_bank_version(exam_id):
+    """Invalidate the cached question payload of an exam"""
+    key = QUESTION_BANK_VERSION_KEY.format(exam_id=exam_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, None)
+
+
+def build_question_bank(exam_id):
+    """Active questions of an exam keyed by id, with answers in their stored order"""
+    questions = ExamQuestion.objects.filter(
+        exam_id=exam_id,
+        is_active=True
+    ).prefetch_related('answers')
+
+    return {
+        str(question.id): {
+            'id': str(question.id),
+            'question_text': question.question_text,
+            'question_type': question.question_type,
+            'points': question.points,
+            'image_url': question.image.url if question.image else None,
+            # Never include is_correct: this payload is shared by all candidates
+            'answers': [
+                {
+                    'id': str(answer.id),
+                    'answer_text': answer.answer_text,
+                    'image_url': answer.image.url if answer.image else None
+                }
+                for answer in question.answers.all()
+            ]
+        }
+        for question in questions
+    }
+
+
+def get_question_bank(exam_id):
+    version = cache.get_or_set(QUESTION_BANK_VERSION_KEY.format(exam_id=exam_id), 1, None)
+    key = QUESTION_BANK_KEY.format(exam_id=exam_id, version=version)
+
+    bank = cache.get(key)
+    if bank is None:
+        bank = build_question_bank(exam_id)
+        cache.set(key, bank, QUESTION_BANK_TIMEOUT)
+    return bank
+
+
+def get_attempt_questions(attempt):
+    """
+    Questions of an attempt in its shuffled order. Questions that were removed
+    or deactivated since the attempt started are skipped.
+    """
+    bank = get_question_bank(attempt.exam_id)
+    shuffle_answers = attempt.exam_data.get('shuffle_answers', False)
+
+    questions = []
+    for question_id in attempt.exam_data.get('questions_order', []):
+        question = bank.get(question_id)
+        if question is None:
+            continue
+
+        answers = list(question['answers'])
+        if shuffle_answers:
+            random.shuffle(answers)
+        questions.append({**question, 'answers': answers})
+
+    return questions
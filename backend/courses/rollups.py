@@ -0,0 +1,263 @@
+# courses/rollups.py
+"""
+Per-course daily rollups (CourseDailyStat) behind the admin dashboards.
+
+Signals in courses/signals.py snapshot enrollments, course progress and
+reviews when they are loaded and, on save or delete, apply the change in
+that row's contribution as F() deltas, so a write costs one UPDATE per
+affected day. QuerySet.update() and bulk_update() bypass the signals; the
+nightly reconcile_course_stats command rebuilds whole days from the source
+tables with reconcile_course_stats().
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, F, IntegerField, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+from .models import CourseDailyStat, CourseEnrollment, CourseReview, UserCourseProgress, UserLessonProgress
+
+STAT_FIELDS = (
+    'enrollments', 'paid_enrollments', 'paying_enrollments', 'pending_payments', 'failed_payments',
+    'revenue', 'progress_started', 'progress_percentage_total', 'completions',
+    'reviews', 'approved_reviews', 'rating_total', 'active_users',
+)
+
+
+def _day(value):
+    return timezone.localdate(value) if value else None
+
+
+def _enrollment_contribution(values):
+    completed = values['payment_status'] == 'completed'
+    amount = values['amount_paid'] or Decimal('0')
+    return {
+        (values['course_id'], _day(values['enrolled_at'])): {
+            'enrollments': 1,
+            'paid_enrollments': int(completed),
+            'paying_enrollments': int(completed and amount > 0),
+            'pending_payments': int(values['payment_status'] == 'pending'),
+            'failed_payments': int(values['payment_status'] == 'failed'),
+            'revenue': amount if completed else Decimal('0'),
+        }
+    }
+
+
+def _progress_contribution(values):
+    contribution = {
+        (values['course_id'], _day(values['started_at'])): {
+            'progress_started': 1,
+            'progress_percentage_total': values['progress_percentage'],
+        }
+    }
+    if values['completed_at']:
+        key = (values['course_id'], _day(values['completed_at']))
+        contribution.setdefault(key, {})['completions'] = 1
+    return contribution
+
+
+def _review_contribution(values):
+    return {
+        (values['course_id'], _day(values['created_at'])): {
+            'reviews': 1,
+            'approved_reviews': int(values['is_approved']),
+            'rating_total': values['rating'],
+        }
+    }
+
+
+# Source model -> (fields read from a row, contribution of the row)
+ROLLUP_SOURCES = {
+    CourseEnrollment: (
+        ('course_id', 'enrolled_at', 'payment_status', 'amount_paid'), _enrollment_contribution
+    ),
+    UserCourseProgress: (
+        ('course_id', 'started_at', 'completed_at', 'progress_percentage'), _progress_contribution
+    ),
+    CourseReview: (
+        ('course_id', 'created_at', 'rating', 'is_approved'), _review_contribution
+    ),
+}
+
+
+def snapshot_rollup_values(instance):
+    """
+    Remember the fields a row contributes with, reading only what is already
+    loaded so deferred fields never trigger a query. None if any is deferred.
+    """
+    fields, _ = ROLLUP_SOURCES[type(instance)]
+    if any(field not in instance.__dict__ for field in fields):
+        instance._rollup_values = None
+    else:
+        instance._rollup_values = {field: instance.__dict__[field] for field in fields}
+
+
+def _contribution(model, values):
+    if not values:
+        return {}
+    _, contribute = ROLLUP_SOURCES[model]
+    return contribute(values)
+
+
+def apply_rollup_change(instance, created=False, deleted=False):
+    """Apply the difference between a row's old and new contribution"""
+    model = type(instance)
+    fields, _ = ROLLUP_SOURCES[model]
+    previous = getattr(instance, '_rollup_values', None)
+
+    if not created and previous is None:
+        # Loaded with deferred fields: the old contribution is unknown
+        snapshot_rollup_values(instance)
+        current = instance._rollup_values or {}
+        for course_id, day in _contribution(model, current):
+            reconcile_course_stats(day, day, course_ids=[course_id])
+        return
+
+    current = None if deleted else {field: getattr(instance, field) for field in fields}
+
+    deltas = defaultdict(lambda: defaultdict(int))
+    for key, stats in _contribution(model, current).items():
+        for field, value in stats.items():
+            deltas[key][field] += value
+    if not created:
+        for key, stats in _contribution(model, previous).items():
+            for field, value in stats.items():
+                deltas[key][field] -= value
+
+    for (course_id, day), stats in deltas.items():
+        stats = {field: value for field, value in stats.items() if value}
+        if day is not None and stats:
+            _increment(course_id, day, stats, deleted)
+
+    instance._rollup_values = current
+
+
+def _increment(course_id, day, stats, deleted=False):
+    updates = {field: F(field) + value for field, value in stats.items()}
+    if CourseDailyStat.objects.filter(course_id=course_id, date=day).update(**updates) or deleted:
+        # A missing row on delete means the course itself is being deleted
+        return
+    # First write to this day (or to a day predating the rollups): build it from the source rows
+    try:
+        reconcile_course_stats(day, day, course_ids=[course_id])
+    except IntegrityError:
+        # Created concurrently; that transaction could not see this row yet
+        CourseDailyStat.objects.filter(course_id=course_id, date=day).update(**updates)
+
+
+def _day_bounds(start_date, end_date):
+    tz = timezone.get_current_timezone()
+    return (
+        timezone.make_aware(datetime.combine(start_date, time.min), tz),
+        timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min), tz),
+    )
+
+
+def reconcile_course_stats(start_date, end_date, course_ids=None):
+    """
+    Rebuild the rollup rows of [start_date, end_date] from the source tables
+    with one grouped query per source. Returns the number of rows written.
+
+    active_users can only be measured from the latest lesson access, so an
+    existing value is never lowered by a later rebuild of the same day.
+    """
+    start, end = _day_bounds(start_date, end_date)
+    course_filter = Q(course_id__in=course_ids) if course_ids is not None else Q()
+    rows = defaultdict(dict)
+
+    def collect(queryset, course_field='course_id'):
+        for row in queryset:
+            key = (row.pop(course_field), row.pop('day'))
+            rows[key].update({field: value or 0 for field, value in row.items()})
+
+    collect(
+        CourseEnrollment.objects.filter(course_filter, enrolled_at__gte=start, enrolled_at__lt=end)
+        .order_by().values('course_id', day=TruncDate('enrolled_at'))
+        .annotate(
+            enrollments=Count('id'),
+            paid_enrollments=Count('id', filter=Q(payment_status='completed')),
+            paying_enrollments=Count('id', filter=Q(payment_status='completed', amount_paid__gt=0)),
+            pending_payments=Count('id', filter=Q(payment_status='pending')),
+            failed_payments=Count('id', filter=Q(payment_status='failed')),
+            revenue=Sum('amount_paid', filter=Q(payment_status='completed')),
+        )
+    )
+    collect(
+        UserCourseProgress.objects.filter(course_filter, started_at__gte=start, started_at__lt=end)
+        .order_by().values('course_id', day=TruncDate('started_at'))
+        .annotate(progress_started=Count('id'), progress_percentage_total=Sum('progress_percentage'))
+    )
+    collect(
+        UserCourseProgress.objects.filter(course_filter, completed_at__gte=start, completed_at__lt=end)
+        .order_by().values('course_id', day=TruncDate('completed_at'))
+        .annotate(completions=Count('id'))
+    )
+    collect(
+        CourseReview.objects.filter(course_filter, created_at__gte=start, created_at__lt=end)
+        .order_by().values('course_id', day=TruncDate('created_at'))
+        .annotate(
+            reviews=Count('id'),
+            approved_reviews=Count('id', filter=Q(is_approved=True)),
+            rating_total=Sum('rating'),
+        )
+    )
+
+    lesson_course_filter = (
+        Q(lesson__section__course_id__in=course_ids) if course_ids is not None else Q()
+    )
+    collect(
+        UserLessonProgress.objects.filter(lesson_course_filter, last_accessed__gte=start, last_accessed__lt=end)
+        .order_by().values(rollup_course_id=F('lesson__section__course_id'), day=TruncDate('last_accessed'))
+        .annotate(active_users=Count('user_id', distinct=True)),
+        course_field='rollup_course_id'
+    )
+
+    existing = CourseDailyStat.objects.filter(course_filter, date__gte=start_date, date__lte=end_date)
+    for course_id, day, active_users in existing.values_list('course_id', 'date', 'active_users'):
+        if active_users:
+            stats = rows[(course_id, day)]
+            stats['active_users'] = max(stats.get('active_users', 0), active_users)
+
+    with transaction.atomic():
+        existing.delete()
+        CourseDailyStat.objects.bulk_create(
+            [CourseDailyStat(course_id=course_id, date=day, **stats) for (course_id, day), stats in rows.items()],
+            batch_size=500
+        )
+    return len(rows)
+
+
+def rollup_totals(queryset, **filtered):
+    """
+    Sum every stat over a CourseDailyStat queryset in one query. Extra
+    keyword arguments add filtered sums, e.g. recent=Q(date__gte=...) yields
+    recent_revenue, recent_enrollments and so on.
+    """
+    # Aggregate aliases may not shadow the summed field names
+    aggregates = {
+        f'sum__{field}': Coalesce(Sum(field), 0, output_field=_output_field(field)) for field in STAT_FIELDS
+    }
+    for prefix, condition in filtered.items():
+        for field in STAT_FIELDS:
+            aggregates[f'sum__{prefix}_{field}'] = Coalesce(
+                Sum(field, filter=condition), 0, output_field=_output_field(field)
+            )
+    totals = queryset.order_by().aggregate(**aggregates)
+    return {name[len('sum__'):]: value for name, value in totals.items()}
+
+
+def _output_field(field):
+    if field == 'revenue':
+        return DecimalField(max_digits=15, decimal_places=2)
+    return IntegerField()
+
+
+def average_rating(stats, prefix=''):
+    reviews = stats[f'{prefix}reviews']
+    return round(stats[f'{prefix}rating_total'] / reviews, 2) if reviews else 0
+
+
+def stats_since(days):
+    """Date of the first rollup day in a 'last N days' window, today included"""
+    return timezone.localdate() - timedelta(days=days - 1)
@@ -0,0 +1,111 @@
+# courses/roster.py
+"""
+Instructor student roster.
+
+student_roster() annotates every active student with the number of the
+instructor's courses they accessed, their average progress and their last
+activity in one grouped query, so the roster is searched, sorted and
+paginated in the database. Activity not yet flushed from the cache
+(users.activity) is merged per page, or per batch when exporting CSV.
+"""
+import csv
+from django.db.models import Avg, Count, FloatField, Max, Q
+from django.db.models.functions import Coalesce, Greatest
+from users.activity import get_pending_activity_map
+from users.models import User
+
+# sort_by value -> roster column
+ROSTER_SORT_FIELDS = {
+    'full_name': 'full_name',
+    'email': 'email',
+    'date_joined': 'date_joined',
+    'last_activity': 'roster_last_activity',
+    'overall_progress': 'overall_progress',
+    'courses_accessed': 'courses_accessed',
+}
+DEFAULT_ROSTER_SORT = '-date_joined'
+
+CSV_BATCH_SIZE = 1000
+CSV_COLUMNS = (
+    'id', 'full_name', 'email', 'date_joined', 'last_activity',
+    'total_courses_available', 'courses_accessed', 'overall_progress',
+)
+
+
+def student_roster(instructor, search='', sort_by=DEFAULT_ROSTER_SORT):
+    """Active students annotated with their activity in instructor's courses"""
+    instructor_progress = Q(course_progress__course__created_by=instructor)
+
+    students = User.objects.filter(role='student', is_active=True)
+    if search:
+        students = students.filter(Q(full_name__icontains=search) | Q(email__icontains=search))
+
+    students = students.only(
+        'id', 'full_name', 'email', 'date_joined', 'last_activity'
+    ).annotate(
+        courses_accessed=Count('course_progress', filter=instructor_progress),
+        overall_progress=Coalesce(
+            Avg('course_progress__progress_percentage', filter=instructor_progress), 0.0,
+            output_field=FloatField()
+        ),
+        last_course_activity=Max('course_progress__last_accessed', filter=instructor_progress),
+    ).annotate(
+        roster_last_activity=Greatest(
+            Coalesce('last_course_activity', 'date_joined'),
+            Coalesce('last_activity', 'date_joined')
+        )
+    )
+
+    field = ROSTER_SORT_FIELDS.get(sort_by.lstrip('-'))
+    if field is None:
+        sort_by, field = DEFAULT_ROSTER_SORT, ROSTER_SORT_FIELDS[DEFAULT_ROSTER_SORT.lstrip('-')]
+    prefix = '-' if sort_by.startswith('-') else ''
+    return students.order_by(f'{prefix}{field}', 'id')
+
+
+def roster_rows(students, total_courses):
+    """Roster entries for a page of student_roster() with one cache round trip"""
+    pending = get_pending_activity_map([student.pk for student in students])
+    return [
+        {
+            'id': str(student.id),
+            'full_name': student.full_name,
+            'email': student.email,
+            'date_joined': student.date_joined,
+            'last_activity': max(filter(None, [student.roster_last_activity, pending.get(student.pk)])),
+            'total_courses_available': total_courses,
+            'courses_accessed': student.courses_accessed,
+            'overall_progress': round(student.overall_progress, 1),
+            'registration_payment_status': 'completed',  # All registered students have paid
+            'access_level': 'full_platform_access'  # Access to all courses
+        }
+        for student in students
+    ]
+
+
+class _Echo:
+    """File-like object whose write() returns the line, for streaming csv"""
+
+    def write(self, value):
+        return value
+
+
+def iter_roster_csv(students, total_courses, batch_size=CSV_BATCH_SIZE):
+    """CSV lines of a whole roster, reading it from the database in batches"""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_COLUMNS)
+
+    batch = []
+    for student in students.iterator(chunk_size=batch_size):
+        batch.append(student)
+        if len(batch) == batch_size:
+            yield from _csv_lines(writer, batch, total_courses)
+            batch = []
+    yield from _csv_lines(writer, batch, total_courses)
+
+
+def _csv_lines(writer, students, total_courses):
+    for row in roster_rows(students, total_courses):
+        row['date_joined'] = row['date_joined'].isoformat()
+        row['last_activity'] = row['last_activity'].isoformat()
+        yield writer.writerow([row[column] for column in CSV_COLUMNS])
@@ -0,0 +1,147 @@
+# courses/search.py
+"""
+Ranked full-text search over courses and exams.
+
+On PostgreSQL each searchable table carries a weighted tsvector column
+(search_vector) that a trigger keeps current, with a GIN index on it and a
+pg_trgm index on title (migration 0012). Queries are matched with
+websearch_to_tsquery and ordered by ts_rank. The same query also matches
+titles (and category names for courses) by trigram word similarity to catch
+typos; those rows rank after every full-text match.
+
+Other databases (SQLite in tests and local development) fall back to
+icontains matching ranked by the same field weights.
+
+Highlights are built in Python for the returned page only: terms are
+matched on the raw text, then the text between matches and each match are
+HTML-escaped separately and the matches wrapped in <mark>.
+"""
+import re
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db import connection
+from django.db.models import BooleanField, Case, ExpressionWrapper, F, FloatField, Q, Value, When
+from django.db.models.functions import Greatest
+from django.utils.html import escape
+
+SEARCH_CONFIG = 'english'
+
+# Searchable field -> (tsvector weight, fallback rank contribution)
+COURSE_SEARCH_FIELDS = {
+    'title': ('A', 1.0),
+    'description': ('B', 0.4),
+    'category__name': ('C', 0.2),
+}
+EXAM_SEARCH_FIELDS = {
+    'title': ('A', 1.0),
+    'description': ('B', 0.4),
+}
+
+# Fields compared by trigram similarity to catch typos full-text search misses
+COURSE_TRIGRAM_FIELDS = ('title', 'category__name')
+EXAM_TRIGRAM_FIELDS = ('title',)
+TRIGRAM_THRESHOLD = 0.3
+
+HIGHLIGHT_WORDS = 35
+
+
+def uses_full_text_search():
+    return connection.vendor == 'postgresql'
+
+
+def ranked_search(queryset, query, fields, trigram_fields):
+    """
+    Filter queryset to rows matching query, annotated with search_rank and
+    ordered best match first
+    """
+    if not uses_full_text_search():
+        return _fallback_search(queryset, query, fields)
+
+    search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+    full_text = Q(search_vector=search_query)
+
+    # Likely typos: rows whose short fields hold a word close to the query
+    similarities = [TrigramWordSimilarity(query, field) for field in trigram_fields]
+    typo_matches = Q()
+    for field in trigram_fields:
+        typo_matches |= Q(**{f'{field}__trigram_word_similar': query})
+
+    # One query: full-text matches by ts_rank, then typo matches by similarity
+    return queryset.alias(
+        full_text_match=ExpressionWrapper(full_text, output_field=BooleanField()),
+        similarity=Greatest(*similarities) if len(similarities) > 1 else similarities[0],
+    ).filter(
+        full_text | (typo_matches & Q(similarity__gte=TRIGRAM_THRESHOLD))
+    ).annotate(
+        search_rank=Case(
+            When(full_text, then=SearchRank(F('search_vector'), search_query)),
+            default=F('similarity'),
+            output_field=FloatField()
+        )
+    ).order_by('-full_text_match', '-search_rank', '-created_at')
+
+
+def _fallback_search(queryset, query, fields):
+    matches = Q()
+    rank = Value(0.0)
+    for field, (_, weight) in fields.items():
+        matches |= Q(**{f'{field}__icontains': query})
+        rank = rank + Case(
+            When(**{f'{field}__icontains': query}, then=Value(weight)),
+            default=Value(0.0),
+            output_field=FloatField()
+        )
+    return queryset.filter(matches).annotate(search_rank=rank).order_by('-search_rank', '-created_at')
+
+
+def ranked_course_search(queryset, query):
+    return ranked_search(queryset, query, COURSE_SEARCH_FIELDS, COURSE_TRIGRAM_FIELDS)
+
+
+def ranked_exam_search(queryset, query):
+    return ranked_search(queryset, query, EXAM_SEARCH_FIELDS, EXAM_TRIGRAM_FIELDS)
+
+
+def _term_pattern(query):
+    # Prefix match so 'nurse' also marks 'nursing' like the stemmed search does
+    terms = [re.escape(term[:max(4, len(term) - 2)]) for term in re.findall(r'\w+', query) if len(term) > 1]
+    if not terms:
+        return None
+    return re.compile(r'\b(?:' + '|'.join(sorted(terms, key=len, reverse=True)) + r')\w*', re.IGNORECASE)
+
+
+def highlight(text, query, max_words=None):
+    """
+    HTML-escaped text with matched terms wrapped in <mark>. With max_words
+    only a fragment around the first match is returned.
+    """
+    text = text or ''
+    pattern = _term_pattern(query)
+
+    if max_words:
+        words = text.split()
+        start = 0
+        if pattern:
+            start = next((index for index, word in enumerate(words) if pattern.search(word)), 0)
+            start = max(0, start - max_words // 3)
+        fragment = ' '.join(words[start:start + max_words])
+        text = ('… ' if start else '') + fragment + (' …' if start + max_words < len(words) else '')
+
+    if pattern is None:
+        return escape(text)
+
+    # Match on the raw text so entities produced by escaping are never split
+    parts = []
+    position = 0
+    for match in pattern.finditer(text):
+        parts.append(escape(text[position:match.start()]))
+        parts.append(f'<mark>{escape(match.group(0))}</mark>')
+        position = match.end()
+    parts.append(escape(text[position:]))
+    return ''.join(parts)
+
+
+def search_highlights(obj, query, fields=('title', 'description')):
+    return {
+        field: highlight(getattr(obj, field), query, max_words=HIGHLIGHT_WORDS if field == 'description' else None)
+        for field in fields
+    }
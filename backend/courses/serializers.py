@@ -7,6 +7,7 @@ from .models import (
     CourseExam, ExamQuestion, ExamAnswer, UserExamAttempt, UserExamAnswer, ExamCertificate,
     CourseSection, CourseLesson, UserLessonProgress
 )
+from .access import CourseAccess
 from difflib import get_close_matches
 from users.models import User
 
@@ -71,16 +72,28 @@ class CourseSerializer(serializers.ModelSerializer):
         except (AttributeError, ValueError):
             return None
     
+    # The stat getters read the annotations added by
+    # Course.objects.with_catalog_stats() and fall back to the model methods.
     def get_completion_rate(self, obj):
+        if hasattr(obj, 'progress_count'):
+            if obj.progress_count == 0:
+                return 0
+            return round((obj.completed_progress_count / obj.progress_count) * 100, 2)
         return obj.get_completion_rate()
     
     def get_average_progress(self, obj):
+        if hasattr(obj, 'avg_progress'):
+            return round(obj.avg_progress, 2) if obj.avg_progress else 0
         return obj.get_average_progress()
     
     def get_total_enrollments(self, obj):
+        if hasattr(obj, 'progress_count'):
+            return obj.progress_count
         return obj.user_progress.count()
     
     def get_total_revenue(self, obj):
+        if hasattr(obj, 'revenue_total'):
+            return float(obj.revenue_total or 0)
         return float(obj.get_total_revenue())
     
     def get_effective_price(self, obj):
@@ -90,12 +103,14 @@ class CourseSerializer(serializers.ModelSerializer):
         return obj.is_discount_active()
     
     def get_average_rating(self, obj):
-        from django.db.models import Avg
-        avg_rating = obj.reviews.filter(is_approved=True).aggregate(avg=Avg('rating'))['avg']
-        return round(avg_rating, 1) if avg_rating else 0
+        if hasattr(obj, 'avg_rating'):
+            return round(obj.avg_rating, 1) if obj.avg_rating else 0
+        return obj.get_average_rating()
     
     def get_review_count(self, obj):
-        return obj.reviews.filter(is_approved=True).count()
+        if hasattr(obj, 'approved_review_count'):
+            return obj.approved_review_count
+        return obj.get_review_count()
 
 
 class CourseCreateUpdateSerializer(serializers.ModelSerializer):
@@ -356,7 +371,8 @@ class CourseLessonSerializer(serializers.ModelSerializer):
         """Check if lesson is accessible (requires user context)"""
         user = self.context.get('user')
         if user:
-            return obj.is_accessible_by_user(user)
+            # One access evaluation per course shared by every lesson of the listing
+            return CourseAccess.for_context(self.context, obj.section.course_id).is_lesson_accessible(obj.id)
         return obj.is_preview
     
     def get_progress_stats(self, obj):
@@ -371,12 +387,10 @@ class CourseLessonSerializer(serializers.ModelSerializer):
         }
     
     def get_next_lesson_id(self, obj):
-        next_lesson = obj.get_next_lesson()
-        return str(next_lesson.id) if next_lesson else None
+        return obj.get_next_lesson_id()
     
     def get_previous_lesson_id(self, obj):
-        previous_lesson = obj.get_previous_lesson()
-        return str(previous_lesson.id) if previous_lesson else None
+        return obj.get_previous_lesson_id()
 
 
 class CourseLessonCreateSerializer(serializers.ModelSerializer):
@@ -601,16 +615,14 @@ class CourseProgressDetailSerializer(serializers.ModelSerializer):
         return None
     
     def get_next_lesson_to_study(self, obj):
-        current_lesson = obj.get_current_lesson()
-        if current_lesson:
-            next_lesson = current_lesson.get_next_lesson()
-            if next_lesson:
-                return {
-                    'id': str(next_lesson.id),
-                    'title': next_lesson.title,
-                    'lesson_type': next_lesson.lesson_type,
-                    'section_title': next_lesson.section.title
-                }
+        next_lesson = obj.get_next_lesson_to_study()
+        if next_lesson:
+            return {
+                'id': str(next_lesson.id),
+                'title': next_lesson.title,
+                'lesson_type': next_lesson.lesson_type,
+                'section_title': next_lesson.section.title
+            }
         return None
     
     def get_time_spent_display(self, obj):
@@ -756,15 +768,17 @@ class CourseStructureSerializer(serializers.ModelSerializer):
         """Add lessons to each section"""
         data = super().to_representation(instance)
         
-        # Add lessons to each section
+        # Load the lessons of all sections in one query instead of one per section
+        lessons_by_section = {}
+        lessons = CourseLesson.objects.filter(
+            section__course=instance, is_active=True
+        ).select_related('section', 'created_by').order_by('order')
+        for lesson in lessons:
+            lessons_by_section.setdefault(str(lesson.section_id), []).append(lesson)
+        
         for section_data in data['sections']:
-            section_id = section_data['id']
-            try:
-                section = CourseSection.objects.get(id=section_id)
-                lessons = section.lessons.filter(is_active=True).order_by('order')
-                section_data['lessons'] = CourseLessonSerializer(lessons, many=True).data
-            except CourseSection.DoesNotExist:
-                section_data['lessons'] = []
+            section_lessons = lessons_by_section.get(str(section_data['id']), [])
+            section_data['lessons'] = CourseLessonSerializer(section_lessons, many=True, context=self.context).data
         
         return data
 
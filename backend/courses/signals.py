@@ -0,0 +1,102 @@
+# courses/signals.py
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from .models import (
+    CourseEnrollment, CourseLesson, CourseReview, CourseSection, ExamAnswer, ExamQuestion, UserCourseProgress,
+    UserExamAttempt
+)
+from .exam_trends import bump_exam_trends_version
+from .outline import bump_course_outline_version
+from .question_analytics import bump_question_analytics_version
+from .question_bank import bump_question_bank_version
+from .rollups import apply_rollup_change, snapshot_rollup_values
+
+
+def _bump_outline_on_commit(course_id):
+    # Bump after commit so a concurrent reader can't cache the old rows under the new version
+    transaction.on_commit(lambda: bump_course_outline_version(course_id))
+
+
+@receiver([post_save, post_delete], sender=CourseSection)
+def invalidate_outline_for_section(sender, instance, **kwargs):
+    """Section edits, reorders and deletes change the course outline"""
+    _bump_outline_on_commit(instance.course_id)
+
+
+@receiver(post_init, sender=CourseLesson)
+def snapshot_lesson_section(sender, instance, **kwargs):
+    """Remember the stored section so a move can bump the course it leaves"""
+    instance._stored_section_id = instance.__dict__.get('section_id')
+
+
+@receiver([post_save, post_delete], sender=CourseLesson)
+def invalidate_outline_for_lesson(sender, instance, **kwargs):
+    """Lesson edits, reorders, moves and deletes change the course outline"""
+    stored_section_id = getattr(instance, '_stored_section_id', None)
+    if stored_section_id is not None and stored_section_id != instance.section_id:
+        # Moved to another section: the section it left may belong to another course
+        previous_course_id = CourseSection.objects.filter(pk=stored_section_id).values_list(
+            'course_id', flat=True
+        ).first()
+        if previous_course_id is not None:
+            _bump_outline_on_commit(previous_course_id)
+    instance._stored_section_id = instance.section_id
+
+    try:
+        course_id = instance.section.course_id
+    except CourseSection.DoesNotExist:
+        # Section already removed in a cascade; its own signal bumps the course
+        return
+    _bump_outline_on_commit(course_id)
+
+
+@receiver([post_save, post_delete], sender=ExamQuestion)
+def invalidate_question_bank_for_question(sender, instance, **kwargs):
+    """Question edits and deletes change the cached exam payload"""
+    exam_id = instance.exam_id
+    transaction.on_commit(lambda: bump_question_bank_version(exam_id))
+
+
+@receiver([post_save, post_delete], sender=ExamAnswer)
+def invalidate_question_bank_for_answer(sender, instance, **kwargs):
+    """Answer edits and deletes change the cached exam payload"""
+    try:
+        exam_id = instance.question.exam_id
+    except ExamQuestion.DoesNotExist:
+        # Question already removed in a cascade; its own signal bumps the exam
+        return
+    transaction.on_commit(lambda: bump_question_bank_version(exam_id))
+
+
+
+@receiver([post_save, post_delete], sender=UserExamAttempt)
+def invalidate_exam_statistics_for_attempt(sender, instance, **kwargs):
+    """Completed attempts feed the exam's item analysis and performance trends"""
+    if instance.status != 'completed':
+        return
+    exam_id = instance.exam_id
+    transaction.on_commit(lambda: bump_question_analytics_version(exam_id))
+    transaction.on_commit(lambda: bump_exam_trends_version(exam_id))
+
+@receiver(post_init, sender=CourseEnrollment)
+@receiver(post_init, sender=UserCourseProgress)
+@receiver(post_init, sender=CourseReview)
+def snapshot_course_rollup_values(sender, instance, **kwargs):
+    """Remember what a loaded row currently contributes to the daily rollups"""
+    snapshot_rollup_values(instance)
+
+
+@receiver(post_save, sender=CourseEnrollment)
+@receiver(post_save, sender=UserCourseProgress)
+@receiver(post_save, sender=CourseReview)
+def update_course_rollups_on_save(sender, instance, created, **kwargs):
+    """Apply the change in the row's contribution as F() deltas"""
+    apply_rollup_change(instance, created=created)
+
+
+@receiver(post_delete, sender=CourseEnrollment)
+@receiver(post_delete, sender=UserCourseProgress)
+@receiver(post_delete, sender=CourseReview)
+def update_course_rollups_on_delete(sender, instance, **kwargs):
+    apply_rollup_change(instance, deleted=True)
@@ -20,6 +20,11 @@ from .serializers import (
     CourseEnrollmentSerializer, CourseCategorySerializer, CourseReviewSerializer,
     CourseExamSerializer, ExamQuestionSerializer, UserExamAttemptSerializer
 )
+from . import progress_buffer
+from .dashboard import get_dashboard_courses
+from .outline import get_course_outline_with_progress
+from .question_bank import get_attempt_questions
+from .search import ranked_course_search, ranked_exam_search, search_highlights
 from users.models import User
 from utils.auth import EmailService
 from utils.admin_email_service import AdminEmailService
@@ -56,21 +61,17 @@ def list_courses(request):
         min_price = request.GET.get('min_price')
         max_price = request.GET.get('max_price')
         is_featured = request.GET.get('is_featured', '')
-        sort_by = request.GET.get('sort_by', '-created_at')
+        # A search is ordered by relevance unless a sort is requested
+        sort_by = request.GET.get('sort_by', '' if search else '-created_at')
         page = int(request.GET.get('page', 1))
         per_page = min(int(request.GET.get('per_page', 12)), 50)  # Max 50 per page
         
         # Build queryset
-        queryset = Course.objects.filter(is_active=True).select_related('created_by').prefetch_related('reviews')
+        queryset = Course.objects.filter(is_active=True).select_related(
+            'created_by', 'updated_by'
+        ).with_catalog_stats()
         
         # Apply filters
-        if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) | 
-                Q(description__icontains=search) |
-                Q(category__icontains=search)
-            )
-        
         if category:
             queryset = queryset.filter(category=category)
         
@@ -89,6 +90,10 @@ def list_courses(request):
         if is_featured:
             queryset = queryset.filter(is_featured=is_featured.lower() == 'true')
         
+        # Search the filtered courses so matches outside the filters cannot hide the typo matches
+        if search:
+            queryset = ranked_course_search(queryset, search)
+        
         # Apply sorting
         valid_sort_fields = ['title', 'price', 'created_at', '-created_at', '-price', '-title']
         if sort_by in valid_sort_fields:
@@ -103,6 +108,10 @@ def list_courses(request):
         
         # Since students paid during registration, they have access to all courses
         courses_data = serializer.data
+        if search:
+            for course, course_data in zip(page_obj.object_list, courses_data):
+                course_data['search_rank'] = course.search_rank
+                course_data['highlight'] = search_highlights(course, search)
         if request.user.is_authenticated:
             for course in courses_data:
                 course['is_enrolled'] = True  # All students have access to all courses
@@ -162,11 +171,6 @@ def get_course_detail(request, course_id):
                 progress = UserCourseProgress.objects.get(user=request.user, course=course)
             except UserCourseProgress.DoesNotExist:
                 # Create progress record if it doesn't exist
-                # Calculate total lessons through sections
-                total_lessons = 0
-                for section in course.sections.filter(is_active=True):
-                    total_lessons += section.lessons.filter(is_active=True).count()
-                
                 progress = UserCourseProgress.objects.create(
                     user=request.user,
                     course=course,
@@ -199,7 +203,7 @@ def get_course_detail(request, course_id):
         similar_courses = Course.objects.filter(
             category=course.category,
             is_active=True
-        ).exclude(id=course.id)[:4]
+        ).exclude(id=course.id).select_related('created_by', 'updated_by').with_catalog_stats()[:4]
         
         data['similar_courses'] = CourseSerializer(similar_courses, many=True).data
         
@@ -229,7 +233,7 @@ def get_featured_courses(request):
         courses = Course.objects.filter(
             is_active=True, 
             is_featured=True
-        ).order_by('-created_at')[:8]
+        ).select_related('created_by', 'updated_by').with_catalog_stats().order_by('-created_at')[:8]
         
         serializer = CourseSerializer(courses, many=True)
         
@@ -643,57 +647,41 @@ def get_course_content(request, course_id):
             defaults={'progress_percentage': 0}
         )
         
-        # Get course sections with lessons
-        sections = CourseSection.objects.filter(
-            course=course,
-            is_active=True
-        ).prefetch_related('lessons').order_by('order')
-        
+        # Cached course outline with this student's progress overlaid
         sections_data = []
-        for section in sections:
+        for section in get_course_outline_with_progress(course.id, request.user):
             section_data = {
-                'id': str(section.id),
-                'title': section.title,
-                'description': section.description,
-                'order': section.order,
-                'is_preview': section.is_preview,
-                'total_lessons': section.total_lessons,
-                'total_duration_seconds': section.total_duration_seconds,
+                'id': section['id'],
+                'title': section['title'],
+                'description': section['description'],
+                'order': section['order'],
+                'is_preview': section['is_preview'],
+                'total_lessons': section['total_lessons'],
+                'total_duration_seconds': section['total_duration_seconds'],
                 'is_accessible': True,  # All sections are accessible for registered students
-                'completion_rate': section.get_completion_rate(request.user),
+                'completion_rate': section['completion_rate'],
                 'lessons': []
             }
             
-            # Get lessons
-            lessons = section.lessons.filter(is_active=True).order_by('order')
-            for lesson in lessons:
-                lesson_progress = None
-                try:
-                    lesson_progress = UserLessonProgress.objects.get(
-                        user=request.user,
-                        lesson=lesson
-                    )
-                except UserLessonProgress.DoesNotExist:
-                    pass
-                
+            for lesson in section['lessons']:
                 lesson_data = {
-                    'id': str(lesson.id),
-                    'title': lesson.title,
-                    'description': lesson.description,
-                    'lesson_type': lesson.lesson_type,
-                    'order': lesson.order,
-                    'duration_seconds': lesson.duration_seconds,
-                    'is_preview': lesson.is_preview,
+                    'id': lesson['id'],
+                    'title': lesson['title'],
+                    'description': lesson['description'],
+                    'lesson_type': lesson['lesson_type'],
+                    'order': lesson['order'],
+                    'duration_seconds': lesson['duration_seconds'],
+                    'is_preview': lesson['is_preview'],
                     'is_accessible': True,  # All lessons are accessible for registered students
-                    'is_completed': lesson_progress.is_completed if lesson_progress else False,
-                    'watch_percentage': lesson_progress.watch_percentage if lesson_progress else 0,
-                    'last_accessed': lesson_progress.last_accessed if lesson_progress else None,
+                    'is_completed': lesson['is_completed'],
+                    'watch_percentage': lesson['watch_percentage'],
+                    'last_accessed': lesson['last_accessed'],
                     # Add video source information
-                    'video_source': lesson.video_source,
-                    'video_url': lesson.video_url,
-                    'video_file': lesson.video_file.url if lesson.video_file else None,
-                    'video_streaming_url': lesson.video_streaming_url,
-                    'text_content': lesson.text_content
+                    'video_source': lesson['video_source'],
+                    'video_url': lesson['video_url'],
+                    'video_file': lesson['video_file'],
+                    'video_streaming_url': lesson['video_streaming_url'],
+                    'text_content': lesson['text_content']
                 }
                 section_data['lessons'].append(lesson_data)
             
@@ -855,13 +843,30 @@ def update_lesson_progress(request, course_id, section_id, lesson_id):
     PUT/PATCH /api/courses/{course_id}/sections/{section_id}/lessons/{lesson_id}/progress/
     """
     try:
+        # Write-behind mode: coalesce heartbeats in the cache, flushed by a periodic task
+        if progress_buffer.is_enabled():
+            try:
+                progress = progress_buffer.record_heartbeat(
+                    request.user, course_id, section_id, lesson_id, request.data
+                )
+            except CourseEnrollment.DoesNotExist:
+                return Response(
+                    {'detail': 'You are not enrolled in this course.'},
+                    status=status.HTTP_403_FORBIDDEN
+                )
+
+            return Response({
+                'message': 'Progress updated successfully.',
+                'progress': progress
+            }, status=status.HTTP_200_OK)
+
         lesson = CourseLesson.objects.select_related('section', 'section__course').get(
             id=lesson_id,
             section_id=section_id,
             section__course_id=course_id,
             is_active=True
         )
-        
+
         # Check enrollment
         try:
             enrollment = CourseEnrollment.objects.get(
@@ -1628,53 +1633,19 @@ def get_exam_questions(request, attempt_id):
                     status=status.HTTP_400_BAD_REQUEST
                 )
         
-        # Get questions in the order they were shuffled
-        questions_order = attempt.exam_data.get('questions_order', [])
-        questions = []
-        
-        for question_id in questions_order:
-            try:
-                question = ExamQuestion.objects.prefetch_related('answers').get(
-                    id=question_id,
-                    exam=attempt.exam,
-                    is_active=True
-                )
-                
-                question_data = {
-                    'id': str(question.id),
-                    'question_text': question.question_text,
-                    'question_type': question.question_type,
-                    'points': question.points,
-                    'image_url': question.image.url if question.image else None,
-                    'answers': []
-                }
-                
-                # Add answers
-                answers = list(question.answers.all())
-                if attempt.exam_data.get('shuffle_answers', False):
-                    random.shuffle(answers)
-                
-                for answer in answers:
-                    answer_data = {
-                        'id': str(answer.id),
-                        'answer_text': answer.answer_text,
-                        'image_url': answer.image.url if answer.image else None
-                    }
-                    question_data['answers'].append(answer_data)
-                
-                questions.append(question_data)
-                
-            except ExamQuestion.DoesNotExist:
-                continue
+        # Get questions in the order they were shuffled (shared cached payload)
+        questions = get_attempt_questions(attempt)
         
         # Get user's existing answers
-        user_answers = UserExamAnswer.objects.filter(attempt=attempt).select_related('question')
+        user_answers = UserExamAnswer.objects.filter(attempt=attempt).select_related(
+            'question'
+        ).prefetch_related('selected_answers')
         answers_data = {}
         
         for user_answer in user_answers:
             question_id = str(user_answer.question.id)
             if user_answer.question.question_type == 'multiple_choice':
-                answers_data[question_id] = [str(ans_id) for ans_id in user_answer.selected_answers.values_list('id', flat=True)]
+                answers_data[question_id] = [str(answer.id) for answer in user_answer.selected_answers.all()]
             else:
                 answers_data[question_id] = user_answer.text_answer
         
@@ -1947,69 +1918,39 @@ def get_exam_results(request, attempt_id):
 def user_dashboard(request):
     """
     Student Dashboard: Shows ALL courses uploaded by instructor (students paid during registration)
-    GET /api/student/dashboard/
+    GET /api/student/dashboard/ (all courses) or ?page=1&per_page=20
     """
     try:
         user = request.user
         
-        # Get ALL courses uploaded by the instructor - students have access to everything
-        # since they paid during registration
-        courses = Course.objects.all().select_related(
-            'created_by', 'category'
-        ).prefetch_related('reviews').order_by('-created_at')
+        # Since students paid during registration, they have access to ALL courses
+        # uploaded by the instructor; the course cards are shared by every student
+        course_data = get_dashboard_courses()
         
-        # Since students paid during registration, they have access to all courses
-        # No need to check enrollment status - they can access everything
-        
-        # Prepare course data
-        course_data = []
-        for course in courses:
-            course_info = {
-                'id': course.id,
-                'title': course.title,
-                'description': course.description,
-                'thumbnail': course.thumbnail.url if course.thumbnail else None,
-                'video_url': course.get_video_url(),
-                'course_type': course.course_type,
-                'price': 0,  # No additional cost since they already paid
-                'currency': 'USD',
-                'duration_minutes': course.duration_minutes,
-                'difficulty_level': course.difficulty_level,
-                'category': course.get_category_name(),
-                'is_active': course.is_active,
-                'moderation_status': course.moderation_status,
-                'is_enrolled': True,  # All students have access to all courses
-                'can_access': course.is_active and course.moderation_status == 'approved',
-                'instructor_name': course.created_by.full_name if course.created_by else 'Unknown',
-                'created_at': course.created_at,
-                'total_students': CourseEnrollment.objects.filter(course=course, is_active=True).count(),
-                'average_rating': course.reviews.aggregate(Avg('rating'))['rating__avg'] or 0,
-                'access_level': 'full_access'  # Students have full access to all courses
-            }
-            course_data.append(course_info)
+        # Paging is opt-in: without per_page every course is returned, as the dashboard expects
+        page = int(request.GET.get('page', 1))
+        if 'per_page' in request.GET:
+            per_page = min(int(request.GET['per_page']), 50)
+        else:
+            per_page = max(len(course_data), 1)
+        paginator = Paginator(course_data, per_page)
+        page_obj = paginator.get_page(page)
         
         # Get user's progress
         user_progress = UserCourseProgress.objects.filter(user=user).select_related('course')
         
-        # Get user's enrolled courses with progress
-        enrolled_progress = []
-        for progress in user_progress:
-            # Calculate total lessons for this course
-            total_lessons = 0
-            for section in progress.course.sections.filter(is_active=True):
-                total_lessons += section.lessons.filter(is_active=True).count()
-            
-            # Calculate completed lessons from sections_completed
-            completed_lessons = len(progress.sections_completed) if progress.sections_completed else 0
-            
-            enrolled_progress.append({
+        # Get user's enrolled courses with progress, from the denormalized lesson counters
+        enrolled_progress = [
+            {
                 'course_id': progress.course.id,
                 'course_title': progress.course.title,
                 'progress_percentage': progress.progress_percentage,
-                'completed_lessons': completed_lessons,
-                'total_lessons': total_lessons,
+                'completed_lessons': progress.completed_lessons_count,
+                'total_lessons': progress.course.total_lessons,
                 'last_accessed': progress.last_accessed
-            })
+            }
+            for progress in user_progress
+        ]
         
         # Get exam attempts
         recent_attempts = UserExamAttempt.objects.filter(
@@ -2017,10 +1958,10 @@ def user_dashboard(request):
         ).select_related('exam', 'exam__course').order_by('-started_at')[:5]
         
         # Get certificates
-        certificates = ExamCertificate.objects.filter(
+        certificates = list(ExamCertificate.objects.filter(
             user=user,
             is_valid=True
-        ).select_related('exam', 'exam__course').order_by('-issued_at')
+        ).select_related('exam', 'exam__course').order_by('-issued_at'))
         
         # Since students paid during registration, they have access to all courses
         # No additional payment needed
@@ -2033,19 +1974,24 @@ def user_dashboard(request):
                 'payment_status': 'completed',  # Payment completed during registration
                 'access_level': 'full_platform_access'  # Access to all courses
             },
-            'available_courses': course_data,
+            'available_courses': page_obj.object_list,
+            'courses_pagination': {
+                'current_page': page_obj.number,
+                'total_pages': paginator.num_pages,
+                'total_courses': paginator.count,
+                'per_page': per_page,
+                'has_next': page_obj.has_next(),
+                'has_previous': page_obj.has_previous()
+            },
             'enrolled_courses': enrolled_progress,
             'statistics': {
                 'total_courses_available': len([c for c in course_data if c['can_access']]),
                 'total_courses_pending': len([c for c in course_data if c['moderation_status'] == 'pending']),
                 'total_courses_accessible': len([c for c in course_data if c['is_active']]),
-                'completed_courses': user_progress.filter(progress_percentage=100).count(),
-                'in_progress_courses': user_progress.filter(
-                    progress_percentage__gt=0,
-                    progress_percentage__lt=100
-                ).count(),
+                'completed_courses': len([p for p in enrolled_progress if p['progress_percentage'] == 100]),
+                'in_progress_courses': len([p for p in enrolled_progress if 0 < p['progress_percentage'] < 100]),
                 'total_spent': 0,  # No additional cost - already paid during registration
-                'certificates_earned': certificates.count(),
+                'certificates_earned': len(certificates),
                 'platform_access': 'full_access'  # Students have access to entire platform
             },
             'recent_activity': {
@@ -2094,12 +2040,14 @@ def search_courses(request):
             )
         
         # Search in courses
-        courses = Course.objects.filter(
-            Q(title__icontains=query) |
-            Q(description__icontains=query) |
-            Q(category__icontains=query),
-            is_active=True
-        ).select_related('created_by')[:20]
+        courses = list(ranked_course_search(
+            Course.objects.filter(is_active=True).select_related('created_by', 'updated_by').with_catalog_stats(),
+            query
+        )[:20])
+        courses_data = CourseSerializer(courses, many=True).data
+        for course, course_data in zip(courses, courses_data):
+            course_data['search_rank'] = course.search_rank
+            course_data['highlight'] = search_highlights(course, query)
         
         # Search in exam titles (if user is authenticated)
         exams_data = []
@@ -2111,13 +2059,14 @@ def search_courses(request):
                 payment_status='completed'
             ).values_list('course_id', flat=True)
             
-            exams = CourseExam.objects.filter(
-                Q(title__icontains=query) |
-                Q(description__icontains=query),
-                course_id__in=enrolled_courses,
-                is_active=True,
-                is_published=True
-            ).select_related('course')[:10]
+            exams = ranked_exam_search(
+                CourseExam.objects.filter(
+                    course_id__in=enrolled_courses,
+                    is_active=True,
+                    is_published=True
+                ).select_related('course'),
+                query
+            )[:10]
             
             exams_data = [
                 {
@@ -2125,16 +2074,18 @@ def search_courses(request):
                     'title': exam.title,
                     'course_title': exam.course.title,
                     'exam_type': exam.exam_type,
-                    'total_questions': exam.total_questions
+                    'total_questions': exam.total_questions,
+                    'search_rank': exam.search_rank,
+                    'highlight': search_highlights(exam, query)
                 }
                 for exam in exams
             ]
         
         return Response({
             'query': query,
-            'courses': CourseSerializer(courses, many=True).data,
+            'courses': courses_data,
             'exams': exams_data,
-            'total_results': courses.count() + len(exams_data)
+            'total_results': len(courses) + len(exams_data)
         }, status=status.HTTP_200_OK)
     
     except Exception as e:
@@ -7,7 +7,6 @@ from django.conf import settings
 from datetime import timedelta
 from courses.models import Course, CourseAppeal, CourseEnrollment
 from payments.models import Payment, InstructorPayout
-from payments.services import PayoutService, PaystackService
 from utils.auth import EmailService
 import logging
 from django.contrib.auth import get_user_model
@@ -68,4 +67,70 @@ def send_progress_reminders(self):
     except Exception as e:
         logger.error(f"Progress reminder task failed: {str(e)}")
         if self.request.retries < self.max_retries:
-            raise self.retry(countdown=300, exc=e)
\ No newline at end of file
+            raise self.retry(countdown=300, exc=e)
+
+
+@shared_task
+def flush_lesson_progress_buffer():
+    """Persist buffered video heartbeats (LESSON_PROGRESS_BUFFER write-behind mode)"""
+    from courses.progress_buffer import flush_lesson_progress_buffer as flush_buffer
+
+    try:
+        flushed = flush_buffer()
+        if flushed:
+            logger.info(f"Flushed {flushed} buffered lesson progress records")
+    except Exception as e:
+        logger.error(f"Lesson progress buffer flush failed: {str(e)}")
+
+
+@shared_task
+def reconcile_course_daily_stats(days=1):
+    """Rebuild yesterday's course rollups from the source tables"""
+    from courses.rollups import reconcile_course_stats
+
+    try:
+        end_date = timezone.localdate() - timedelta(days=1)
+        rows = reconcile_course_stats(end_date - timedelta(days=days - 1), end_date)
+        logger.info(f"Reconciled {rows} course-days up to {end_date}")
+    except Exception as e:
+        logger.error(f"Course rollup reconcile failed: {str(e)}")
+
+
+@shared_task(bind=True)
+def process_video_metadata(self, lesson_ids):
+    """Extract durations and thumbnails of lessons, reporting progress to the caller"""
+    from utils.video_processing import batch_process_video_metadata
+
+    def report(processed, total):
+        self.update_state(state='PROGRESS', meta={'processed': processed, 'total': total})
+
+    results = batch_process_video_metadata(lesson_ids, on_progress=report)
+    logger.info(f"Processed video metadata for {len(results)} lessons")
+    return results
+
+
+@shared_task(bind=True, max_retries=2)
+def finish_video_upload(self, upload_id):
+    """Send a fully staged video upload to storage"""
+    from courses.video_uploads import finish_video_upload as finish_upload
+
+    try:
+        upload = finish_upload(upload_id)
+        logger.info(f"Video upload {upload_id} finished with status {upload.status}")
+    except Exception as e:
+        logger.error(f"Video upload task failed: {str(e)}")
+        if self.request.retries < self.max_retries:
+            raise self.retry(countdown=60, exc=e)
+
+
+@shared_task
+def expire_stale_video_uploads():
+    """Fail abandoned chunked uploads and free their staging files"""
+    from courses.video_uploads import expire_stale_uploads
+
+    try:
+        expired = expire_stale_uploads()
+        if expired:
+            logger.info(f"Expired {expired} abandoned video uploads")
+    except Exception as e:
+        logger.error(f"Video upload expiry failed: {str(e)}")
@@ -1,3 +1,1175 @@
-from django.test import TestCase
+import os
+import tempfile
+import threading
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.db.models import Q
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from users.models import EmailLog, User
+from utils.admin_email_service import AdminEmailService
+from utils.media_probe import probe_media
+from utils.video_processing import batch_process_video_metadata
+from utils.notifications import send_bulk_email
+from .models import (
+    Course, CourseCategory, CourseDailyStat, CourseEnrollment, CourseExam, CourseReview, CourseSection, CourseLesson, ExamAnswer,
+    ExamQuestion, UserCourseProgress, UserExamAnswer, UserExamAttempt, UserLessonProgress, VideoUpload
+)
+from .serializers import CourseLessonSerializer, CourseProgressDetailSerializer, CourseSerializer
+from . import instructor_views, progress_buffer, student_views
+from .access import CourseAccess
+from .outline import get_course_outline, get_course_outline_with_progress
+from .exam_trends import get_exam_trends
+from .question_analytics import get_question_analytics
+from .rollups import STAT_FIELDS, reconcile_course_stats, rollup_totals, stats_since
+from .search import highlight, ranked_course_search
+from .video_uploads import expire_stale_uploads, finish_video_upload
+
+
+class CourseCatalogQueryTests(TestCase):
+    """The catalog listing must not issue per-course aggregate queries"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = User.objects.create(
+            email='instructor@example.com', full_name='Test Instructor', role='instructor'
+        )
+        cls.students = [
+            User.objects.create(email=f'student{i}@example.com', full_name=f'Student {i}')
+            for i in range(3)
+        ]
+        for i in range(12):
+            course = Course.objects.create(
+                title=f'Course {i}',
+                description='NCLEX review course',
+                video_url='https://example.com/video.mp4',
+                created_by=cls.instructor,
+            )
+            for j, student in enumerate(cls.students):
+                UserCourseProgress.objects.create(
+                    user=student, course=course, progress_percentage=100 if j == 0 else 40
+                )
+                CourseReview.objects.create(user=student, course=course, rating=j + 3)
+
+    def setUp(self):
+        cache.clear()
+        self.factory = APIRequestFactory()
+
+    def _count_list_queries(self, per_page):
+        request = self.factory.get('/api/courses/', {'per_page': per_page})
+        with CaptureQueriesContext(connection) as ctx:
+            response = student_views.list_courses(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['courses']), per_page)
+        return len(ctx.captured_queries)
+
+    def test_list_courses_query_count_is_constant(self):
+        self.assertEqual(self._count_list_queries(2), self._count_list_queries(10))
+
+    def test_annotated_stats_match_model_methods(self):
+        annotated = Course.objects.with_catalog_stats().get(title='Course 0')
+        plain = Course.objects.get(title='Course 0')
+
+        self.assertEqual(CourseSerializer(annotated).data, CourseSerializer(plain).data)
+
+
+class IncrementalCourseProgressTests(TestCase):
+    """Course progress counters move only when a lesson's completion flips"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create(email='learner@example.com', full_name='Learner')
+        cls.course = Course.objects.create(
+            title='Pharmacology', description='Drug classes', video_url='https://example.com/v.mp4'
+        )
+        cls.sections = [
+            CourseSection.objects.create(course=cls.course, title=f'Section {i}', order=i + 1)
+            for i in range(2)
+        ]
+        cls.lessons = [
+            CourseLesson.objects.create(
+                section=section, title=f'Lesson {j}', order=j + 1, video_url='https://example.com/l.mp4'
+            )
+            for section in cls.sections for j in range(2)
+        ]
+
+    def setUp(self):
+        self.progress = UserCourseProgress.objects.create(user=self.student, course=self.course)
+
+    def _watch(self, lesson, percentage):
+        lesson_progress, _ = UserLessonProgress.objects.get_or_create(user=self.student, lesson=lesson)
+        lesson_progress.watch_percentage = percentage
+        lesson_progress.save()
+        return lesson_progress
+
+    def test_completion_flip_updates_counters(self):
+        self._watch(self.lessons[0], 90)
+        self._watch(self.lessons[1], 95)
+        self.progress.refresh_from_db()
+
+        self.assertEqual(self.progress.completed_lessons_count, 2)
+        self.assertEqual(self.progress.progress_percentage, 50)
+        self.assertEqual(self.progress.sections_completed, [str(self.sections[0].id)])
+
+        self._watch(self.lessons[1], 10)
+        self.progress.refresh_from_db()
+
+        self.assertEqual(self.progress.completed_lessons_count, 1)
+        self.assertEqual(self.progress.progress_percentage, 25)
+        self.assertEqual(self.progress.sections_completed, [])
+
+    def test_heartbeat_without_flip_skips_course_progress(self):
+        lesson_progress = self._watch(self.lessons[0], 30)
+        lesson_progress = UserLessonProgress.objects.get(pk=lesson_progress.pk)
+        lesson_progress.watch_percentage = 40
+
+        with CaptureQueriesContext(connection) as ctx:
+            lesson_progress.save()
+
+        self.assertFalse(any('user_course_progress' in q['sql'] for q in ctx.captured_queries))
+
+    def test_progress_tree_query_count_is_constant(self):
+        self._watch(self.lessons[0], 100)
+        self._watch(self.lessons[1], 50)
+        self.progress.refresh_from_db()
+
+        with self.assertNumQueries(3):
+            sections_progress = self.progress.get_progress_by_section()
+            current_lesson = self.progress.get_current_lesson()
+            next_lesson = self.progress.get_next_lesson_to_study()
+
+        self.assertEqual(sections_progress[0]['completed_lessons'], 1)
+        self.assertEqual(sections_progress[0]['lessons'][1]['watch_percentage'], 50)
+        self.assertEqual(current_lesson, self.lessons[1])
+        self.assertEqual(next_lesson, self.lessons[2])
+
+        # The serializer's course/user lookups are the only extra queries
+        progress = UserCourseProgress.objects.select_related('course', 'user').get(pk=self.progress.pk)
+        with self.assertNumQueries(3):
+            data = CourseProgressDetailSerializer(progress).data
+        self.assertEqual(data['next_lesson_to_study']['section_title'], 'Section 1')
+
+    def test_rebuild_command_repairs_drift(self):
+        for lesson in self.lessons[:3]:
+            self._watch(lesson, 100)
+        UserCourseProgress.objects.filter(pk=self.progress.pk).update(
+            completed_lessons_count=0, section_completed_counts={}, sections_completed=[], progress_percentage=0
+        )
+
+        call_command('rebuild_course_progress', stdout=StringIO())
+        self.progress.refresh_from_db()
+
+        self.assertEqual(self.progress.completed_lessons_count, 3)
+        self.assertEqual(self.progress.progress_percentage, 75)
+        self.assertEqual(self.progress.section_completed_counts, {
+            str(self.sections[0].id): 2, str(self.sections[1].id): 1
+        })
+        self.assertEqual(self.progress.sections_completed, [str(self.sections[0].id)])
+
+
+@override_settings(LESSON_PROGRESS_BUFFER={'ENABLED': True})
+class BufferedLessonProgressTests(TestCase):
+    """Heartbeats are coalesced in the cache until the buffer is flushed"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create(email='viewer@example.com', full_name='Viewer')
+        cls.course = Course.objects.create(
+            title='Cardiology', description='Heart rhythms', video_url='https://example.com/v.mp4'
+        )
+        cls.section = CourseSection.objects.create(course=cls.course, title='Basics', order=1)
+        cls.lesson = CourseLesson.objects.create(
+            section=cls.section, title='ECG', order=1, video_url='https://example.com/l.mp4'
+        )
+        CourseEnrollment.objects.create(user=cls.student, course=cls.course, payment_status='completed')
+
+    def setUp(self):
+        cache.clear()
+        self.factory = APIRequestFactory()
+        UserCourseProgress.objects.create(user=self.student, course=self.course)
+
+    def _heartbeat(self, **data):
+        request = self.factory.put('/progress/', data, format='json')
+        force_authenticate(request, user=self.student)
+        response = student_views.update_lesson_progress(
+            request, self.course.id, self.section.id, self.lesson.id
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.data['progress']
+
+    def test_heartbeats_are_buffered_until_flush(self):
+        self._heartbeat(watch_time_seconds=30, current_position_seconds=30, watch_percentage=10)
+
+        with CaptureQueriesContext(connection) as ctx:
+            progress = self._heartbeat(watch_time_seconds=20, current_position_seconds=60, watch_percentage=20)
+
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertEqual(progress['watch_time_seconds'], 30)
+        self.assertEqual(progress['current_position_seconds'], 60)
+        self.assertEqual(UserLessonProgress.objects.get(user=self.student).watch_percentage, 0)
+
+        self.assertEqual(progress_buffer.flush_lesson_progress_buffer(), 1)
+        lesson_progress = UserLessonProgress.objects.get(user=self.student)
+        self.assertEqual(lesson_progress.watch_time_seconds, 30)
+        self.assertEqual(lesson_progress.current_position_seconds, 60)
+        self.assertEqual(lesson_progress.watch_percentage, 20)
+
+        # Heartbeats after a flush are indexed again
+        self._heartbeat(current_position_seconds=90, watch_percentage=30)
+        self.assertEqual(progress_buffer.flush_lesson_progress_buffer(), 1)
+        self.assertEqual(UserLessonProgress.objects.get(user=self.student).current_position_seconds, 90)
+
+    def test_failed_flush_keeps_entries_for_the_next_run(self):
+        self._heartbeat(watch_time_seconds=40, current_position_seconds=40, watch_percentage=15)
+
+        with mock.patch.object(UserLessonProgress.objects, 'bulk_update', side_effect=DatabaseError('deadlock')):
+            with self.assertRaises(DatabaseError):
+                progress_buffer.flush_lesson_progress_buffer()
+        self.assertEqual(UserLessonProgress.objects.get(user=self.student).current_position_seconds, 0)
+
+        self.assertEqual(progress_buffer.flush_lesson_progress_buffer(), 1)
+        self.assertEqual(UserLessonProgress.objects.get(user=self.student).current_position_seconds, 40)
+
+    def test_completion_flip_is_written_synchronously(self):
+        self._heartbeat(watch_percentage=50)
+        progress = self._heartbeat(watch_percentage=95)
+
+        self.assertTrue(progress['is_completed'])
+        self.assertTrue(UserLessonProgress.objects.get(user=self.student).is_completed)
+        course_progress = UserCourseProgress.objects.get(user=self.student, course=self.course)
+        self.assertEqual(course_progress.progress_percentage, 100)
+
+    def test_unenrolled_user_is_rejected(self):
+        CourseEnrollment.objects.filter(user=self.student).update(payment_status='pending')
+        request = self.factory.put('/progress/', {'watch_percentage': 10}, format='json')
+        force_authenticate(request, user=self.student)
+        response = student_views.update_lesson_progress(
+            request, self.course.id, self.section.id, self.lesson.id
+        )
+        self.assertEqual(response.status_code, 403)
+
+
+class CourseOutlineCacheTests(TestCase):
+    """The section/lesson outline is cached per course version"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create(email='outline@example.com', full_name='Outline Student')
+        cls.course = Course.objects.create(
+            title='Maternity', description='Labor stages', video_url='https://example.com/v.mp4'
+        )
+        cls.section = CourseSection.objects.create(course=cls.course, title='Labor', order=1)
+        cls.lessons = [
+            CourseLesson.objects.create(
+                section=cls.section, title=f'Stage {i}', order=i + 1, video_url='https://example.com/l.mp4'
+            )
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_outline_is_served_from_cache_with_progress_overlay(self):
+        get_course_outline(self.course.id)
+        UserLessonProgress.objects.create(
+            user=self.student, lesson=self.lessons[0], watch_percentage=100
+        )
+
+        # Only the user's lesson progress is queried once the outline is cached
+        with self.assertNumQueries(1):
+            outline = get_course_outline_with_progress(self.course.id, self.student)
+
+        lessons = outline[0]['lessons']
+        self.assertEqual([lesson['title'] for lesson in lessons], ['Stage 0', 'Stage 1', 'Stage 2'])
+        self.assertTrue(lessons[0]['is_completed'])
+        self.assertFalse(lessons[1]['is_completed'])
+        self.assertEqual(outline[0]['completion_rate'], 33.33)
+        self.assertNotIn('is_completed', get_course_outline(self.course.id)[0]['lessons'][0])
+
+    def test_lesson_changes_bump_the_outline_version(self):
+        get_course_outline(self.course.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            lesson = self.lessons[0]
+            lesson.order = 10
+            lesson.save(update_fields=['order'])
+
+        titles = [lesson['title'] for lesson in get_course_outline(self.course.id)[0]['lessons']]
+        self.assertEqual(titles, ['Stage 1', 'Stage 2', 'Stage 0'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lessons[1].delete()
+
+        self.assertEqual(len(get_course_outline(self.course.id)[0]['lessons']), 2)
+
+    def test_moving_a_lesson_bumps_both_courses(self):
+        other_course = Course.objects.create(title='Pediatrics', description='Children')
+        other_section = CourseSection.objects.create(course=other_course, title='Growth', order=1)
+        get_course_outline(self.course.id)
+        get_course_outline(other_course.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            lesson = CourseLesson.objects.get(pk=self.lessons[2].pk)
+            lesson.section = other_section
+            lesson.save()
+
+        self.assertEqual(
+            [lesson['title'] for lesson in get_course_outline(self.course.id)[0]['lessons']], ['Stage 0', 'Stage 1']
+        )
+        self.assertEqual(
+            [lesson['title'] for lesson in get_course_outline(other_course.id)[0]['lessons']], ['Stage 2']
+        )
+        self.assertIsNone(CourseLesson.objects.get(pk=self.lessons[1].pk).get_next_lesson_id())
+
+    def test_next_and_previous_lessons_from_cached_play_order(self):
+        lessons = list(CourseLesson.objects.select_related('section').filter(section=self.section).order_by('order'))
+        ids = [str(lesson.id) for lesson in lessons]
+        lessons[0].get_next_lesson_id()
+
+        with self.assertNumQueries(0):
+            links = [(lesson.get_previous_lesson_id(), lesson.get_next_lesson_id()) for lesson in lessons]
+        self.assertEqual(links, [(None, ids[1]), (ids[0], ids[2]), (ids[1], None)])
+
+        # Moving the first lesson to the end rebuilds the play order
+        first = lessons[0]
+        first.order = 10
+        with self.captureOnCommitCallbacks(execute=True):
+            first.save(update_fields=['order'])
+        self.assertEqual((first.get_previous_lesson_id(), first.get_next_lesson_id()), (ids[2], None))
+        self.assertIsNone(lessons[1].get_previous_lesson_id())
+
+
+class ExamQuestionDeliveryTests(TestCase):
+    """Exam questions come from a shared per-exam payload in attempt order"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create(email='candidate@example.com', full_name='Candidate')
+        course = Course.objects.create(
+            title='NCLEX Practice', description='Practice exams', video_url='https://example.com/v.mp4'
+        )
+        cls.exam = CourseExam.objects.create(course=course, title='Practice Exam 1')
+        cls.questions = []
+        for i in range(6):
+            question = ExamQuestion.objects.create(exam=cls.exam, question_text=f'Question {i}', order=i + 1)
+            for j in range(4):
+                ExamAnswer.objects.create(
+                    question=question, answer_text=f'Answer {i}.{j}', is_correct=j == 0, order=j + 1
+                )
+            cls.questions.append(question)
+
+    def setUp(self):
+        cache.clear()
+        self.factory = APIRequestFactory()
+
+    def _fetch(self, question_count):
+        order = [str(question.id) for question in reversed(self.questions[:question_count])]
+        attempt = UserExamAttempt.objects.create(
+            user=self.student, exam=self.exam, exam_data={'questions_order': order},
+            attempt_number=UserExamAttempt.objects.filter(user=self.student).count() + 1
+        )
+        request = self.factory.get('/questions/')
+        force_authenticate(request, user=self.student)
+        with CaptureQueriesContext(connection) as ctx:
+            response = student_views.get_exam_questions(request, attempt.id)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([question['id'] for question in response.data['questions']], order)
+        return len(ctx.captured_queries), response.data['questions']
+
+    def test_questions_load_in_constant_queries_without_answer_keys(self):
+        self._fetch(1)  # Warm the shared question bank
+        small_count, _ = self._fetch(2)
+        large_count, questions = self._fetch(6)
+
+        self.assertEqual(small_count, large_count)
+        self.assertEqual(len(questions[0]['answers']), 4)
+        self.assertNotIn('is_correct', questions[0]['answers'][0])
+
+
+class ExamScoringTests(TestCase):
+    """Bulk scoring matches per-answer validation for every question type"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create(email='scorer@example.com', full_name='Scorer')
+        course = Course.objects.create(
+            title='Fundamentals', description='Nursing fundamentals', video_url='https://example.com/v.mp4'
+        )
+        cls.exam = CourseExam.objects.create(course=course, title='Fundamentals Quiz', passing_score=50)
+
+    def _question(self, question_type, answers, points=1):
+        question = ExamQuestion.objects.create(
+            exam=self.exam, question_text=f'{question_type} question', question_type=question_type, points=points
+        )
+        return question, [
+            ExamAnswer.objects.create(question=question, answer_text=text, is_correct=is_correct, order=i + 1)
+            for i, (text, is_correct) in enumerate(answers)
+        ]
+
+    def _answer(self, attempt, question, selected=None, text=''):
+        user_answer = UserExamAnswer.objects.create(attempt=attempt, question=question, text_answer=text)
+        if selected:
+            user_answer.selected_answers.set(selected)
+        return user_answer
+
+    def test_bulk_scoring_matches_validation(self):
+        multi, multi_answers = self._question('multiple_choice', [('A', True), ('B', True), ('C', False)], points=3)
+        single, single_answers = self._question('multiple_choice', [('A', True), ('B', False)])
+        true_false, _ = self._question('true_false', [('True', True), ('False', False)], points=2)
+        fill_blank, _ = self._question('fill_blank', [('Insulin', True), ('insulin glargine', True)])
+
+        attempt = UserExamAttempt.objects.create(user=self.student, exam=self.exam)
+        user_answers = [
+            self._answer(attempt, multi, selected=multi_answers[:2]),
+            self._answer(attempt, single, selected=single_answers[1:]),
+            self._answer(attempt, true_false, text=' true '),
+            self._answer(attempt, fill_blank, text='INSULIN GLARGINE'),
+        ]
+        expected = [user_answer.question.validate_answer(
+            [answer.id for answer in user_answer.selected_answers.all()]
+            if user_answer.question.question_type == 'multiple_choice' else user_answer.text_answer
+        ) for user_answer in user_answers]
+        self.assertEqual(expected, [True, False, True, True])
+
+        attempt = UserExamAttempt.objects.select_related('exam').get(pk=attempt.pk)
+        with self.assertNumQueries(6):
+            attempt.complete_attempt()
+
+        self.assertEqual(attempt.correct_answers, 3)
+        self.assertEqual((attempt.total_points, attempt.earned_points), (7, 6))
+        self.assertTrue(attempt.passed)
+        self.assertEqual(
+            list(UserExamAnswer.objects.filter(attempt=attempt).order_by('question__points', 'question__question_type')
+                 .values_list('points_earned', flat=True)),
+            [1, 0, 2, 3]
+        )
+
+
+class BulkNotificationTests(TestCase):
+    """Fan-out notifications render once and are delivered by a single job"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = Course.objects.create(
+            title='Pediatrics', description='Growth milestones', video_url='https://example.com/v.mp4'
+        )
+        cls.students = [
+            User.objects.create(email=f'parent{i}@example.com', full_name=f'Parent <{i}>')
+            for i in range(3)
+        ]
+        for student in cls.students:
+            UserCourseProgress.objects.create(user=student, course=cls.course)
+
+    def test_pricing_change_renders_once_and_enqueues_after_commit(self):
+        render = mock.Mock(wraps=AdminEmailService._render_template)
+        with mock.patch.object(AdminEmailService, '_render_template', render), \
+                mock.patch('users.tasks.send_bulk_email_task.delay') as delay:
+            with self.captureOnCommitCallbacks() as callbacks:
+                AdminEmailService.notify_students_pricing_changed(self.course, 10, 20)
+            delay.assert_not_called()
+            for callback in callbacks:
+                callback()
+
+        self.assertEqual(render.call_count, 1)
+        delay.assert_called_once()
+        recipients = delay.call_args.kwargs['recipients']
+        self.assertEqual({r['email'] for r in recipients}, {s.email for s in self.students})
+        self.assertIn('[[recipient:full_name]]', delay.call_args.kwargs['html_message'])
+
+    def test_send_bulk_email_personalizes_and_logs_in_one_insert(self):
+        recipients = [
+            {'id': str(s.id), 'email': s.email, 'full_name': s.full_name, 'first_name': 'Parent'}
+            for s in self.students
+        ]
+        with self.assertNumQueries(1):
+            sent = send_bulk_email(
+                'course_pricing_changed', 'Pricing Update', '<p>Hello [[recipient:full_name]]</p>',
+                'Pricing changed for [[recipient:full_name]]', recipients, chunk_size=2
+            )
+
+        self.assertEqual(sent, 3)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(mail.outbox[0].alternatives[0][0], '<p>Hello Parent &lt;0&gt;</p>')
+        # The plain-text part is not HTML-escaped
+        self.assertEqual(mail.outbox[0].body, 'Pricing changed for Parent <0>')
+        self.assertEqual(EmailLog.objects.filter(success=True).count(), 3)
+
+
+class CourseDailyStatTests(TestCase):
+    """Daily course rollups follow writes incrementally and match a rebuild"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = Course.objects.create(
+            title='Oncology', description='Staging', video_url='https://example.com/v.mp4'
+        )
+        cls.admin = User.objects.create(email='rollup-admin@example.com', full_name='Admin', role='admin')
+        cls.students = [
+            User.objects.create(email=f'rollup{i}@example.com', full_name=f'Rollup {i}')
+            for i in range(3)
+        ]
+
+    def _stats(self):
+        stat = CourseDailyStat.objects.get(course=self.course, date=timezone.localdate())
+        return {field: getattr(stat, field) for field in STAT_FIELDS}
+
+    def test_signals_match_reconcile(self):
+        enrollments = [
+            CourseEnrollment.objects.create(user=student, course=self.course, payment_status='pending')
+            for student in self.students
+        ]
+        enrollment = CourseEnrollment.objects.get(pk=enrollments[0].pk)
+        enrollment.payment_status = 'completed'
+        enrollment.amount_paid = Decimal('50.00')
+        enrollment.save()
+        enrollments[1].delete()
+
+        progress = UserCourseProgress.objects.create(user=self.students[0], course=self.course)
+        progress.progress_percentage = 100
+        progress.save()
+        CourseReview.objects.create(user=self.students[0], course=self.course, rating=4)
+
+        incremental = self._stats()
+        self.assertEqual(incremental['enrollments'], 2)
+        self.assertEqual(incremental['paid_enrollments'], 1)
+        self.assertEqual(incremental['pending_payments'], 1)
+        self.assertEqual(incremental['revenue'], Decimal('50.00'))
+        self.assertEqual(incremental['completions'], 1)
+        self.assertEqual(incremental['rating_total'], 4)
+
+        today = timezone.localdate()
+        reconcile_course_stats(today, today)
+        self.assertEqual(self._stats(), incremental)
+
+    def test_payment_analytics_reads_rollups(self):
+        for student in self.students:
+            CourseEnrollment.objects.create(
+                user=student, course=self.course, payment_status='completed', amount_paid=Decimal('20.00')
+            )
+
+        request = APIRequestFactory().get('/api/admin/payments/analytics/')
+        force_authenticate(request, user=self.admin)
+        response = instructor_views.payment_analytics(request)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['revenue']['total_revenue'], 60.0)
+        self.assertEqual(response.data['enrollments']['paid_enrollments'], 3)
+        self.assertEqual(response.data['top_courses'][0]['enrollments'], 3)
+
+    def test_last_days_window_covers_exactly_that_many_days(self):
+        today = timezone.localdate()
+        for days_ago in (0, 29, 30):
+            CourseDailyStat.objects.create(course=self.course, date=today - timedelta(days=days_ago), enrollments=1)
+
+        self.assertEqual(stats_since(30), today - timedelta(days=29))
+        totals = rollup_totals(CourseDailyStat.objects.all(), recent=Q(date__gte=stats_since(30)))
+        self.assertEqual((totals['enrollments'], totals['recent_enrollments']), (3, 2))
+
+
+class QuestionAnalyticsTests(TestCase):
+    """Item analysis is computed once per exam and refreshed when attempts complete"""
+
+    @classmethod
+    def setUpTestData(cls):
+        course = Course.objects.create(
+            title='Psychiatry', description='Therapeutic communication', video_url='https://example.com/v.mp4'
+        )
+        cls.exam = CourseExam.objects.create(course=course, title='Psych Quiz')
+        cls.questions = []
+        for i in range(3):
+            question = ExamQuestion.objects.create(
+                exam=cls.exam, question_text=f'Question {i}', question_type='multiple_choice', order=i + 1
+            )
+            answers = [
+                ExamAnswer.objects.create(question=question, answer_text='Right', is_correct=True, order=1),
+                ExamAnswer.objects.create(question=question, answer_text='Wrong', is_correct=False, order=2),
+            ]
+            cls.questions.append((question, answers))
+        cls.students = [
+            User.objects.create(email=f'item{i}@example.com', full_name=f'Item {i}') for i in range(5)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def _complete(self, student, correct_flags):
+        attempt = UserExamAttempt.objects.create(user=student, exam=self.exam, attempt_number=1)
+        for (question, answers), correct in zip(self.questions, correct_flags):
+            user_answer = UserExamAnswer.objects.create(attempt=attempt, question=question, time_taken_seconds=30)
+            user_answer.selected_answers.set([answers[0] if correct else answers[1]])
+        attempt.complete_attempt()
+        return attempt
+
+    def test_item_statistics(self):
+        # Question 0 tracks overall ability, question 2 is answered correctly by everyone
+        for student, flags in zip(self.students[:4], [(1, 1, 1), (1, 1, 1), (0, 0, 1), (0, 1, 1)]):
+            self._complete(student, flags)
+
+        with self.assertNumQueries(3):
+            analytics = get_question_analytics(self.exam.id)
+        with self.assertNumQueries(0):
+            get_question_analytics(self.exam.id)
+
+        first, _, easy = (analytics['questions'][str(question.id)] for question, _ in self.questions)
+        self.assertEqual(analytics['total_attempts'], 4)
+        self.assertEqual((first['total_attempts'], first['correct_attempts']), (4, 2))
+        self.assertEqual(first['p_value'], 0.5)
+        self.assertEqual(first['average_time_spent'], 30)
+        self.assertGreater(first['discrimination'], 0)
+        self.assertEqual(easy['p_value'], 1.0)
+        self.assertIsNone(easy['discrimination'])
+        self.assertEqual(first['selections'][str(self.questions[0][1][1].id)], 2)
+
+    def test_completed_attempt_invalidates_cache(self):
+        self._complete(self.students[0], (1, 1, 1))
+        self.assertEqual(get_question_analytics(self.exam.id)['total_attempts'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self._complete(self.students[1], (0, 0, 0))
+        self.assertEqual(get_question_analytics(self.exam.id)['total_attempts'], 2)
+
+
+class StudentRosterTests(TestCase):
+    """The instructor roster is built in a constant number of queries"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = User.objects.create(
+            email='roster-instructor@example.com', full_name='Roster Instructor', role='instructor'
+        )
+        cls.courses = [
+            Course.objects.create(
+                title=f'Roster {i}', description='Roster', video_url='https://example.com/v.mp4',
+                created_by=cls.instructor
+            )
+            for i in range(2)
+        ]
+        other = Course.objects.create(title='Other', description='Other', video_url='https://example.com/v.mp4')
+        cls.students = [
+            User.objects.create(email=f'roster{i}@example.com', full_name=f'Roster Student {i}')
+            for i in range(5)
+        ]
+        UserCourseProgress.objects.create(user=cls.students[0], course=cls.courses[0], progress_percentage=40)
+        UserCourseProgress.objects.create(user=cls.students[0], course=cls.courses[1], progress_percentage=90)
+        UserCourseProgress.objects.create(user=cls.students[1], course=cls.courses[0], progress_percentage=10)
+        UserCourseProgress.objects.create(user=cls.students[1], course=other, progress_percentage=100)
+
+    def setUp(self):
+        cache.clear()
+
+    def _get(self, params):
+        request = APIRequestFactory().get('/api/admin/students/', params)
+        force_authenticate(request, user=self.instructor)
+        return instructor_views.get_all_students(request)
+
+    def test_page_sorted_by_progress(self):
+        with self.assertNumQueries(3):
+            response = self._get({'sort_by': '-overall_progress', 'per_page': 2})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_students'], 5)
+        self.assertEqual(response.data['total_courses_available'], 2)
+        self.assertEqual(response.data['pagination']['total_pages'], 3)
+        first, second = response.data['students']
+        self.assertEqual((first['email'], first['courses_accessed'], first['overall_progress']),
+                         ('roster0@example.com', 2, 65.0))
+        # Progress in another instructor's course is not counted
+        self.assertEqual((second['email'], second['courses_accessed'], second['overall_progress']),
+                         ('roster1@example.com', 1, 10.0))
+
+    def test_whole_roster_without_per_page(self):
+        # More students than the old default page of 50
+        User.objects.bulk_create(
+            User(email=f'roster-extra{i}@example.com', full_name=f'Extra {i}') for i in range(50)
+        )
+        response = self._get({})
+
+        self.assertEqual(len(response.data['students']), 55)
+        self.assertEqual(response.data['pagination']['total_pages'], 1)
+        self.assertFalse(response.data['pagination']['has_next'])
+
+    def test_search_and_csv_export(self):
+        response = self._get({'search': 'roster3@'})
+        self.assertEqual([s['email'] for s in response.data['students']], ['roster3@example.com'])
+
+        response = self._get({'export': 'csv', 'sort_by': 'email'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ['id', 'full_name', 'email'])
+        self.assertEqual([line.split(',')[2] for line in lines[1:]], [s.email for s in self.students])
+
+
+class CourseSearchTests(TestCase):
+    """Search ranks title matches above description and category matches"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = CourseCategory.objects.create(name='Pharmacology', slug='pharmacology')
+        cls.by_title = Course.objects.create(
+            title='Pharmacology Essentials', description='Drug classes', video_url='https://example.com/v.mp4'
+        )
+        cls.by_description = Course.objects.create(
+            title='Medication Safety', description='Applied pharmacology for nurses',
+            video_url='https://example.com/v.mp4'
+        )
+        cls.by_category = Course.objects.create(
+            title='Dosage Math', description='Calculations', video_url='https://example.com/v.mp4',
+            category=category
+        )
+        Course.objects.create(title='Cardiology', description='Rhythms', video_url='https://example.com/v.mp4')
+
+    def _get(self, view, params):
+        return view(APIRequestFactory().get('/api/courses/', params))
+
+    def test_results_are_ranked_and_highlighted(self):
+        response = self._get(student_views.search_courses, {'q': 'pharmacology'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [course['id'] for course in response.data['courses']],
+            [str(self.by_title.id), str(self.by_description.id), str(self.by_category.id)]
+        )
+        self.assertEqual(response.data['total_results'], 3)
+        self.assertEqual(response.data['courses'][0]['highlight']['title'], '<mark>Pharmacology</mark> Essentials')
+
+        response = self._get(student_views.list_courses, {'search': 'pharmacology'})
+        self.assertEqual(response.data['courses'][0]['id'], str(self.by_title.id))
+        self.assertEqual(response.data['pagination']['total_courses'], 3)
+
+    def test_filters_apply_before_ranking(self):
+        Course.objects.filter(pk=self.by_description.pk).update(difficulty_level='advanced')
+        Course.objects.exclude(pk=self.by_description.pk).update(difficulty_level='beginner')
+
+        with mock.patch('courses.student_views.ranked_course_search', wraps=ranked_course_search) as search:
+            response = self._get(student_views.list_courses, {'search': 'pharmacology', 'difficulty': 'advanced'})
+
+        # The ranking sees only the filtered courses, so matches outside them cannot hide typo matches
+        self.assertEqual(list(search.call_args.args[0]), [self.by_description])
+        self.assertEqual([course['id'] for course in response.data['courses']], [str(self.by_description.id)])
+
+    def test_highlight_escapes_text(self):
+        self.assertEqual(highlight('<b>Nursing</b> care', 'nurse'), '&lt;b&gt;<mark>Nursing</mark>&lt;/b&gt; care')
+        # Entities created by escaping are never matched or split
+        self.assertEqual(highlight('R&D', 'amp'), 'R&amp;D')
+        self.assertEqual(highlight('a < b', 'lt'), 'a &lt; b')
+        self.assertEqual(highlight('Q&A drills', 'drills'), 'Q&amp;A <mark>drills</mark>')
+
+
+class StudentDashboardTests(TestCase):
+    """The dashboard's course cards are annotated in one query and shared through the cache"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create(email='dashboard@example.com', full_name='Dashboard Student')
+        cls.courses = [
+            Course.objects.create(
+                title=f'Dashboard {i}', description='Cards', video_url='https://example.com/v.mp4', total_lessons=4
+            )
+            for i in range(3)
+        ]
+        reviewer = User.objects.create(email='dashboard-reviewer@example.com', full_name='Reviewer')
+        for user, rating in ((cls.student, 4), (reviewer, 2)):
+            CourseEnrollment.objects.create(user=user, course=cls.courses[0], payment_status='completed')
+            CourseReview.objects.create(user=user, course=cls.courses[0], rating=rating)
+        UserCourseProgress.objects.create(
+            user=cls.student, course=cls.courses[0], progress_percentage=50, completed_lessons_count=2
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def _get(self, params=None):
+        request = APIRequestFactory().get('/api/student/dashboard/', params or {})
+        force_authenticate(request, user=self.student)
+        return student_views.user_dashboard(request)
+
+    def test_cards_are_batched_paginated_and_cached(self):
+        with CaptureQueriesContext(connection) as first:
+            response = self._get({'per_page': 2})
+        with CaptureQueriesContext(connection) as second:
+            self._get({'per_page': 2})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(second), len(first) - 1)
+        self.assertEqual(response.data['courses_pagination']['total_courses'], 3)
+        self.assertEqual(len(response.data['available_courses']), 2)
+
+        # Newest first: the reviewed course is alone on the last page
+        card, = self._get({'page': 2, 'per_page': 2}).data['available_courses']
+        self.assertEqual(card['id'], self.courses[0].id)
+        self.assertEqual((card['total_students'], card['average_rating'], card['total_lessons']), (2, 3.0, 4))
+        self.assertEqual(response.data['enrolled_courses'][0]['completed_lessons'], 2)
+        self.assertEqual(response.data['statistics']['in_progress_courses'], 1)
+
+        # Without per_page the dashboard gets every course on one page
+        response = self._get()
+        self.assertEqual(len(response.data['available_courses']), 3)
+        self.assertFalse(response.data['courses_pagination']['has_next'])
+
+
+class ExamTrendsTests(TestCase):
+    """Exam trends are bucketed in the database, zero-filled and cached"""
+
+    @classmethod
+    def setUpTestData(cls):
+        course = Course.objects.create(
+            title='Maternity', description='Labor stages', video_url='https://example.com/v.mp4'
+        )
+        cls.exam = CourseExam.objects.create(course=course, title='Maternity Quiz')
+        cls.admin = User.objects.create(email='trends-admin@example.com', full_name='Admin', role='admin')
+        cls.students = [
+            User.objects.create(email=f'trend{i}@example.com', full_name=f'Trend {i}') for i in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def _attempt(self, student, days_ago, score, passed):
+        UserExamAttempt.objects.create(
+            user=student, exam=self.exam, attempt_number=1, status='completed', passed=passed,
+            percentage_score=Decimal(score), completed_at=timezone.now() - timedelta(days=days_ago)
+        )
+
+    def test_daily_series_with_rolling_average(self):
+        self._attempt(self.students[0], 0, 80, True)
+        self._attempt(self.students[1], 0, 40, False)
+        self._attempt(self.students[2], 2, 90, True)
+
+        with self.assertNumQueries(2):
+            trends = get_exam_trends(self.exam.id, bucket='day', days=5)
+        with self.assertNumQueries(0):
+            get_exam_trends(self.exam.id, bucket='day', days=5)
+
+        series = trends['trends']
+        self.assertEqual([point['total_attempts'] for point in series], [0, 0, 1, 0, 2])
+        self.assertEqual(series[-1]['period_start'], timezone.localdate())
+        self.assertEqual((series[-1]['average_score'], series[-1]['pass_rate']), (60.0, 50.0))
+        self.assertEqual(series[-1]['rolling_average_score'], 70.0)
+        self.assertEqual(trends['weekly_comparison']['current_week']['attempts'], 3)
+
+    def test_bucket_is_validated(self):
+        request = APIRequestFactory().get('/', {'bucket': 'hour'})
+        force_authenticate(request, user=self.admin)
+        response = instructor_views.exam_performance_trends(
+            request, course_id=self.exam.course_id, exam_id=self.exam.id
+        )
+        self.assertEqual(response.status_code, 400)
+
+        request = APIRequestFactory().get('/', {'bucket': 'month', 'days': 60})
+        force_authenticate(request, user=self.admin)
+        response = instructor_views.exam_performance_trends(
+            request, course_id=self.exam.course_id, exam_id=self.exam.id
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['trends'][-1]['period_start'], timezone.localdate().replace(day=1))
+
+
+MEDIA_FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures', 'media')
+
+
+class _RangeRequestHandler(SimpleHTTPRequestHandler):
+    """Static file handler that answers single Range requests with 206"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, directory=MEDIA_FIXTURES, **kwargs)
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.server.requests += 1
+        header = self.headers.get('Range')
+        if not header:
+            return super().do_GET()
+
+        with open(self.translate_path(self.path), 'rb') as media:
+            data = media.read()
+        first, _, last = header.split('=', 1)[1].partition('-')
+        first, last = int(first), min(int(last or len(data) - 1), len(data) - 1)
+        self.send_response(206)
+        self.send_header('Content-Range', f'bytes {first}-{last}/{len(data)}')
+        self.send_header('Content-Length', str(last - first + 1))
+        self.end_headers()
+        self.wfile.write(data[first:last + 1])
+
+
+class MediaProbeTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _RangeRequestHandler)
+        cls.server.requests = 0
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def _url(self, name):
+        return f'http://127.0.0.1:{self.server.server_port}/{name}'
+
+    @override_settings(MEDIA_PROBE={'BLOCK_SIZE': 4096})
+    def test_mp4_metadata_read_with_range_requests(self):
+        for name in ('faststart.mp4', 'moov_at_end.mp4'):
+            self.server.requests = 0
+            info = probe_media(self._url(name))
+            self.assertEqual(info['container'], 'mp4')
+            self.assertAlmostEqual(info['duration'], 3.0, places=2)
+            self.assertEqual((info['width'], info['height']), (320, 240))
+            self.assertEqual((info['video_codec'], info['audio_codec']), ('avc1', 'mp4a'))
+            # ftyp, box headers and the moov box, never the media data
+            self.assertLessEqual(self.server.requests, 4)
+
+    def test_webm_metadata(self):
+        info = probe_media(self._url('clip.webm'))
+        self.assertEqual(info['container'], 'webm')
+        self.assertAlmostEqual(info['duration'], 2.008, places=3)
+        self.assertEqual((info['width'], info['height']), (160, 120))
+        self.assertEqual((info['video_codec'], info['audio_codec']), ('V_VP8', 'A_OPUS'))
+
+    def test_local_file(self):
+        info = probe_media(os.path.join(MEDIA_FIXTURES, 'moov_at_end.mp4'))
+        self.assertAlmostEqual(info['duration'], 3.0, places=2)
+
+
+class BatchVideoMetadataTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        instructor = User.objects.create(
+            email='video.instructor@example.com', full_name='Video Instructor', role='instructor'
+        )
+        course = Course.objects.create(title='Cardiology', description='Heart', created_by=instructor)
+        section = CourseSection.objects.create(course=course, title='Rhythms', order=1)
+        cls.section = section
+        cls.lessons = [
+            CourseLesson.objects.create(
+                section=section, title=f'Video {i}', order=i + 1,
+                video_url=f'https://videos.example.com/{i % 2}.mp4'
+            )
+            for i in range(4)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.etag = '"v1"'
+        head = mock.patch(
+            'utils.video_processing.requests.head', side_effect=lambda *args, **kwargs: mock.Mock(headers={'ETag': self.etag})
+        )
+        head.start()
+        self.addCleanup(head.stop)
+
+    def _run(self, duration=90, **kwargs):
+        with mock.patch('utils.video_processing.extract_video_duration', return_value=duration) as probe, \
+                mock.patch('utils.video_processing.generate_video_thumbnail', return_value='thumb.jpg') as thumbnail:
+            results = batch_process_video_metadata([lesson.id for lesson in self.lessons], **kwargs)
+        return results, probe, thumbnail
+
+    def _durations(self):
+        return set(CourseLesson.objects.filter(section=self.section).values_list('duration_seconds', flat=True))
+
+    @override_settings(VIDEO_METADATA={'MAX_WORKERS': 1, 'CACHE_TIMEOUT': 60})
+    def test_lessons_updated_in_bulk_and_cached_per_url(self):
+        progress = []
+        with mock.patch('courses.models.CourseLesson.save') as save:
+            results, probe, thumbnail = self._run(on_progress=lambda done, total: progress.append((done, total)))
+
+        save.assert_not_called()
+        self.assertEqual(len(results), 4)
+        self.assertEqual(progress[-1], (4, 4))
+        # Four lessons share two videos: the second lesson of each video is served from the cache
+        self.assertEqual((probe.call_count, thumbnail.call_count), (2, 2))
+        self.assertEqual(self._durations(), {90})
+        self.section.refresh_from_db()
+        self.assertEqual(self.section.total_duration_seconds, 360)
+
+        # Re-probing the same videos is served from the cache
+        CourseLesson.objects.filter(section=self.section).update(duration_seconds=None)
+        _, probe, thumbnail = self._run()
+        probe.assert_not_called()
+        thumbnail.assert_not_called()
+
+        # A file replaced under the same URL has a new ETag
+        CourseLesson.objects.filter(section=self.section).update(duration_seconds=None)
+        self.etag = '"v2"'
+        _, probe, _ = self._run()
+        self.assertEqual(probe.call_count, 2)
+
+    def test_failed_probe_is_retried_on_next_run(self):
+        _, probe, _ = self._run(duration=None)
+        self.assertTrue(probe.called)
+        self.assertEqual(self._durations(), {None})
+
+        _, probe, thumbnail = self._run(duration=75)
+        self.assertTrue(probe.called)
+        thumbnail.assert_not_called()
+        self.assertEqual(self._durations(), {75})
+
+
+class ChunkedVideoUploadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(email='uploads-admin@example.com', full_name='Uploads Admin', role='admin')
+
+    def setUp(self):
+        self.storage_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.storage_dir.cleanup)
+        video_settings = override_settings(VIDEO_UPLOAD={
+            'STORAGE_BACKEND': 'courses.video_uploads.LocalVideoStorage',
+            'STORAGE_OPTIONS': {'location': os.path.join(self.storage_dir.name, 'stored'), 'base_url': '/media/'},
+            'STAGING_DIR': os.path.join(self.storage_dir.name, 'staging'),
+            'CHUNK_SIZE': 8 * 1024,
+        })
+        video_settings.enable()
+        self.addCleanup(video_settings.disable)
+
+    def _request(self, view, method='get', data=None, **kwargs):
+        request = getattr(APIRequestFactory(), method)('/', data or {}, format='multipart' if method == 'put' else 'json')
+        force_authenticate(request, user=self.admin)
+        return view(request, **kwargs)
+
+    def _send_chunk(self, upload_id, offset, data):
+        chunk = SimpleUploadedFile('blob', data, content_type='application/octet-stream')
+        return self._request(
+            instructor_views.upload_video_chunk, 'put', {'offset': offset, 'chunk': chunk}, upload_id=upload_id
+        )
+
+    def test_chunks_assembled_and_stored_in_background(self):
+        with open(os.path.join(MEDIA_FIXTURES, 'moov_at_end.mp4'), 'rb') as media:
+            data = media.read()
+        response = self._request(
+            instructor_views.create_video_upload_session, 'post',
+            {'filename': 'lecture.mp4', 'total_size': len(data), 'kind': 'course'}
+        )
+        self.assertEqual(response.status_code, 201)
+        upload_id = response.data['upload']['id']
+        chunk_size = response.data['chunk_size']
+
+        # A chunk past the staged data is rejected with the offset to resume from
+        response = self._send_chunk(upload_id, chunk_size, data[chunk_size:2 * chunk_size])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['received_bytes'], 0)
+
+        with mock.patch('courses.tasks.finish_video_upload.delay') as delay, \
+                self.captureOnCommitCallbacks(execute=True):
+            for offset in range(0, len(data), chunk_size):
+                response = self._send_chunk(upload_id, offset, data[offset:offset + chunk_size])
+                self.assertEqual(response.status_code, 200)
+        delay.assert_called_once_with(upload_id)
+        self.assertEqual(response.data['upload']['status'], 'processing')
+
+        upload = finish_video_upload(upload_id)
+        self.assertEqual(upload.status, 'completed')
+        self.assertEqual(upload.result['size'], len(data))
+        self.assertAlmostEqual(upload.result['duration'], 3.0, places=2)
+        self.assertEqual(os.listdir(os.path.join(self.storage_dir.name, 'staging')), [])
+
+        response = self._request(instructor_views.video_upload_detail, upload_id=upload_id)
+        self.assertEqual(response.data['upload']['video_info']['width'], 320)
+
+    def test_upload_is_validated(self):
+        response = self._request(
+            instructor_views.create_video_upload_session, 'post', {'filename': 'notes.pdf', 'total_size': 100}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(VideoUpload.objects.exists())
+
+    def test_abandoned_uploads_expire(self):
+        uploads = [
+            self._request(
+                instructor_views.create_video_upload_session, 'post', {'filename': f'{name}.mp4', 'total_size': 100}
+            ).data['upload']['id']
+            for name in ('abandoned', 'active')
+        ]
+        VideoUpload.objects.filter(pk=uploads[0]).update(updated_at=timezone.now() - timedelta(hours=2))
+        staging_dir = os.path.join(self.storage_dir.name, 'staging')
+
+        self.assertEqual(expire_stale_uploads(stale_after=3600), 1)
+        self.assertEqual(
+            dict(VideoUpload.objects.values_list('id', 'status')),
+            {uuid.UUID(uploads[0]): 'failed', uuid.UUID(uploads[1]): 'uploading'}
+        )
+        self.assertEqual(os.listdir(staging_dir), [f'{uploads[1]}.mp4'])
+        self.assertEqual(self._send_chunk(uploads[0], 0, b'x' * 10).status_code, 400)
+
+    def test_public_id_is_unique_per_upload(self):
+        storage = mock.Mock()
+        storage.save.return_value = {'public_id': 'stored', 'secure_url': 'https://cdn.example.com/v.mp4'}
+        uploads = [
+            self._request(
+                instructor_views.create_video_upload_session, 'post',
+                {'filename': 'same.mp4', 'total_size': 10, 'kind': 'course'}
+            ).data['upload']['id']
+            for _ in range(2)
+        ]
+        VideoUpload.objects.update(status='processing', received_bytes=10)
+
+        with mock.patch('courses.video_uploads.get_video_storage', return_value=storage):
+            for upload_id in uploads:
+                finish_video_upload(upload_id)
+
+        public_ids = [call.kwargs['public_id'] for call in storage.save.call_args_list]
+        self.assertEqual(public_ids, [f'course_video_{uuid.UUID(upload_id).hex}' for upload_id in uploads])
+
+
+class SequentialAccessTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        instructor = User.objects.create(email='access-instructor@example.com', full_name='Access Instructor', role='instructor')
+        cls.student = User.objects.create(email='access-student@example.com', full_name='Access Student')
+        cls.course = Course.objects.create(title='Pharmacology', description='Drugs', created_by=instructor)
+        cls.sections = [
+            CourseSection.objects.create(course=cls.course, title=f'Unit {i}', order=i + 1) for i in range(2)
+        ]
+        cls.lessons = [
+            CourseLesson.objects.create(section=section, title=f'Lesson {j}', order=j + 1)
+            for section in cls.sections for j in range(3)
+        ]
+        UserCourseProgress.objects.create(user=cls.student, course=cls.course)
+
+    def _complete(self, *lessons):
+        for lesson in lessons:
+            UserLessonProgress.objects.create(user=self.student, lesson=lesson, watch_percentage=100)
+
+    def test_rules_evaluated_in_one_pass(self):
+        self._complete(*self.lessons[:2])
+        with self.assertNumQueries(4):
+            access = CourseAccess(self.student, self.course.id)
+
+        self.assertEqual(
+            [access.is_lesson_accessible(lesson.id) for lesson in self.lessons],
+            [True, True, True, False, False, False]
+        )
+        self.assertFalse(access.is_section_accessible(self.sections[1].id))
+
+        self._complete(self.lessons[2])
+        self.assertTrue(self.lessons[3].is_accessible_by_user(self.student))
+        self.assertFalse(self.lessons[4].is_accessible_by_user(self.student))
+
+        # Preview lessons skip the gate; students without progress see nothing else
+        outsider = User.objects.create(email='access-outsider@example.com', full_name='Outsider')
+        CourseLesson.objects.filter(pk=self.lessons[5].pk).update(is_preview=True)
+        access = CourseAccess(outsider, self.course.id)
+        self.assertEqual(
+            [access.is_lesson_accessible(lesson.id) for lesson in self.lessons],
+            [False, False, False, False, False, True]
+        )
+
+    def test_serializer_shares_one_evaluation(self):
+        context = {'user': self.student}
+        data = CourseLessonSerializer(self.lessons, many=True, context=context).data
+        self.assertEqual([lesson['is_accessible'] for lesson in data], [True, False, False, False, False, False])
+        self.assertEqual(list(context['course_access']), [self.course.id])
@@ -0,0 +1,315 @@
+# courses/video_uploads.py
+"""
+Resumable chunked video uploads.
+
+The client creates a VideoUpload with the file name and size, then sends the
+file in chunks, each with the byte offset it starts at. Chunks are written
+into one staging file per upload, so a client that lost its connection asks
+for received_bytes and carries on from there. Once the last byte arrives a
+Celery task (courses.tasks.finish_video_upload) probes the staged file,
+streams it to the configured storage backend and records the video info on
+the upload, which the client polls instead of waiting on one long request.
+
+STAGING_DIR must be the same directory for the web processes and the Celery
+workers: the request writes the chunks and the worker reads the assembled
+file, so when they run on separate hosts it has to be on a shared disk.
+Uploads that stop receiving chunks are marked failed and their staging files
+removed by courses.tasks.expire_stale_video_uploads after STALE_AFTER seconds.
+
+Storage backends take a local path and return the stored video info.
+CloudinaryVideoStorage sends the file with Cloudinary's chunked upload API;
+LocalVideoStorage copies it under a directory (tests and local development).
+"""
+import logging
+import os
+import shutil
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from utils.media_probe import MediaProbeError, probe_media
+from .models import VideoUpload
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_VIDEO_UPLOAD_SETTINGS = {
+    'STORAGE_BACKEND': 'courses.video_uploads.CloudinaryVideoStorage',
+    'STORAGE_OPTIONS': {},
+    'STAGING_DIR': os.path.join(settings.MEDIA_ROOT, 'video_uploads'),
+    'MAX_SIZE': 2 * 1024 * 1024 * 1024,
+    # Largest chunk accepted per request, also the Cloudinary upload_large chunk size
+    'CHUNK_SIZE': 20 * 1024 * 1024,
+    'ALLOWED_EXTENSIONS': ('mp4', 'mov', 'avi', 'wmv', 'flv', 'webm', 'mkv'),
+    # Seconds without a new chunk after which an unfinished upload is abandoned
+    'STALE_AFTER': 60 * 60 * 24,
+}
+
+# Cloudinary folder, public_id prefix and tag of each upload kind
+UPLOAD_KINDS = {
+    'course': ('courses/videos', 'course_video', 'course_video'),
+    'lesson': ('courses/lessons/videos', 'lesson_video', 'lesson_video'),
+}
+
+
+def get_video_upload_settings():
+    return {**DEFAULT_VIDEO_UPLOAD_SETTINGS, **getattr(settings, 'VIDEO_UPLOAD', {})}
+
+
+class VideoUploadError(Exception):
+    """A chunk or upload request that cannot be accepted"""
+
+
+class ChunkOffsetError(VideoUploadError):
+    """The chunk does not start where the staged data ends"""
+
+    def __init__(self, received_bytes):
+        super().__init__(f'Expected a chunk at offset {received_bytes}.')
+        self.received_bytes = received_bytes
+
+
+class CloudinaryVideoStorage:
+    """Streams staged files to Cloudinary in chunks"""
+
+    def __init__(self, chunk_size=None):
+        self.chunk_size = chunk_size or get_video_upload_settings()['CHUNK_SIZE']
+
+    def save(self, path, folder, public_id, tags):
+        from cloudinary.uploader import upload_large
+        from cloudinary.utils import cloudinary_url
+
+        upload_result = upload_large(
+            path,
+            resource_type='video',
+            folder=folder,
+            public_id=public_id,
+            overwrite=True,
+            chunk_size=self.chunk_size,
+            transformation=[
+                {'quality': 'auto:good'},
+                {'format': 'mp4'}
+            ],
+            tags=tags
+        )
+
+        # Get optimized video URL
+        video_url, _ = cloudinary_url(
+            upload_result['public_id'],
+            resource_type='video',
+            format='mp4',
+            quality='auto:good'
+        )
+        return {
+            'public_id': upload_result['public_id'],
+            'url': video_url,
+            'secure_url': upload_result['secure_url'],
+            'duration': upload_result.get('duration'),
+            'format': upload_result.get('format'),
+            'size': upload_result.get('bytes'),
+            'width': upload_result.get('width'),
+            'height': upload_result.get('height'),
+        }
+
+
+class LocalVideoStorage:
+    """Copies staged files under location, served from base_url"""
+
+    def __init__(self, location=None, base_url=None):
+        self.location = location or os.path.join(settings.MEDIA_ROOT, 'videos')
+        self.base_url = base_url or f'{settings.MEDIA_URL}videos/'
+
+    def save(self, path, folder, public_id, tags):
+        extension = os.path.splitext(path)[1]
+        name = f'{folder}/{public_id}{extension}'
+        destination = os.path.join(self.location, name)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        shutil.copyfile(path, destination)
+
+        url = f'{self.base_url}{name}'
+        return {
+            'public_id': f'{folder}/{public_id}',
+            'url': url,
+            'secure_url': url,
+            'format': extension.lstrip('.'),
+            'size': os.path.getsize(destination),
+        }
+
+
+def get_video_storage():
+    options = get_video_upload_settings()
+    return import_string(options['STORAGE_BACKEND'])(**options['STORAGE_OPTIONS'])
+
+
+def staging_path(upload):
+    extension = os.path.splitext(upload.filename)[1].lower()
+    return os.path.join(get_video_upload_settings()['STAGING_DIR'], f'{upload.id}{extension}')
+
+
+def create_video_upload(user, filename, total_size, kind='lesson'):
+    options = get_video_upload_settings()
+    filename = os.path.basename(filename or '')
+
+    if kind not in UPLOAD_KINDS:
+        raise VideoUploadError(f'Invalid kind. Valid kinds: {", ".join(UPLOAD_KINDS)}')
+    extension = os.path.splitext(filename)[1].lstrip('.').lower()
+    if extension not in options['ALLOWED_EXTENSIONS']:
+        raise VideoUploadError(
+            f'Only video files ({", ".join(ext.upper() for ext in options["ALLOWED_EXTENSIONS"])}) are allowed.'
+        )
+    if total_size <= 0 or total_size > options['MAX_SIZE']:
+        raise VideoUploadError(f'Video file size must be between 1 byte and {options["MAX_SIZE"] // (1024 * 1024)}MB.')
+
+    upload = VideoUpload.objects.create(uploaded_by=user, kind=kind, filename=filename, total_size=total_size)
+    os.makedirs(os.path.dirname(staging_path(upload)), exist_ok=True)
+    open(staging_path(upload), 'wb').close()
+    return upload
+
+
+def append_chunk(upload_id, offset, chunk):
+    """
+    Write chunk (an UploadedFile) at offset and queue the upload for
+    processing when it completes the file. Chunks of one upload are
+    serialized by the row lock; a resent chunk that was already stored is
+    accepted again.
+    """
+    options = get_video_upload_settings()
+    if chunk.size > options['CHUNK_SIZE']:
+        raise VideoUploadError(f'Chunks cannot exceed {options["CHUNK_SIZE"] // (1024 * 1024)}MB.')
+
+    with transaction.atomic():
+        upload = VideoUpload.objects.select_for_update().get(pk=upload_id)
+        if upload.status != 'uploading':
+            raise VideoUploadError(f'Upload is already {upload.status}.')
+        if offset > upload.received_bytes or offset < 0:
+            raise ChunkOffsetError(upload.received_bytes)
+        if offset + chunk.size > upload.total_size:
+            raise VideoUploadError('Chunk extends past the declared file size.')
+
+        with open(staging_path(upload), 'r+b') as staged:
+            staged.seek(offset)
+            for part in chunk.chunks():
+                staged.write(part)
+
+        upload.received_bytes = max(upload.received_bytes, offset + chunk.size)
+        update_fields = ['received_bytes', 'updated_at']
+        if upload.received_bytes == upload.total_size:
+            upload.status = 'processing'
+            update_fields.append('status')
+            transaction.on_commit(lambda: _queue_finish(upload.pk))
+        upload.save(update_fields=update_fields)
+
+    return upload
+
+
+def stage_uploaded_file(user, video_file, kind):
+    """Stage a file received in one request and queue it like a chunked upload"""
+    upload = create_video_upload(user, video_file.name, video_file.size, kind)
+    with transaction.atomic():
+        with open(staging_path(upload), 'wb') as staged:
+            for part in video_file.chunks():
+                staged.write(part)
+        upload.received_bytes = upload.total_size
+        upload.status = 'processing'
+        upload.save(update_fields=['received_bytes', 'status', 'updated_at'])
+        transaction.on_commit(lambda: _queue_finish(upload.pk))
+    return upload
+
+
+def _queue_finish(upload_id):
+    from .tasks import finish_video_upload
+
+    finish_video_upload.delay(str(upload_id))
+
+
+def finish_video_upload(upload_id):
+    """Probe the staged file, hand it to storage and record the video info"""
+    upload = VideoUpload.objects.select_related('uploaded_by').get(pk=upload_id)
+    if upload.status != 'processing':
+        return upload
+
+    path = staging_path(upload)
+    folder, prefix, tag = UPLOAD_KINDS[upload.kind]
+    created = upload.created_at
+    try:
+        try:
+            metadata = probe_media(path)
+        except MediaProbeError as e:
+            logger.warning(f"Could not probe upload {upload.id}: {str(e)}")
+            metadata = {}
+
+        video_info = get_video_storage().save(
+            path,
+            folder=f'{folder}/{created.year}/{created.month:02d}',
+            public_id=f'{prefix}_{upload.id.hex}',
+            tags=[tag, f'uploaded_by_{upload.uploaded_by_id}', f'year_{created.year}', f'month_{created.month}']
+        )
+        for field in ('duration', 'width', 'height'):
+            if video_info.get(field) is None:
+                video_info[field] = metadata.get(field)
+
+        if upload.kind == 'lesson':
+            from utils.video_processing import generate_video_thumbnail
+
+            try:
+                thumbnail_url = generate_video_thumbnail(video_info['secure_url'])
+                if thumbnail_url:
+                    video_info['thumbnail_url'] = thumbnail_url
+            except Exception as e:
+                logger.warning(f"Thumbnail generation failed: {str(e)}")
+
+        upload.status = 'completed'
+        upload.result = video_info
+        upload.completed_at = timezone.now()
+        logger.info(f"Video upload {upload.id} stored by {upload.uploaded_by.email}: {video_info['public_id']}")
+
+    except Exception as e:
+        logger.error(f"Video upload {upload.id} failed: {str(e)}")
+        upload.status = 'failed'
+        upload.error = str(e)
+
+    upload.save(update_fields=['status', 'result', 'error', 'completed_at', 'updated_at'])
+    if os.path.exists(path):
+        os.remove(path)
+    return upload
+
+
+def expire_stale_uploads(stale_after=None):
+    """Fail uploads that stopped receiving chunks and delete their staging files"""
+    if stale_after is None:
+        stale_after = get_video_upload_settings()['STALE_AFTER']
+    cutoff = timezone.now() - timedelta(seconds=stale_after)
+
+    expired = 0
+    for upload_id in VideoUpload.objects.filter(status='uploading', updated_at__lt=cutoff).values_list('id', flat=True):
+        with transaction.atomic():
+            # A chunk may have arrived since the query
+            upload = VideoUpload.objects.select_for_update().filter(
+                pk=upload_id, status='uploading', updated_at__lt=cutoff
+            ).first()
+            if upload is None:
+                continue
+            upload.status = 'failed'
+            upload.error = 'Upload abandoned before all chunks were received.'
+            upload.save(update_fields=['status', 'error', 'updated_at'])
+
+        path = staging_path(upload)
+        if os.path.exists(path):
+            os.remove(path)
+        expired += 1
+    return expired
+
+
+def upload_status(upload):
+    return {
+        'id': str(upload.id),
+        'kind': upload.kind,
+        'filename': upload.filename,
+        'status': upload.status,
+        'total_size': upload.total_size,
+        'received_bytes': upload.received_bytes,
+        'progress': round(upload.received_bytes / upload.total_size * 100, 1) if upload.total_size else 0,
+        'video_info': upload.result if upload.status == 'completed' else None,
+        'error': upload.error or None,
+        'created_at': upload.created_at,
+        'completed_at': upload.completed_at,
+    }
@@ -0,0 +1,39 @@
+# messaging/consumers.py
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from .realtime import user_group
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class MessagingConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Per-user event stream: new conversation messages and notifications.
+    The socket is authenticated by common.websocket_auth.JWTWebSocketMiddleware
+    and is closed with 4401 without a valid access token.
+    """
+
+    group_name = None
+
+    async def connect(self):
+        user = self.scope.get('user')
+        await self.accept()
+
+        if user is None or not user.is_authenticated:
+            await self.close(code=4401)
+            return
+
+        self.group_name = user_group(user.id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+
+    async def disconnect(self, code):
+        if self.group_name:
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        # Keep-alive for proxies that drop idle sockets
+        if content.get('type') == 'ping':
+            await self.send_json({'type': 'pong'})
+
+    async def messaging_event(self, event):
+        await self.send_json(event['event'])
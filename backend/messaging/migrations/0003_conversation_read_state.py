@@ -0,0 +1,62 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:30
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_read_states(apps, schema_editor):
+    """Seed last_message and per-participant unread counters from existing messages"""
+    Conversation = apps.get_model('messaging', 'Conversation')
+    ConversationMessage = apps.get_model('messaging', 'ConversationMessage')
+    ConversationReadState = apps.get_model('messaging', 'ConversationReadState')
+
+    for conversation in Conversation.objects.prefetch_related('participants').iterator(chunk_size=200):
+        messages = ConversationMessage.objects.filter(conversation=conversation)
+        last_message = messages.order_by('-created_at').first()
+        if last_message:
+            conversation.last_message = last_message
+            conversation.save(update_fields=['last_message'])
+
+        unread = messages.filter(is_read=False, is_deleted=False)
+        ConversationReadState.objects.bulk_create([
+            ConversationReadState(
+                conversation=conversation,
+                user=user,
+                unread_count=unread.exclude(sender=user).count()
+            )
+            for user in conversation.participants.all()
+        ], ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0002_conversation_conversationmessage_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='messaging.conversationmessage'),
+        ),
+        migrations.CreateModel(
+            name='ConversationReadState',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('last_read_at', models.DateTimeField(blank=True, null=True)),
+                ('unread_count', models.PositiveIntegerField(default=0)),
+                ('conversation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='read_states', to='messaging.conversation')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversation_read_states', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'messaging_conversation_read_states',
+                'indexes': [models.Index(fields=['user', 'unread_count'], name='messaging_c_user_id_4b260b_idx')],
+                'unique_together': {('conversation', 'user')},
+            },
+        ),
+        migrations.RunPython(backfill_read_states, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0003_conversation_read_state'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='conversationmessage',
+            name='messaging_c_convers_57f92e_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='notification',
+            name='messaging_n_user_id_f1d3dd_idx',
+        ),
+        migrations.AddIndex(
+            model_name='conversationmessage',
+            index=models.Index(fields=['conversation', 'created_at'], name='messaging_c_convers_897423_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'is_read', 'created_at'], name='messaging_n_user_id_f56d65_idx'),
+        ),
+    ]
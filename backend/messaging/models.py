@@ -1,5 +1,6 @@
 # messaging/models.py
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 import uuid
@@ -39,6 +40,13 @@ class Conversation(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     last_message_at = models.DateTimeField(null=True, blank=True)
+    last_message = models.ForeignKey(
+        'ConversationMessage',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
     
     class Meta:
         db_table = 'messaging_conversations'
@@ -55,13 +63,52 @@ class Conversation(models.Model):
     
     def get_other_participant(self, current_user):
         """Get the other participant in a 1-on-1 conversation"""
-        other_participants = self.participants.exclude(id=current_user.id)
-        return other_participants.first()
+        # Filter in Python so prefetched participants are reused
+        other_participants = [user for user in self.participants.all() if user.id != current_user.id]
+        return min(other_participants, key=lambda user: user.pk, default=None)
     
     def update_last_message_time(self):
         """Update the last message timestamp"""
         self.last_message_at = timezone.now()
         self.save(update_fields=['last_message_at'])
+    
+    def add_participants(self, users):
+        """Add participants along with their read state"""
+        self.participants.add(*users)
+        ConversationReadState.objects.bulk_create(
+            [ConversationReadState(conversation=self, user=user) for user in users],
+            ignore_conflicts=True
+        )
+    
+    def record_message(self, message):
+        """
+        Point the conversation at its newest message, bump the unread
+        counter of every participant except the sender and push the message
+        to the participants' sockets
+        """
+        self.last_message = message
+        self.last_message_at = message.created_at
+        self.save(update_fields=['last_message', 'last_message_at'])
+        
+        ConversationReadState.objects.filter(conversation=self).exclude(
+            user_id=message.sender_id
+        ).update(unread_count=F('unread_count') + 1)
+        
+        from .realtime import push_conversation_message
+        transaction.on_commit(lambda: push_conversation_message(message))
+    
+    def mark_read(self, user):
+        """Mark every message from other participants as read for user"""
+        now = timezone.now()
+        self.messages.filter(is_read=False, is_deleted=False).exclude(sender=user).update(
+            is_read=True,
+            read_at=now
+        )
+        ConversationReadState.objects.update_or_create(
+            conversation=self,
+            user=user,
+            defaults={'unread_count': 0, 'last_read_at': now}
+        )
 
 class ConversationMessage(models.Model):
     """Individual messages within a conversation"""
@@ -94,7 +141,8 @@ class ConversationMessage(models.Model):
         db_table = 'messaging_conversation_messages'
         ordering = ['created_at']
         indexes = [
-            models.Index(fields=['conversation']),
+            # Keyset pagination of a conversation's history
+            models.Index(fields=['conversation', 'created_at']),
             models.Index(fields=['sender']),
             models.Index(fields=['is_read']),
             models.Index(fields=['created_at']),
@@ -112,6 +160,33 @@ class ConversationMessage(models.Model):
             # Update conversation last message time
             self.conversation.update_last_message_time()
 
+class ConversationReadState(models.Model):
+    """Per-participant read position and unread counter of a conversation"""
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    conversation = models.ForeignKey(
+        Conversation,
+        on_delete=models.CASCADE,
+        related_name='read_states'
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='conversation_read_states'
+    )
+    last_read_at = models.DateTimeField(null=True, blank=True)
+    unread_count = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'messaging_conversation_read_states'
+        unique_together = ['conversation', 'user']
+        indexes = [
+            models.Index(fields=['user', 'unread_count']),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.email} in {self.conversation.subject}: {self.unread_count} unread"
+
 class Message(models.Model):
     """Internal messaging system for platform communication"""
     
@@ -268,7 +343,8 @@ class Notification(models.Model):
         db_table = 'messaging_notifications'
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['user']),
+            # Keyset pagination of a user's (unread) notifications
+            models.Index(fields=['user', 'is_read', 'created_at']),
             models.Index(fields=['notification_type']),
             models.Index(fields=['is_read']),
             models.Index(fields=['created_at']),
@@ -0,0 +1,92 @@
+# messaging/pagination.py
+"""
+Keyset (cursor) pagination on (created_at, id) for message and notification
+feeds.
+
+A cursor encodes the created_at and id of a row. `before` pages back through
+older rows, `after` returns only rows newer than the cursor, which lets a
+client poll for new messages without reloading the history. Every page is
+read with one indexed range query.
+"""
+import base64
+import uuid
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(row):
+    value = f"{row.created_at.isoformat()}|{row.id}"
+    return base64.urlsafe_b64encode(value.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        created_at, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        created_at = parse_datetime(created_at)
+        row_id = uuid.UUID(row_id)
+    except (ValueError, UnicodeError):
+        raise InvalidCursor('Invalid cursor')
+    if created_at is None:
+        raise InvalidCursor('Invalid cursor')
+    return created_at, row_id
+
+
+def _page_size(value):
+    try:
+        return max(1, min(int(value), MAX_PAGE_SIZE))
+    except (TypeError, ValueError):
+        return DEFAULT_PAGE_SIZE
+
+
+def paginate_by_cursor(queryset, query_params, newest_first=True):
+    """
+    One page of queryset ordered by (created_at, id) from the `before`,
+    `after` and `limit` query parameters. Without a cursor the newest rows
+    are returned. Rows come back newest first, or oldest first when
+    newest_first is False (chat history). Returns (rows, pagination) and
+    raises InvalidCursor on a malformed cursor.
+    """
+    limit = _page_size(query_params.get('limit'))
+    before = query_params.get('before')
+    after = query_params.get('after')
+
+    if after:
+        created_at, row_id = decode_cursor(after)
+        queryset = queryset.filter(
+            Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=row_id)
+        ).order_by('created_at', 'id')
+    else:
+        if before:
+            created_at, row_id = decode_cursor(before)
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=row_id)
+            )
+        queryset = queryset.order_by('-created_at', '-id')
+
+    rows = list(queryset[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    # Rows were read nearest to the cursor first
+    if bool(after) == newest_first:
+        rows.reverse()
+
+    if rows:
+        oldest, newest = (rows[-1], rows[0]) if newest_first else (rows[0], rows[-1])
+        before, after = encode_cursor(oldest), encode_cursor(newest)
+
+    # has_more refers to the direction paged in: newer rows for `after`, older otherwise.
+    # On an empty page the incoming cursors are echoed so polling resumes from the same place.
+    return rows, {
+        'limit': limit,
+        'has_more': has_more,
+        'before': before,
+        'after': after,
+    }
@@ -0,0 +1,84 @@
+# messaging/realtime.py
+"""
+Push messaging events to connected WebSocket clients.
+
+Every authenticated socket (messaging.consumers.MessagingConsumer) joins its
+user's group. Events go through the configured channel layer once the
+surrounding transaction commits, so clients never see rolled back rows, and
+a failed push is logged without failing the request that caused it.
+"""
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db.models import Sum
+from rest_framework.utils.encoders import JSONEncoder
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def user_group(user_id):
+    return f'messaging_user_{user_id}'
+
+
+def _jsonable(data):
+    # Channel layers only carry plain types (msgpack on Redis)
+    return json.loads(json.dumps(data, cls=JSONEncoder))
+
+
+def push_events(events):
+    """Send {user_id: event} to each user's sockets"""
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+
+    send = async_to_sync(channel_layer.group_send)
+    for user_id, event in events.items():
+        try:
+            send(user_group(user_id), {'type': 'messaging.event', 'event': _jsonable(event)})
+        except Exception as e:
+            logger.error(f"Failed to push {event.get('type')} to user {user_id}: {str(e)}")
+
+
+def push_conversation_message(message):
+    """New message, with each participant's unread counters"""
+    from .models import ConversationReadState
+    from .serializers import ConversationMessageSerializer
+
+    read_states = dict(
+        ConversationReadState.objects.filter(
+            conversation_id=message.conversation_id
+        ).values_list('user_id', 'unread_count')
+    )
+    totals = dict(
+        ConversationReadState.objects.filter(user_id__in=read_states).order_by().values('user_id').annotate(
+            total=Sum('unread_count')
+        ).values_list('user_id', 'total')
+    )
+
+    payload = ConversationMessageSerializer(message).data
+    push_events({
+        user_id: {
+            'type': 'message.created',
+            'conversation_id': message.conversation_id,
+            'message': payload,
+            'unread_count': unread_count,
+            'total_unread': totals.get(user_id, 0),
+        }
+        for user_id, unread_count in read_states.items()
+    })
+
+
+def push_notification(notification):
+    from .models import Notification
+    from .serializers import NotificationSerializer
+
+    push_events({
+        notification.user_id: {
+            'type': 'notification.created',
+            'notification': NotificationSerializer(notification).data,
+            'unread_notifications': Notification.objects.filter(
+                user_id=notification.user_id, is_read=False, is_dismissed=False
+            ).count(),
+        }
+    })
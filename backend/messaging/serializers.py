@@ -14,7 +14,7 @@ class UserSerializer(serializers.ModelSerializer):
 class ConversationMessageSerializer(serializers.ModelSerializer):
     """Serializer for conversation messages"""
     sender = UserSerializer(read_only=True)
-    sender_id = serializers.UUIDField(write_only=True)
+    sender_id = serializers.UUIDField(write_only=True, required=False)
     
     class Meta:
         model = ConversationMessage
@@ -59,12 +59,13 @@ class ConversationSerializer(serializers.ModelSerializer):
     
     def get_unread_count(self, obj):
         """Get unread message count for current user"""
+        # Annotated by get_conversations from the user's read state
+        if hasattr(obj, 'user_unread_count'):
+            return obj.user_unread_count or 0
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            return obj.messages.filter(
-                is_read=False,
-                is_deleted=False
-            ).exclude(sender=request.user).count()
+            read_state = obj.read_states.filter(user=request.user).first()
+            return read_state.unread_count if read_state else 0
         return 0
     
     def create(self, validated_data):
@@ -73,7 +74,7 @@ class ConversationSerializer(serializers.ModelSerializer):
         
         # Add participants
         participants = User.objects.filter(id__in=participant_ids)
-        conversation.participants.add(*participants)
+        conversation.add_participants(list(participants))
         
         return conversation
 
@@ -0,0 +1,201 @@
+from asgiref.sync import sync_to_async
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from common.websocket_auth import JWTWebSocketMiddleware
+from users.models import User
+from utils.auth import JWTTokenManager
+from . import views
+from .routing import websocket_urlpatterns
+from .models import Conversation, ConversationMessage, ConversationReadState, Notification
+
+
+class ConversationReadStateTests(TestCase):
+    """Inbox and unread badge read denormalized counters"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create(email='inbox-student@example.com', full_name='Inbox Student')
+        cls.instructor = User.objects.create(
+            email='inbox-instructor@example.com', full_name='Inbox Instructor', role='instructor'
+        )
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.conversations = []
+        for i in range(3):
+            conversation = Conversation.objects.create(subject=f'Question {i}', conversation_type='instructor')
+            conversation.add_participants([self.student, self.instructor])
+            self.conversations.append(conversation)
+
+    def _call(self, view, user, method='get', **kwargs):
+        if method == 'post':
+            request = self.factory.post('/api/messaging/', {'content': 'Hello'}, format='json')
+        else:
+            request = self.factory.get('/api/messaging/')
+        force_authenticate(request, user=user)
+        return view(request, **kwargs)
+
+    def test_counters_follow_send_and_read(self):
+        for conversation in self.conversations[:2]:
+            for _ in range(2):
+                response = self._call(views.send_message, self.instructor, 'post', conversation_id=conversation.id)
+                self.assertEqual(response.status_code, 201)
+
+        response = self._call(views.get_unread_count, self.student)
+        self.assertEqual(response.data['data']['total_unread'], 4)
+
+        self._call(views.mark_conversation_read, self.student, 'post', conversation_id=self.conversations[0].id)
+        response = self._call(views.get_unread_count, self.student)
+        self.assertEqual(response.data['data']['total_unread'], 2)
+        self.assertFalse(
+            ConversationMessage.objects.filter(conversation=self.conversations[0], is_read=False).exists()
+        )
+        self.assertEqual(
+            ConversationReadState.objects.get(conversation=self.conversations[1], user=self.instructor).unread_count, 0
+        )
+
+    def test_inbox_query_count_is_constant(self):
+        for conversation in self.conversations:
+            message = ConversationMessage.objects.create(
+                conversation=conversation, sender=self.instructor, content='Welcome'
+            )
+            conversation.record_message(message)
+
+        with self.assertNumQueries(2):
+            response = self._call(views.get_conversations, self.student)
+
+        conversations = response.data['data']['conversations']
+        self.assertEqual(len(conversations), 3)
+        self.assertEqual({c['unread_count'] for c in conversations}, {1})
+        self.assertEqual(conversations[0]['last_message']['content'], 'Welcome')
+        self.assertEqual(conversations[0]['other_participant']['email'], self.instructor.email)
+
+
+class CursorPaginationTests(TestCase):
+    """Message and notification feeds page by (created_at, id) cursors"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create(email='feed-student@example.com', full_name='Feed Student')
+        cls.instructor = User.objects.create(
+            email='feed-instructor@example.com', full_name='Feed Instructor', role='instructor'
+        )
+        cls.conversation = Conversation.objects.create(subject='Feed', conversation_type='instructor')
+        cls.conversation.add_participants([cls.student, cls.instructor])
+        for i in range(5):
+            ConversationMessage.objects.create(
+                conversation=cls.conversation, sender=cls.instructor, content=f'Message {i}'
+            )
+
+    def _get(self, view, params, **kwargs):
+        request = APIRequestFactory().get('/api/messaging/', params)
+        force_authenticate(request, user=self.student)
+        return view(request, **kwargs)
+
+    def test_messages_page_back_and_poll_forward(self):
+        response = self._get(views.get_messages, {'limit': 2}, conversation_id=self.conversation.id)
+        data = response.data['data']
+        self.assertEqual([m['content'] for m in data['messages']], ['Message 3', 'Message 4'])
+        self.assertTrue(data['pagination']['has_more'])
+
+        older = self._get(
+            views.get_messages, {'limit': 2, 'before': data['pagination']['before']},
+            conversation_id=self.conversation.id
+        ).data['data']
+        self.assertEqual([m['content'] for m in older['messages']], ['Message 1', 'Message 2'])
+
+        poll = self._get(
+            views.get_messages, {'after': data['pagination']['after']}, conversation_id=self.conversation.id
+        ).data['data']
+        self.assertEqual(poll['messages'], [])
+        self.assertEqual(poll['pagination']['after'], data['pagination']['after'])
+
+        ConversationMessage.objects.create(conversation=self.conversation, sender=self.instructor, content='New')
+        poll = self._get(
+            views.get_messages, {'after': poll['pagination']['after']}, conversation_id=self.conversation.id
+        ).data['data']
+        self.assertEqual([m['content'] for m in poll['messages']], ['New'])
+
+    def test_notifications_newest_first_and_bad_cursor(self):
+        for i in range(3):
+            Notification.objects.create(user=self.student, title=f'Notice {i}', message='Body')
+
+        data = self._get(views.get_notifications, {'limit': 2}).data['data']
+        self.assertEqual([n['title'] for n in data['notifications']], ['Notice 2', 'Notice 1'])
+        rest = self._get(views.get_notifications, {'before': data['pagination']['before']}).data['data']
+        self.assertEqual([n['title'] for n in rest['notifications']], ['Notice 0'])
+        self.assertFalse(rest['pagination']['has_more'])
+
+        response = self._get(views.get_notifications, {'before': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+
+class RealtimePushTests(TestCase):
+    """New messages and notifications are pushed to the participants' sockets"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create(email='push-student@example.com', full_name='Push Student')
+        cls.instructor = User.objects.create(
+            email='push-instructor@example.com', full_name='Push Instructor', role='instructor'
+        )
+        cls.conversation = Conversation.objects.create(subject='Push', conversation_type='instructor')
+        cls.conversation.add_participants([cls.student, cls.instructor])
+
+    def _connect(self, token):
+        application = JWTWebSocketMiddleware(URLRouter(websocket_urlpatterns))
+        return WebsocketCommunicator(application, f'/ws/messaging/?token={token}')
+
+    def _send_message(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            message = ConversationMessage.objects.create(
+                conversation=self.conversation, sender=self.instructor, content='Live'
+            )
+            self.conversation.record_message(message)
+
+    def _notify(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Notification.objects.create(user=self.student, title='Graded', message='Your exam was graded')
+
+    async def test_participant_receives_messages_and_notifications(self):
+        communicator = self._connect(JWTTokenManager.generate_access_token(self.student))
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+
+        await sync_to_async(self._send_message)()
+        event = await communicator.receive_json_from()
+        self.assertEqual(event['type'], 'message.created')
+        self.assertEqual(event['message']['content'], 'Live')
+        self.assertEqual(event['unread_count'], 1)
+        self.assertEqual(event['total_unread'], 1)
+
+        await sync_to_async(self._notify)()
+        event = await communicator.receive_json_from()
+        self.assertEqual(event['type'], 'notification.created')
+        self.assertEqual(event['unread_notifications'], 1)
+
+        await communicator.disconnect()
+
+    async def test_invalid_token_is_closed(self):
+        communicator = self._connect('not-a-token')
+        await communicator.connect()
+        output = await communicator.receive_output()
+        self.assertEqual(output, {'type': 'websocket.close', 'code': 4401})
+
+    async def test_frontend_origin_is_accepted(self):
+        from config.asgi import application
+
+        token = JWTTokenManager.generate_access_token(self.student)
+        for origin, accepted in (
+            ('https://nclexkeysinternational.vercel.app', True),
+            ('https://attacker.example.com', False),
+        ):
+            communicator = WebsocketCommunicator(
+                application, f'/ws/messaging/?token={token}', headers=[(b'origin', origin.encode())]
+            )
+            connected, _ = await communicator.connect()
+            self.assertEqual(connected, accepted, origin)
+            await communicator.disconnect()
@@ -4,11 +4,13 @@ from rest_framework.decorators import api_view, permission_classes, parser_class
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
-from django.db.models import Q, Count, Max
+from django.db import transaction
+from django.db.models import Q, Count, Max, OuterRef, Subquery
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 from django.shortcuts import get_object_or_404
-from .models import Message, MessageThread, Notification, Conversation, ConversationMessage
+from .models import Message, MessageThread, Notification, Conversation, ConversationMessage, ConversationReadState
+from .pagination import InvalidCursor, paginate_by_cursor
 from .serializers import (
     MessageSerializer, MessageThreadSerializer, NotificationSerializer,
     ConversationSerializer, ConversationMessageSerializer
@@ -28,16 +30,18 @@ def get_conversations(request):
     """Get all conversations for the authenticated user"""
     try:
         user = request.user
+        # Last message and unread counter are denormalized, so this costs two queries
         conversations = Conversation.objects.filter(
             participants=user,
             is_active=True
-        ).prefetch_related('participants', 'messages').order_by('-last_message_at', '-created_at')
-        
-        # Add last message to each conversation
-        for conversation in conversations:
-            last_message = conversation.messages.order_by('-created_at').first()
-            if last_message:
-                conversation.last_message = last_message
+        ).select_related('last_message__sender').prefetch_related('participants').annotate(
+            user_unread_count=Subquery(
+                ConversationReadState.objects.filter(
+                    conversation=OuterRef('pk'),
+                    user=user
+                ).values('unread_count')[:1]
+            )
+        ).order_by('-last_message_at', '-created_at')
         
         serializer = ConversationSerializer(conversations, many=True, context={'request': request})
         return Response({
@@ -128,7 +132,7 @@ def create_conversation(request):
             message_serializer = ConversationMessageSerializer(data=message_data, context={'request': request})
             if message_serializer.is_valid():
                 message = message_serializer.save()
-                conversation.update_last_message_time()
+                conversation.record_message(message)
                 
                 # Return conversation with message
                 conversation_serializer = ConversationSerializer(conversation, context={'request': request})
@@ -161,18 +165,32 @@ def create_conversation(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_messages(request, conversation_id):
-    """Get messages for a conversation"""
+    """
+    Get a page of messages for a conversation, oldest first. Pass the
+    returned `before` cursor to load older history and `after` to poll for
+    new messages.
+    """
     try:
         conversation = get_object_or_404(Conversation, id=conversation_id, participants=request.user)
-        messages = conversation.messages.filter(is_deleted=False).order_by('created_at')
+        messages, pagination = paginate_by_cursor(
+            conversation.messages.filter(is_deleted=False).select_related('sender'),
+            request.query_params,
+            newest_first=False
+        )
         
         serializer = ConversationMessageSerializer(messages, many=True, context={'request': request})
         return Response({
             'success': True,
             'data': {
-                'messages': serializer.data
+                'messages': serializer.data,
+                'pagination': pagination
             }
         })
+    except InvalidCursor as e:
+        return Response({
+            'success': False,
+            'error': {'message': str(e)}
+        }, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         logger.error(f"Error getting messages for conversation {conversation_id}: {str(e)}")
         return Response({
@@ -200,8 +218,9 @@ def send_message(request, conversation_id):
         
         serializer = ConversationMessageSerializer(data=message_data, context={'request': request})
         if serializer.is_valid():
-            message = serializer.save()
-            conversation.update_last_message_time()
+            with transaction.atomic():
+                message = serializer.save()
+                conversation.record_message(message)
             
             return Response({
                 'success': True,
@@ -228,16 +247,10 @@ def mark_conversation_read(request, conversation_id):
     """Mark all messages in a conversation as read"""
     try:
         conversation = get_object_or_404(Conversation, id=conversation_id, participants=request.user)
-        user = request.user
         
-        # Mark all unread messages as read
-        unread_messages = conversation.messages.filter(
-            is_read=False,
-            is_deleted=False
-        ).exclude(sender=user)
-        
-        for message in unread_messages:
-            message.mark_as_read()
+        # Mark all unread messages as read and reset the user's counter
+        with transaction.atomic():
+            conversation.mark_read(request.user)
         
         return Response({
             'success': True,
@@ -257,23 +270,19 @@ def get_unread_count(request):
     try:
         user = request.user
         
-        # Get unread counts for conversations
-        conversations = Conversation.objects.filter(participants=user, is_active=True)
-        conversation_counts = []
-        total_unread = 0
-        
-        for conversation in conversations:
-            unread_count = conversation.messages.filter(
-                is_read=False,
-                is_deleted=False
-            ).exclude(sender=user).count()
-            
-            if unread_count > 0:
-                conversation_counts.append({
-                    'conversation_id': conversation.id,
-                    'unread_count': unread_count
-                })
-                total_unread += unread_count
+        # Get unread counts for conversations from the user's read states
+        conversation_counts = [
+            {
+                'conversation_id': read_state['conversation_id'],
+                'unread_count': read_state['unread_count']
+            }
+            for read_state in ConversationReadState.objects.filter(
+                user=user,
+                conversation__is_active=True,
+                unread_count__gt=0
+            ).values('conversation_id', 'unread_count')
+        ]
+        total_unread = sum(count['unread_count'] for count in conversation_counts)
         
         return Response({
             'success': True,
@@ -294,21 +303,30 @@ def get_unread_count(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_messages_legacy(request):
-    """Get all messages for the authenticated user (legacy)"""
+    """Get a page of messages for the authenticated user, newest first (legacy)"""
     try:
         user = request.user
-        messages = Message.objects.filter(
-            Q(sender=user) | Q(recipients=user),
-            is_deleted=False
-        ).order_by('-created_at')
+        messages, pagination = paginate_by_cursor(
+            Message.objects.filter(
+                Q(sender=user) | Q(recipients=user),
+                is_deleted=False
+            ).distinct().select_related('sender').prefetch_related('recipients'),
+            request.query_params
+        )
         
         serializer = MessageSerializer(messages, many=True, context={'request': request})
         return Response({
             'success': True,
             'data': {
-                'messages': serializer.data
+                'messages': serializer.data,
+                'pagination': pagination
             }
         })
+    except InvalidCursor as e:
+        return Response({
+            'success': False,
+            'error': {'message': str(e)}
+        }, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         logger.error(f"Error getting messages: {str(e)}")
         return Response({
@@ -350,21 +368,30 @@ def send_message_legacy(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_notifications(request):
-    """Get notifications for the authenticated user"""
+    """Get a page of notifications for the authenticated user, newest first. ?unread=true skips read ones."""
     try:
         user = request.user
         notifications = Notification.objects.filter(
             user=user,
             is_dismissed=False
-        ).order_by('-created_at')
+        )
+        if request.query_params.get('unread') == 'true':
+            notifications = notifications.filter(is_read=False)
+        notifications, pagination = paginate_by_cursor(notifications, request.query_params)
         
         serializer = NotificationSerializer(notifications, many=True)
         return Response({
             'success': True,
             'data': {
-                'notifications': serializer.data
+                'notifications': serializer.data,
+                'pagination': pagination
             }
         })
+    except InvalidCursor as e:
+        return Response({
+            'success': False,
+            'error': {'message': str(e)}
+        }, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         logger.error(f"Error getting notifications: {str(e)}")
         return Response({
@@ -0,0 +1,85 @@
+# users/activity.py
+"""
+Deferred User.last_activity tracking.
+
+Requests only record a timestamp in the cache. Each user is registered at
+most once per flush interval in a time bucket of slots (atomic cache.incr),
+and flush_user_activity() writes the closed buckets back with one
+bulk_update, so a user costs at most one write per interval.
+"""
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from .models import User
+
+LAST_ACTIVITY_KEY = 'user_activity_last_{user_id}'
+SEEN_KEY = 'user_activity_seen_{bucket}_{user_id}'
+SLOT_COUNT_KEY = 'user_activity_slots_{bucket}'
+SLOT_KEY = 'user_activity_slot_{bucket}_{slot}'
+FLUSHED_BUCKET_KEY = 'user_activity_flushed_bucket'
+
+# Keep timestamps around long enough to survive a stalled flusher
+LAST_ACTIVITY_TIMEOUT = 60 * 60 * 24
+
+
+def get_flush_interval():
+    return getattr(settings, 'USER_ACTIVITY_TRACKING', {}).get('FLUSH_INTERVAL_SECONDS', 300)
+
+
+def _bucket_timeout(interval):
+    return interval * 3 + 60
+
+
+def record_activity(user):
+    """Record that a user was active now without touching the database"""
+    now = timezone.now()
+    interval = get_flush_interval()
+    bucket = int(now.timestamp() // interval)
+
+    cache.set(LAST_ACTIVITY_KEY.format(user_id=user.pk), now, LAST_ACTIVITY_TIMEOUT)
+
+    if cache.add(SEEN_KEY.format(bucket=bucket, user_id=user.pk), 1, _bucket_timeout(interval)):
+        count_key = SLOT_COUNT_KEY.format(bucket=bucket)
+        cache.add(count_key, 0, _bucket_timeout(interval))
+        slot = cache.incr(count_key)
+        cache.set(SLOT_KEY.format(bucket=bucket, slot=slot), str(user.pk), _bucket_timeout(interval))
+
+
+def get_pending_activity_map(user_ids):
+    """Unflushed activity timestamps for the given users, keyed by user id"""
+    keys = {LAST_ACTIVITY_KEY.format(user_id=user_id): user_id for user_id in user_ids}
+    return {keys[key]: value for key, value in cache.get_many(list(keys)).items()}
+
+
+def get_last_activity_map(users):
+    """User.last_activity merged with the unflushed cache value, for many users in one cache round trip"""
+    pending = get_pending_activity_map([user.pk for user in users])
+    return {
+        user.pk: max(filter(None, [user.last_activity, pending.get(user.pk)]), default=None)
+        for user in users
+    }
+
+
+def flush_user_activity(batch_size=500):
+    """Write activity from all closed buckets to User.last_activity"""
+    interval = get_flush_interval()
+    current_bucket = int(time.time() // interval)
+    first_bucket = cache.get(FLUSHED_BUCKET_KEY, current_bucket - 2) + 1
+
+    user_ids = set()
+    for bucket in range(max(first_bucket, current_bucket - 2), current_bucket):
+        count = cache.get(SLOT_COUNT_KEY.format(bucket=bucket), 0)
+        slot_keys = [SLOT_KEY.format(bucket=bucket, slot=slot) for slot in range(1, count + 1)]
+        user_ids.update(cache.get_many(slot_keys).values())
+
+    cache.set(FLUSHED_BUCKET_KEY, current_bucket - 1, None)
+    if not user_ids:
+        return 0
+
+    pending = get_pending_activity_map(user_ids)
+    users = [User(pk=user_id, last_activity=last_activity) for user_id, last_activity in pending.items()]
+
+    # bulk_update skips save() and post_save, so cached JWT principals stay valid
+    User.objects.bulk_update(users, ['last_activity'], batch_size=batch_size)
+    return len(users)
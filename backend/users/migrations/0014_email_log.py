@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:23
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0013_alter_user_role'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailLog',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('email_type', models.CharField(max_length=50)),
+                ('recipient_email', models.EmailField(max_length=254)),
+                ('subject', models.CharField(max_length=255)),
+                ('sent_at', models.DateTimeField(auto_now_add=True)),
+                ('success', models.BooleanField(default=True)),
+                ('error_message', models.TextField(blank=True, null=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='email_logs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'email_logs',
+                'ordering': ['-sent_at'],
+            },
+        ),
+    ]
@@ -86,4 +86,25 @@ class User(AbstractUser):
         if self.account_locked_at:
             # Account is locked if locked_at is in the future
             return self.account_locked_at > timezone.now()
-        return False
\ No newline at end of file
+        return False
+
+class EmailLog(models.Model):
+    """
+    Delivery record of a notification email, written in bulk by
+    utils.notifications.send_bulk_email
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='email_logs')
+    email_type = models.CharField(max_length=50)
+    recipient_email = models.EmailField()
+    subject = models.CharField(max_length=255)
+    sent_at = models.DateTimeField(auto_now_add=True)
+    success = models.BooleanField(default=True)
+    error_message = models.TextField(blank=True, null=True)
+    
+    class Meta:
+        db_table = 'email_logs'
+        ordering = ['-sent_at']
+    
+    def __str__(self):
+        return f"{self.email_type} to {self.recipient_email}"
@@ -1,8 +1,9 @@
 # users/signals.py
-from django.db.models.signals import post_migrate
+from django.db.models.signals import post_delete, post_migrate, post_save
 from django.dispatch import receiver
 from django.conf import settings
 from .models import User
+from common.authentication import principal_cache
 import os
 
 
@@ -53,3 +54,15 @@ def create_default_admin_accounts(sender, **kwargs):
             print(f"✅ Default instructor account created: {instructor_email}")
         except Exception as e:
             print(f"❌ Error creating default instructor: {e}")
+
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_jwt_principal(sender, instance, update_fields=None, **kwargs):
+    """
+    Drop cached JWT principals so role/active/lock changes apply immediately
+    """
+    # Activity touches don't change anything authentication depends on
+    if update_fields and set(update_fields) <= {'last_activity'}:
+        return
+    principal_cache.invalidate_user(instance.pk)
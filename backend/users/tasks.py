@@ -0,0 +1,28 @@
+# users/tasks.py
+from celery import shared_task
+from users.activity import flush_user_activity
+from utils.notifications import send_bulk_email
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def flush_user_activity_task():
+    """Write cached user activity timestamps to User.last_activity"""
+    try:
+        flushed = flush_user_activity()
+        if flushed:
+            logger.info(f"Flushed last activity for {flushed} users")
+    except Exception as e:
+        logger.error(f"User activity flush failed: {str(e)}")
+
+
+@shared_task
+def send_bulk_email_task(email_type, subject, html_message, plain_message, recipients):
+    """Deliver a rendered notification to many recipients over one SMTP connection"""
+    try:
+        sent = send_bulk_email(email_type, subject, html_message, plain_message, recipients)
+        logger.info(f"Sent {sent}/{len(recipients)} '{email_type}' emails")
+    except Exception as e:
+        logger.error(f"Bulk email '{email_type}' failed: {str(e)}")
@@ -1,35 +1,262 @@
-from django.test import TestCase
-
-# Create your tests here.
-# Create a management command to test emails
-# Create file: management/commands/test_email.py
-
-from django.core.management.base import BaseCommand
-from django.contrib.auth import get_user_model
-from backend.utils.auth import EmailService, EmailTokenManager
-
-User = get_user_model()
-
-class Command(BaseCommand):
-    help = 'Test email system'
-
-    def handle(self, *args, **options):
-        # Test with an existing user or create a test user
-        try:
-            user = User.objects.get(email='test@example.com')
-        except User.DoesNotExist:
-            user = User.objects.create_user(
-                email='test@example.com',
-                password='testpass123',
-                full_name='Test User'
+import json
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from common import authentication, ratelimit
+from common.authentication import JWTAuthentication, JWTPrincipalError, PrincipalCache, principal_cache, resolve_jwt_user
+from common.middleware import JWTAuthenticationMiddleware, RateLimitMiddleware
+from common.ratelimit import CacheRateLimiter
+from courses import instructor_views
+from courses.models import Course, CourseEnrollment
+from utils.auth import JWTTokenManager
+from .activity import flush_user_activity, get_pending_activity_map, record_activity
+from .models import User
+
+
+class PrincipalCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(email='principal@example.com', full_name='Principal User')
+
+    def setUp(self):
+        principal_cache.clear()
+        self.token = JWTTokenManager.generate_access_token(self.user)
+
+    def test_cache_hit_skips_the_database(self):
+        user = resolve_jwt_user(self.token)
+        with self.assertNumQueries(0):
+            cached = resolve_jwt_user(self.token)
+        self.assertEqual(cached.pk, self.user.pk)
+        # Every hit gets its own copy of the cached user
+        self.assertIsNot(cached, user)
+        self.assertIsNot(resolve_jwt_user(self.token), cached)
+
+    def test_entries_expire_and_least_recently_used_is_evicted(self):
+        cache = PrincipalCache(max_size=2, ttl_seconds=60)
+        users = [User(pk=i, email=f'lru{i}@example.com') for i in range(3)]
+
+        with mock.patch('common.authentication.time.time', return_value=1000):
+            cache.set('a', users[0])
+            cache.set('b', users[1])
+            self.assertEqual(cache.get('a').pk, 0)
+            cache.set('c', users[2])
+            self.assertIsNone(cache.get('b'))
+            self.assertEqual(cache.get('a').pk, 0)
+            self.assertEqual(cache.get('c').pk, 2)
+
+        with mock.patch('common.authentication.time.time', return_value=1061):
+            self.assertIsNone(cache.get('a'))
+
+        # A token expiring before the TTL bounds the entry
+        with mock.patch('common.authentication.time.time', return_value=2000):
+            cache.set('d', users[0], token_exp=2010)
+        with mock.patch('common.authentication.time.time', return_value=2011):
+            self.assertIsNone(cache.get('d'))
+
+    def test_user_changes_invalidate_cached_principal(self):
+        resolve_jwt_user(self.token)
+
+        # Activity touches keep the cached principal
+        self.user.last_activity = timezone.now()
+        self.user.save(update_fields=['last_activity'])
+        with self.assertNumQueries(0):
+            resolve_jwt_user(self.token)
+
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(JWTPrincipalError) as raised:
+            resolve_jwt_user(self.token)
+        self.assertEqual(raised.exception.error_code, 'ACCOUNT_INACTIVE')
+
+        self.user.is_active = True
+        self.user.account_locked_at = timezone.now() + timedelta(minutes=30)
+        self.user.save()
+        with self.assertRaises(JWTPrincipalError) as raised:
+            resolve_jwt_user(self.token)
+        self.assertEqual(raised.exception.error_code, 'ACCOUNT_LOCKED')
+
+        self.user.delete()
+        with self.assertRaises(JWTPrincipalError) as raised:
+            resolve_jwt_user(self.token)
+        self.assertEqual(raised.exception.error_code, 'USER_NOT_FOUND')
+
+    def test_middleware_and_drf_share_one_lookup(self):
+        request = RequestFactory().get('/api/courses/', HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        resolve = mock.Mock(wraps=resolve_jwt_user)
+
+        with mock.patch('common.middleware.resolve_jwt_user', resolve), \
+                mock.patch.object(authentication, 'resolve_jwt_user', resolve):
+            JWTAuthenticationMiddleware(lambda request: HttpResponse()).process_request(request)
+            user, token = JWTAuthentication().authenticate(Request(request))
+
+        self.assertEqual(resolve.call_count, 1)
+        self.assertIs(user, request.user)
+        self.assertEqual(token, self.token)
+
+
+LOGIN_RULES = {
+    'RULES': {'/api/auth/login/': {'limit': 2, 'window': 60, 'message': 'Too many login attempts.'}},
+    'EMAIL_LIMITED_PATHS': ['/api/auth/login/'],
+}
+
+
+@override_settings(DISABLE_RATE_LIMITING=False)
+class RateLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        ratelimit._limiter = None
+        self.addCleanup(setattr, ratelimit, '_limiter', None)
+
+    def _hits(self, limiter, at, count=1):
+        with mock.patch('common.ratelimit.time.time', return_value=at):
+            return [limiter.hit('login:ip:1.2.3.4', 2, 60) for _ in range(count)]
+
+    def test_sliding_window_allows_requests_once_old_hits_slide_out(self):
+        limiter = CacheRateLimiter()
+        self.assertEqual([bool(result) for result in self._hits(limiter, 600, 3)], [True, True, False])
+
+        # Both hits of the previous window still weigh on the first half of the next one
+        blocked = self._hits(limiter, 600 + 60 + 29)[0]
+        self.assertFalse(blocked)
+        self.assertEqual(blocked.retry_after, 1)
+        self.assertTrue(self._hits(limiter, 600 + 60 + 30)[0])
+        self.assertFalse(self._hits(limiter, 600 + 60 + 30)[0])
+
+    def test_retry_after_is_the_real_wait(self):
+        limiter = CacheRateLimiter()
+        rejected = self._hits(limiter, 615, 3)[-1]
+        self.assertEqual(rejected.retry_after, 75)
+
+        self.assertFalse(self._hits(limiter, 615 + rejected.retry_after - 1)[0])
+        self.assertTrue(self._hits(limiter, 615 + rejected.retry_after)[0])
+
+    @override_settings(RATE_LIMITING=LOGIN_RULES)
+    def test_rules_are_loaded_once(self):
+        with mock.patch(
+            'common.middleware.get_rate_limit_settings', wraps=ratelimit.get_rate_limit_settings
+        ) as load_settings, mock.patch('common.ratelimit.time.time', return_value=600):
+            middleware = RateLimitMiddleware(lambda request: HttpResponse())
+            # Later settings changes do not reach a running middleware
+            with override_settings(RATE_LIMITING={'RULES': {}}):
+                responses = [middleware.process_request(RequestFactory().post('/api/auth/login/')) for _ in range(3)]
+
+        self.assertEqual(load_settings.call_count, 1)
+        self.assertEqual(responses[2].status_code, 429)
+        self.assertIs(ratelimit.get_rate_limiter(), ratelimit.get_rate_limiter())
+
+    @override_settings(RATE_LIMITING=LOGIN_RULES)
+    def test_middleware_answers_429_with_retry_after(self):
+        middleware = RateLimitMiddleware(lambda request: HttpResponse())
+        body = json.dumps({'email': 'limited@example.com'})
+
+        with mock.patch('common.ratelimit.time.time', return_value=600):
+            responses = [
+                middleware.process_request(
+                    RequestFactory().post('/api/auth/login/', body, content_type='application/json')
+                )
+                for _ in range(3)
+            ]
+
+        self.assertEqual(responses[:2], [None, None])
+        self.assertEqual(responses[2].status_code, 429)
+        self.assertEqual(responses[2]['Retry-After'], '90')
+        self.assertEqual(json.loads(responses[2].content)['retry_after'], 90)
+        self.assertIsNone(middleware.process_request(RequestFactory().get('/api/courses/')))
+
+    @override_settings(RATE_LIMITING=LOGIN_RULES)
+    def test_email_rejection_does_not_use_up_the_ip(self):
+        middleware = RateLimitMiddleware(lambda request: HttpResponse())
+
+        def login(email, ip):
+            request = RequestFactory().post(
+                '/api/auth/login/', json.dumps({'email': email}), content_type='application/json', REMOTE_ADDR=ip
             )
-        
-        # Test verification email
-        token = EmailTokenManager.generate_verification_token(user)
-        EmailService.send_verification_email(user, token)
-        
-        self.stdout.write(
-            self.style.SUCCESS('Test email sent successfully!')
+            response = middleware.process_request(request)
+            return 200 if response is None else response.status_code
+
+        with mock.patch('common.ratelimit.time.time', return_value=600):
+            self.assertEqual([login('target@example.com', '10.0.0.1') for _ in range(2)], [200, 200])
+            # Another user behind a shared address is not locked out by the rejected attempt
+            self.assertEqual(login('target@example.com', '10.0.0.2'), 429)
+            self.assertEqual([login(f'colleague{i}@example.com', '10.0.0.2') for i in range(3)], [200, 200, 429])
+
+
+@override_settings(USER_ACTIVITY_TRACKING={'FLUSH_INTERVAL_SECONDS': 300})
+class UserActivityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create(email=f'active{i}@example.com', full_name=f'Active {i}') for i in range(5)]
+
+    def setUp(self):
+        cache.clear()
+        # Start of the current flush interval; the locmem cache expires entries on the same clock
+        self.start = int(time.time()) // 300 * 300
+        self.bucket = self.start // 300
+
+    def _at(self, timestamp):
+        now = datetime.fromtimestamp(timestamp, tz=dt_timezone.utc)
+        return mock.patch('users.activity.timezone.now', return_value=now), \
+            mock.patch('users.activity.time.time', return_value=timestamp)
+
+    def test_activity_is_registered_once_per_interval(self):
+        user = self.users[0]
+        for offset in (0, 10, 299):
+            now, clock = self._at(self.start + offset)
+            with now, clock, self.assertNumQueries(0):
+                record_activity(user)
+
+        self.assertEqual(cache.get(f'user_activity_slots_{self.bucket}'), 1)
+        self.assertEqual(get_pending_activity_map([user.pk])[user.pk].timestamp(), self.start + 299)
+
+        now, clock = self._at(self.start + 300)
+        with now, clock:
+            record_activity(user)
+        self.assertEqual(cache.get(f'user_activity_slots_{self.bucket + 1}'), 1)
+
+    def test_flush_writes_closed_buckets_in_batches(self):
+        for user in self.users:
+            now, clock = self._at(self.start)
+            with now, clock:
+                record_activity(user)
+
+        # The bucket is still open
+        now, clock = self._at(self.start + 100)
+        with now, clock:
+            self.assertEqual(flush_user_activity(batch_size=2), 0)
+
+        now, clock = self._at(self.start + 300)
+        with now, clock, CaptureQueriesContext(connection) as queries:
+            self.assertEqual(flush_user_activity(batch_size=2), 5)
+        self.assertEqual(sum(query['sql'].startswith('UPDATE') for query in queries), 3)
+        self.assertEqual(
+            set(User.objects.filter(pk__in=[user.pk for user in self.users]).values_list('last_activity', flat=True)),
+            {datetime.fromtimestamp(self.start, tz=dt_timezone.utc)}
         )
 
-# Run with: python manage.py test_email
\ No newline at end of file
+        # Flushed buckets are not written again
+        with now, clock, self.assertNumQueries(0):
+            self.assertEqual(flush_user_activity(batch_size=2), 0)
+
+    def test_instructor_stats_count_unflushed_activity(self):
+        instructor = User.objects.create(email='stats-instructor@example.com', full_name='Stats', role='instructor')
+        course = Course.objects.create(title='Renal', description='Kidneys', created_by=instructor)
+        for user in self.users[:3]:
+            CourseEnrollment.objects.create(user=user, course=course, payment_status='completed')
+        User.objects.filter(pk=self.users[0].pk).update(last_activity=timezone.now() - timedelta(days=1))
+        record_activity(self.users[1])
+
+        request = APIRequestFactory().get('/', {'days': 7})
+        force_authenticate(request, user=instructor)
+        response = instructor_views.instructor_stats(request)
+
+        self.assertEqual(response.data['students'], {'total': 3, 'active': 2})
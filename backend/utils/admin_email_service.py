@@ -4,6 +4,7 @@ from django.conf import settings
 from courses.models import CourseEnrollment
 from users.models import User
 from utils.auth import EmailService
+from utils.notifications import dispatch_bulk_email
 import logging
 import json
 
@@ -27,17 +28,16 @@ class AdminEmailService:
                 'admin_dashboard_url': f"{settings.FRONTEND_URL}/admin/dashboard"
             }
             
-            # Send to each admin
-            for admin in admin_users:
-                EmailService._send_email(
-                    user=admin,
-                    email_type='course_created',
-                    subject=subject,
-                    html_message=AdminEmailService._render_template('emails/instructor/course_created.html', context),
-                    plain_message=f"A new course '{course.title}' has been created by {admin_user.full_name}."
-                )
+            queued = AdminEmailService._send_bulk_email(
+                recipients=admin_users,
+                email_type='course_created',
+                subject=subject,
+                template_path='emails/instructor/course_created.html',
+                context=context,
+                plain_message=f"A new course '{course.title}' has been created by {admin_user.full_name}."
+            )
             
-            logger.info(f"Course creation notification sent to {admin_users.count()} admins")
+            logger.info(f"Course creation notification queued for {queued} admins")
             
         except Exception as e:
             logger.error(f"Failed to send course creation notification: {str(e)}")
@@ -106,14 +106,14 @@ class AdminEmailService:
                 'course_url': f"{settings.FRONTEND_URL}/super-admin/courses/{course.id}",
             }
 
-            for super_admin in super_admins:
-                EmailService._send_email(
-                    user=super_admin,
-                    email_type='course_updated_super_admin',
-                    subject=subject,
-                    html_message=AdminEmailService._render_template('emails/platform_admin/course_updated.html', context),
-                    plain_message=f"Course '{course.title}' has been updated by {admin_user.full_name}."
-                )
+            AdminEmailService._send_bulk_email(
+                recipients=super_admins,
+                email_type='course_updated_super_admin',
+                subject=subject,
+                template_path='emails/platform_admin/course_updated.html',
+                context=context,
+                plain_message=f"Course '{course.title}' has been updated by {admin_user.full_name}."
+            )
 
         except Exception as e:
             logger.error(f"Failed to notify super admins of course update: {str(e)}")
@@ -199,16 +199,16 @@ class AdminEmailService:
                 'modified_at': timezone.now()
             }
 
-            for admin in platform_admins:
-                EmailService._send_email(
-                    user=admin,
-                    email_type='course_modified_by_admin',
-                    subject=subject,
-                    html_message=AdminEmailService._render_template('emails/platform_admin/course_modified_by_admin.html', context),
-                    plain_message=f"Course '{course.title}' was modified by {modifier_admin.full_name}."
-                )
+            queued = AdminEmailService._send_bulk_email(
+                recipients=platform_admins,
+                email_type='course_modified_by_admin',
+                subject=subject,
+                template_path='emails/platform_admin/course_modified_by_admin.html',
+                context=context,
+                plain_message=f"Course '{course.title}' was modified by {modifier_admin.full_name}."
+            )
 
-            logger.info(f"Course modification notification sent to {platform_admins.count()} platform admins")
+            logger.info(f"Course modification notification queued for {queued} platform admins")
 
         except Exception as e:
             logger.error(f"Failed to send course modification notification: {str(e)}")
@@ -233,17 +233,16 @@ class AdminEmailService:
                 'contact_support_url': f"{settings.FRONTEND_URL}/support"
             }
 
-            for user in enrolled_users:
-                context['user'] = user
-                EmailService._send_email(
-                    user=user,
-                    email_type='course_deactivated',
-                    subject=subject,
-                    html_message=AdminEmailService._render_template('emails/student/course_deactivated.html', context),
-                    plain_message=f"The course '{course.title}' you were enrolled in has been temporarily deactivated."
-                )
+            queued = AdminEmailService._send_bulk_email(
+                recipients=enrolled_users,
+                email_type='course_deactivated',
+                subject=subject,
+                template_path='emails/student/course_deactivated.html',
+                context=context,
+                plain_message=f"The course '{course.title}' you were enrolled in has been temporarily deactivated."
+            )
 
-            logger.info(f"Course deactivation notification sent to {enrolled_users.count()} students")
+            logger.info(f"Course deactivation notification queued for {queued} students")
 
         except Exception as e:
             logger.error(f"Failed to send course deactivation notification: {str(e)}")
@@ -328,16 +327,16 @@ class AdminEmailService:
                 'admin_dashboard_url': f"{settings.FRONTEND_URL}/admin/dashboard"
             }
 
-            for admin in platform_admins:
-                EmailService._send_email(
-                    user=admin,
-                    email_type='course_deactivated_admin',
-                    subject=subject,
-                    html_message=AdminEmailService._render_template('emails/platform_admin/course_deactivated.html', context),
-                    plain_message=f"Course '{course.title}' was deactivated by {admin_user.full_name}."
-                )
+            queued = AdminEmailService._send_bulk_email(
+                recipients=platform_admins,
+                email_type='course_deactivated_admin',
+                subject=subject,
+                template_path='emails/platform_admin/course_deactivated.html',
+                context=context,
+                plain_message=f"Course '{course.title}' was deactivated by {admin_user.full_name}."
+            )
 
-            logger.info(f"Course deactivation notification sent to {platform_admins.count()} platform admins")
+            logger.info(f"Course deactivation notification queued for {queued} platform admins")
 
         except Exception as e:
             logger.error(f"Failed to send platform admin deactivation notification: {str(e)}")
@@ -361,16 +360,16 @@ class AdminEmailService:
                 'admin_dashboard_url': f"{settings.FRONTEND_URL}/admin/dashboard"
             }
 
-            for admin in platform_admins:
-                EmailService._send_email(
-                    user=admin,
-                    email_type='course_deleted_admin',
-                    subject=subject,
-                    html_message=AdminEmailService._render_template('emails/platform_admin/course_deleted.html', context),
-                    plain_message=f"Course '{course_title}' was permanently deleted by {admin_user.full_name}."
-                )
+            queued = AdminEmailService._send_bulk_email(
+                recipients=platform_admins,
+                email_type='course_deleted_admin',
+                subject=subject,
+                template_path='emails/platform_admin/course_deleted.html',
+                context=context,
+                plain_message=f"Course '{course_title}' was permanently deleted by {admin_user.full_name}."
+            )
 
-            logger.info(f"Course deletion notification sent to {platform_admins.count()} platform admins")
+            logger.info(f"Course deletion notification queued for {queued} platform admins")
 
         except Exception as e:
             logger.error(f"Failed to send platform admin deletion notification: {str(e)}")
@@ -437,16 +436,16 @@ class AdminEmailService:
                 'admin_dashboard_url': f"{settings.FRONTEND_URL}/admin/dashboard"
             }
 
-            for admin in platform_admins:
-                EmailService._send_email(
-                    user=admin,
-                    email_type='bulk_action_admin',
-                    subject=subject,
-                    html_message=AdminEmailService._render_template('emails/platform_admin/bulk_action_performed.html', context),
-                    plain_message=f"{admin_user.full_name} performed bulk {action} on {courses_count} courses."
-                )
+            queued = AdminEmailService._send_bulk_email(
+                recipients=platform_admins,
+                email_type='bulk_action_admin',
+                subject=subject,
+                template_path='emails/platform_admin/bulk_action_performed.html',
+                context=context,
+                plain_message=f"{admin_user.full_name} performed bulk {action} on {courses_count} courses."
+            )
 
-            logger.info(f"Bulk action notification sent to {platform_admins.count()} platform admins")
+            logger.info(f"Bulk action notification queued for {queued} platform admins")
 
         except Exception as e:
             logger.error(f"Failed to send platform admin bulk action notification: {str(e)}")
@@ -470,16 +469,16 @@ class AdminEmailService:
                 'admin_dashboard_url': f"{settings.FRONTEND_URL}/admin/dashboard"
             }
 
-            for admin in platform_admins:
-                EmailService._send_email(
-                    user=admin,
-                    email_type='bulk_delete_admin',
-                    subject=subject,
-                    html_message=AdminEmailService._render_template('emails/platform_admin/bulk_delete_completed.html', context),
-                    plain_message=f"Bulk deletion completed: {deleted_count} courses deleted, {deactivated_count} deactivated."
-                )
+            queued = AdminEmailService._send_bulk_email(
+                recipients=platform_admins,
+                email_type='bulk_delete_admin',
+                subject=subject,
+                template_path='emails/platform_admin/bulk_delete_completed.html',
+                context=context,
+                plain_message=f"Bulk deletion completed: {deleted_count} courses deleted, {deactivated_count} deactivated."
+            )
 
-            logger.info(f"Bulk delete notification sent to {platform_admins.count()} platform admins")
+            logger.info(f"Bulk delete notification queued for {queued} platform admins")
 
         except Exception as e:
             logger.error(f"Failed to send platform admin bulk delete notification: {str(e)}")
@@ -504,16 +503,16 @@ class AdminEmailService:
                 'instructor_profile_url': f"{settings.FRONTEND_URL}/admin/instructors/{instructor.id}"
             }
 
-            for admin in platform_admins:
-                EmailService._send_email(
-                    user=admin,
-                    email_type='instructor_bulk_activity',
-                    subject=subject,
-                    html_message=AdminEmailService._render_template('emails/platform_admin/instructor_bulk_activity.html', context),
-                    plain_message=f"Instructor {instructor.full_name} performed bulk {action} on {courses_count} courses."
-                )
+            queued = AdminEmailService._send_bulk_email(
+                recipients=platform_admins,
+                email_type='instructor_bulk_activity',
+                subject=subject,
+                template_path='emails/platform_admin/instructor_bulk_activity.html',
+                context=context,
+                plain_message=f"Instructor {instructor.full_name} performed bulk {action} on {courses_count} courses."
+            )
 
-            logger.info(f"Instructor activity notification sent to {platform_admins.count()} platform admins")
+            logger.info(f"Instructor activity notification queued for {queued} platform admins")
 
         except Exception as e:
             logger.error(f"Failed to send instructor activity notification: {str(e)}")
@@ -675,17 +674,16 @@ class AdminEmailService:
                 'course_url': f"{settings.FRONTEND_URL}/courses/{course.id}"
             }
 
-            for user in enrolled_users:
-                context['user'] = user
-                EmailService._send_email(
-                    user=user,
-                    email_type='course_pricing_changed',
-                    subject=subject,
-                    html_message=AdminEmailService._render_template('emails/student/pricing_changed.html', context),
-                    plain_message=f"The pricing for '{course.title}' has been updated."
-                )
+            queued = AdminEmailService._send_bulk_email(
+                recipients=enrolled_users,
+                email_type='course_pricing_changed',
+                subject=subject,
+                template_path='emails/student/pricing_changed.html',
+                context=context,
+                plain_message=f"The pricing for '{course.title}' has been updated."
+            )
 
-            logger.info(f"Pricing change notification sent to {enrolled_users.count()} students")
+            logger.info(f"Pricing change notification queued for {queued} students")
 
         except Exception as e:
             logger.error(f"Failed to send pricing change notification: {str(e)}")
@@ -711,16 +709,16 @@ class AdminEmailService:
                 'admin_dashboard_url': f"{settings.FRONTEND_URL}/admin/dashboard"
             }
 
-            for admin in platform_admins:
-                EmailService._send_email(
-                    user=admin,
-                    email_type='pricing_updated_admin',
-                    subject=subject,
-                    html_message=AdminEmailService._render_template('emails/platform_admin/pricing_updated.html', context),
-                    plain_message=f"Course pricing updated for '{course.title}' by {admin_user.full_name}."
-                )
+            queued = AdminEmailService._send_bulk_email(
+                recipients=platform_admins,
+                email_type='pricing_updated_admin',
+                subject=subject,
+                template_path='emails/platform_admin/pricing_updated.html',
+                context=context,
+                plain_message=f"Course pricing updated for '{course.title}' by {admin_user.full_name}."
+            )
 
-            logger.info(f"Pricing update notification sent to {platform_admins.count()} platform admins")
+            logger.info(f"Pricing update notification queued for {queued} platform admins")
 
         except Exception as e:
             logger.error(f"Failed to send pricing update notification: {str(e)}")
@@ -1008,14 +1006,14 @@ class AdminEmailService:
                     'threshold': thresholds
                 }
                 
-                for super_admin in super_admins:
-                    EmailService._send_email(
-                        user=super_admin,
-                        email_type='high_revenue_alert',
-                        subject=subject,
-                        html_message=AdminEmailService._render_template('emails/platform_admin/high_revenue_alert.html', context),
-                        plain_message=f"High value enrollment: {enrollment.currency} {enrollment.amount_paid} (Platform share: {enrollment.currency} {platform_share})"
-                    )
+                AdminEmailService._send_bulk_email(
+                    recipients=super_admins,
+                    email_type='high_revenue_alert',
+                    subject=subject,
+                    template_path='emails/platform_admin/high_revenue_alert.html',
+                    context=context,
+                    plain_message=f"High value enrollment: {enrollment.currency} {enrollment.amount_paid} (Platform share: {enrollment.currency} {platform_share})"
+                )
                     
         except Exception as e:
             logger.error(f"Failed to send high revenue alert: {str(e)}")
@@ -1169,14 +1167,14 @@ class AdminEmailService:
                 'course_details_url': f"{settings.FRONTEND_URL}/super-admin/courses/{course.id}"
             }
 
-            for super_admin in super_admins:
-                EmailService._send_email(
-                    user=super_admin,
-                    email_type='new_course_pending_approval',
-                    subject=subject,
-                    html_message=AdminEmailService._render_template('emails/platform_admin/new_course_pending.html', context),
-                    plain_message=f"New course '{course.title}' by {instructor.full_name} requires approval before it can be published."
-                )
+            AdminEmailService._send_bulk_email(
+                recipients=super_admins,
+                email_type='new_course_pending_approval',
+                subject=subject,
+                template_path='emails/platform_admin/new_course_pending.html',
+                context=context,
+                plain_message=f"New course '{course.title}' by {instructor.full_name} requires approval before it can be published."
+            )
 
         except Exception as e:
             logger.error(f"Failed to notify super admins: {str(e)}")
@@ -1208,6 +1206,19 @@ class AdminEmailService:
         except Exception as e:
             logger.error(f"Failed to send payout notification: {str(e)}")
 
+    @staticmethod
+    def _send_bulk_email(recipients, email_type, subject, template_path, context, plain_message):
+        """Render a template once and enqueue it for every user in recipients"""
+        return dispatch_bulk_email(
+            recipients=recipients,
+            email_type=email_type,
+            subject=subject,
+            template_path=template_path,
+            context=context,
+            plain_message=plain_message,
+            render=AdminEmailService._render_template
+        )
+
     @staticmethod
     def _render_template(template_path, context):
         """Helper method to render email templates"""
@@ -0,0 +1,447 @@
+# utils/media_probe.py
+"""
+Container metadata probe.
+
+probe_media() reads duration, resolution and codecs from the headers of an
+MP4/MOV file (moov > mvhd, trak > tkhd/hdlr/stsd boxes) or a WebM/Matroska
+file (EBML Info and Tracks elements) without decoding frames or downloading
+the media data.
+
+Remote files are read with small HTTP Range requests. Top-level boxes are
+walked by their headers, so a moov box at the end of the file costs one
+extra read instead of a download of the whole mdat. The moov box itself is
+streamed into a SpooledTemporaryFile that only spills to disk past
+SPOOL_MAX_MEMORY.
+"""
+from django.conf import settings
+from tempfile import SpooledTemporaryFile
+import logging
+import os
+import re
+import requests
+import struct
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MEDIA_PROBE_SETTINGS = {
+    'TIMEOUT': 10,
+    # Bytes fetched per small read; covers ftyp and most WebM headers in one request
+    'BLOCK_SIZE': 64 * 1024,
+    'SPOOL_MAX_MEMORY': 8 * 1024 * 1024,
+    # Largest moov box or Matroska header element read
+    'MAX_METADATA_SIZE': 64 * 1024 * 1024,
+}
+
+
+def get_media_probe_settings():
+    return {**DEFAULT_MEDIA_PROBE_SETTINGS, **getattr(settings, 'MEDIA_PROBE', {})}
+
+
+class MediaProbeError(Exception):
+    """The file could not be read or is not a supported container"""
+
+
+class _FileSource:
+    """Random access to a local file"""
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        self.size = os.path.getsize(path)
+        self.requests = 0
+
+    def read_at(self, offset, size):
+        self._file.seek(offset)
+        return self._file.read(size)
+
+    def spool(self, offset, size):
+        pass
+
+    def close(self):
+        self._file.close()
+
+
+class _RangeSource:
+    """Random access to a remote file with HTTP Range requests"""
+
+    def __init__(self, url, session=None, **options):
+        self.url = url
+        self.session = session or requests
+        self.timeout = options['TIMEOUT']
+        self.block_size = options['BLOCK_SIZE']
+        self.spool_max_memory = options['SPOOL_MAX_MEMORY']
+        self.size = None
+        self.requests = 0
+        self._windows = []  # (start, bytes) of recent small reads
+        self._spooled = None  # (start, end, SpooledTemporaryFile)
+
+    def _stream(self, start, end):
+        """Yield the bytes of [start, end) from one request"""
+        self.requests += 1
+        response = self.session.get(
+            self.url,
+            headers={'Range': f'bytes={start}-{end - 1}'},
+            stream=True,
+            timeout=self.timeout
+        )
+        try:
+            if response.status_code == 416:
+                return
+            if response.status_code == 206:
+                match = re.search(r'/(\d+)$', response.headers.get('Content-Range', ''))
+                if match:
+                    self.size = int(match.group(1))
+                skip = 0
+            elif response.status_code == 200:
+                # Range ignored: only usable while the bytes needed are near the start
+                if self.size is None and response.headers.get('Content-Length'):
+                    self.size = int(response.headers['Content-Length'])
+                if start > self.block_size:
+                    raise MediaProbeError('Server does not support range requests')
+                skip = start
+            else:
+                raise MediaProbeError(f'Unexpected status {response.status_code} reading {self.url}')
+
+            remaining = end - start
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                if skip:
+                    dropped = min(skip, len(chunk))
+                    chunk, skip = chunk[dropped:], skip - dropped
+                if not chunk:
+                    continue
+                yield chunk[:remaining]
+                remaining -= len(chunk)
+                if remaining <= 0:
+                    break
+        finally:
+            response.close()
+
+    def read_at(self, offset, size):
+        if self._spooled and self._spooled[0] <= offset and offset + size <= self._spooled[1]:
+            spool = self._spooled[2]
+            spool.seek(offset - self._spooled[0])
+            return spool.read(size)
+
+        for start, data in self._windows:
+            if start <= offset and offset + size <= start + len(data):
+                return data[offset - start:offset - start + size]
+
+        data = b''.join(self._stream(offset, offset + max(size, self.block_size)))
+        self._windows = (self._windows + [(offset, data)])[-4:]
+        return data[:size]
+
+    def spool(self, offset, size):
+        """Download [offset, offset + size) in one streamed request for the reads that follow"""
+        self.close()
+        spool = SpooledTemporaryFile(max_size=self.spool_max_memory)
+        for chunk in self._stream(offset, offset + size):
+            spool.write(chunk)
+        self._spooled = (offset, offset + spool.tell(), spool)
+
+    def close(self):
+        if self._spooled:
+            self._spooled[2].close()
+            self._spooled = None
+
+
+# MP4 / QuickTime
+
+MP4_TOP_LEVEL_TYPES = {b'ftyp', b'moov', b'mdat', b'free', b'skip', b'wide', b'pnot', b'uuid'}
+
+
+def _iter_boxes(source, start, end):
+    """(type, offset, header size, box size) of the boxes in [start, end)"""
+    offset = start
+    while offset + 8 <= end:
+        header = source.read_at(offset, 16)
+        if len(header) < 8:
+            return
+        size, box_type = struct.unpack('>I4s', header[:8])
+        header_size = 8
+        if size == 1:
+            if len(header) < 16:
+                return
+            size = struct.unpack('>Q', header[8:16])[0]
+            header_size = 16
+        elif size == 0:
+            # Box extends to the end of its parent
+            size = end - offset
+        if size < header_size:
+            raise MediaProbeError(f'Corrupt {box_type!r} box at offset {offset}')
+        yield box_type, offset, header_size, size
+        offset += size
+
+
+def _child(source, start, end, box_type):
+    for child_type, offset, header_size, size in _iter_boxes(source, start, end):
+        if child_type == box_type:
+            return offset + header_size, offset + size
+    return None
+
+
+def _parse_trak(source, start, end):
+    track = {'handler': None, 'codec': None, 'width': None, 'height': None}
+
+    tkhd = _child(source, start, end, b'tkhd')
+    if tkhd:
+        body = source.read_at(tkhd[0], tkhd[1] - tkhd[0])
+        if len(body) >= 8:
+            # 16.16 fixed point display size closes the box
+            width, height = struct.unpack('>II', body[-8:])
+            track['width'], track['height'] = width >> 16, height >> 16
+
+    mdia = _child(source, start, end, b'mdia')
+    if not mdia:
+        return track
+
+    hdlr = _child(source, *mdia, b'hdlr')
+    if hdlr:
+        track['handler'] = source.read_at(hdlr[0] + 8, 4).decode('latin-1')
+
+    minf = _child(source, *mdia, b'minf')
+    stbl = minf and _child(source, *minf, b'stbl')
+    stsd = stbl and _child(source, *stbl, b'stsd')
+    if stsd:
+        entry = source.read_at(stsd[0], 44)
+        if len(entry) >= 16:
+            track['codec'] = entry[12:16].decode('latin-1').strip()
+        if track['handler'] == 'vide' and not track['width'] and len(entry) >= 44:
+            track['width'], track['height'] = struct.unpack('>HH', entry[40:44])
+    return track
+
+
+def _parse_moov(source, start, end, info):
+    for box_type, offset, header_size, size in _iter_boxes(source, start, end):
+        body = offset + header_size
+        if box_type == b'mvhd':
+            data = source.read_at(body, 32)
+            if data[0] == 1:
+                timescale, duration = struct.unpack('>IQ', data[20:32])
+            else:
+                timescale, duration = struct.unpack('>II', data[12:20])
+            if timescale:
+                info['duration'] = duration / timescale
+        elif box_type == b'trak':
+            track = _parse_trak(source, body, offset + size)
+            if track['handler'] == 'vide' and not info['video_codec']:
+                info['video_codec'] = track['codec']
+                info['width'], info['height'] = track['width'], track['height']
+            elif track['handler'] == 'soun' and not info['audio_codec']:
+                info['audio_codec'] = track['codec']
+
+
+def _probe_mp4(source, options):
+    info = _empty_info('mp4')
+    # Without a known size the walk stops at the first short read
+    end = source.size if source.size is not None else float('inf')
+    for box_type, offset, header_size, size in _iter_boxes(source, 0, end):
+        if box_type == b'moov':
+            if size > options['MAX_METADATA_SIZE']:
+                raise MediaProbeError(f'moov box of {size} bytes is too large to probe')
+            source.spool(offset, size)
+            _parse_moov(source, offset + header_size, offset + size, info)
+            return info
+    raise MediaProbeError('No moov box found')
+
+
+# WebM / Matroska
+
+EBML_ID = 0x1A45DFA3
+SEGMENT_ID = 0x18538067
+SEEK_HEAD_ID = 0x114D9B74
+SEEK_ID = 0x4DBB
+SEEK_ELEMENT_ID = 0x53AB
+SEEK_POSITION_ID = 0x53AC
+INFO_ID = 0x1549A966
+TIMECODE_SCALE_ID = 0x2AD7B1
+DURATION_ID = 0x4489
+TRACKS_ID = 0x1654AE6B
+TRACK_ENTRY_ID = 0xAE
+TRACK_TYPE_ID = 0x83
+CODEC_ID = 0x86
+VIDEO_ID = 0xE0
+PIXEL_WIDTH_ID = 0xB0
+PIXEL_HEIGHT_ID = 0xBA
+CLUSTER_ID = 0x1F43B675
+
+MATROSKA_VIDEO_TRACK = 1
+MATROSKA_AUDIO_TRACK = 2
+
+
+def _read_vint(data, pos, keep_marker=False):
+    """(value, length, unknown size) of the variable length integer at pos"""
+    if pos >= len(data):
+        raise MediaProbeError('Truncated EBML element')
+    first = data[pos]
+    length, mask = 1, 0x80
+    while length <= 8 and not first & mask:
+        length += 1
+        mask >>= 1
+    if length > 8 or pos + length > len(data):
+        raise MediaProbeError('Invalid EBML variable length integer')
+    value = first if keep_marker else first & (mask - 1)
+    for byte in data[pos + 1:pos + length]:
+        value = (value << 8) | byte
+    unknown = not keep_marker and value == (1 << (7 * length)) - 1
+    return value, length, unknown
+
+
+def _element_header(data, pos):
+    element_id, id_length, _ = _read_vint(data, pos, keep_marker=True)
+    size, size_length, unknown = _read_vint(data, pos + id_length)
+    return element_id, id_length + size_length, None if unknown else size
+
+
+def _iter_elements(data):
+    """(id, body) of the elements in an in-memory EBML body"""
+    pos = 0
+    while pos < len(data):
+        element_id, header_size, size = _element_header(data, pos)
+        if size is None:
+            size = len(data) - pos - header_size
+        body = data[pos + header_size:pos + header_size + size]
+        yield element_id, body
+        pos += header_size + size
+
+
+def _uint(body):
+    return int.from_bytes(body, 'big') if body else 0
+
+
+def _float(body):
+    if len(body) == 4:
+        return struct.unpack('>f', body)[0]
+    if len(body) == 8:
+        return struct.unpack('>d', body)[0]
+    return None
+
+
+def _parse_matroska_info(body, info):
+    timecode_scale = 1000000
+    duration = None
+    for element_id, value in _iter_elements(body):
+        if element_id == TIMECODE_SCALE_ID:
+            timecode_scale = _uint(value)
+        elif element_id == DURATION_ID:
+            duration = _float(value)
+    if duration is not None:
+        info['duration'] = duration * timecode_scale / 1e9
+
+
+def _parse_matroska_tracks(body, info):
+    for element_id, entry in _iter_elements(body):
+        if element_id != TRACK_ENTRY_ID:
+            continue
+        track_type, codec, width, height = None, None, None, None
+        for child_id, value in _iter_elements(entry):
+            if child_id == TRACK_TYPE_ID:
+                track_type = _uint(value)
+            elif child_id == CODEC_ID:
+                codec = value.rstrip(b'\x00').decode('ascii', 'replace')
+            elif child_id == VIDEO_ID:
+                for video_id, video_value in _iter_elements(value):
+                    if video_id == PIXEL_WIDTH_ID:
+                        width = _uint(video_value)
+                    elif video_id == PIXEL_HEIGHT_ID:
+                        height = _uint(video_value)
+        if track_type == MATROSKA_VIDEO_TRACK and not info['video_codec']:
+            info['video_codec'], info['width'], info['height'] = codec, width, height
+        elif track_type == MATROSKA_AUDIO_TRACK and not info['audio_codec']:
+            info['audio_codec'] = codec
+
+
+def _read_element(source, offset):
+    header = source.read_at(offset, 12)
+    element_id, header_size, size = _element_header(header, 0)
+    return element_id, header_size, size
+
+
+def _probe_matroska(source, options):
+    info = _empty_info('webm')
+
+    # EBML header, then the Segment
+    _, header_size, size = _read_element(source, 0)
+    segment_offset = header_size + size
+    element_id, header_size, segment_size = _read_element(source, segment_offset)
+    if element_id != SEGMENT_ID:
+        raise MediaProbeError('No Matroska segment found')
+    segment_start = segment_offset + header_size
+    segment_end = segment_start + segment_size if segment_size is not None else source.size
+
+    parsers = {INFO_ID: _parse_matroska_info, TRACKS_ID: _parse_matroska_tracks}
+    pending = set(parsers)
+    seek_positions = {}
+
+    offset = segment_start
+    while pending and offset < segment_end:
+        element_id, header_size, size = _read_element(source, offset)
+        if element_id == CLUSTER_ID or size is None:
+            # Media data: anything still missing is located through the SeekHead
+            break
+        if element_id in parsers or element_id == SEEK_HEAD_ID:
+            if size > options['MAX_METADATA_SIZE']:
+                raise MediaProbeError(f'Matroska element of {size} bytes is too large to probe')
+            body = source.read_at(offset + header_size, size)
+            if element_id == SEEK_HEAD_ID:
+                for seek_id, seek in _iter_elements(body):
+                    if seek_id != SEEK_ID:
+                        continue
+                    fields = dict(_iter_elements(seek))
+                    target = _read_vint(fields.get(SEEK_ELEMENT_ID, b'\x80'), 0, keep_marker=True)[0]
+                    seek_positions[target] = segment_start + _uint(fields.get(SEEK_POSITION_ID, b''))
+            else:
+                parsers[element_id](body, info)
+                pending.discard(element_id)
+        offset += header_size + size
+
+    for element_id in list(pending):
+        if element_id in seek_positions:
+            found_id, header_size, size = _read_element(source, seek_positions[element_id])
+            if found_id == element_id and size is not None and size <= options['MAX_METADATA_SIZE']:
+                parsers[element_id](source.read_at(seek_positions[element_id] + header_size, size), info)
+
+    return info
+
+
+def _empty_info(container):
+    return {
+        'container': container,
+        'duration': None,
+        'width': None,
+        'height': None,
+        'video_codec': None,
+        'audio_codec': None,
+    }
+
+
+def _probe(source, options):
+    head = source.read_at(0, 16)
+    if len(head) >= 4 and struct.unpack('>I', head[:4])[0] == EBML_ID:
+        return _probe_matroska(source, options)
+    if len(head) >= 8 and head[4:8] in MP4_TOP_LEVEL_TYPES:
+        return _probe_mp4(source, options)
+    raise MediaProbeError('Unsupported container')
+
+
+def probe_media(url_or_path, session=None):
+    """
+    Duration (seconds, float), width, height, video and audio codec of an
+    MP4/MOV or WebM/Matroska file given by URL or local path. Values the
+    container does not declare are None. Raises MediaProbeError.
+    """
+    options = get_media_probe_settings()
+    if url_or_path.startswith(('http://', 'https://')):
+        source = _RangeSource(url_or_path, session=session, **options)
+    else:
+        source = _FileSource(url_or_path)
+
+    try:
+        info = _probe(source, options)
+    except (struct.error, UnicodeDecodeError, IndexError) as e:
+        raise MediaProbeError(f'Corrupt container: {str(e)}')
+    except requests.RequestException as e:
+        raise MediaProbeError(f'Failed to read {url_or_path}: {str(e)}')
+    finally:
+        source.close()
+
+    logger.debug(f"Probed {url_or_path} in {source.requests} requests: {info}")
+    return info
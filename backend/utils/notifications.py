@@ -0,0 +1,139 @@
+# utils/notifications.py
+"""
+Bulk email notifications.
+
+dispatch_bulk_email() renders a template once for all recipients, with
+recipient fields left as merge tokens, and enqueues a single Celery job.
+send_bulk_email() runs in the worker: it fills in the tokens, sends the
+messages in chunks over one SMTP connection and records every delivery
+with a single EmailLog bulk_create.
+"""
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils.html import escape
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Recipient fields available to templates as {{ user.<field> }}
+RECIPIENT_FIELDS = ('full_name', 'first_name', 'email')
+RECIPIENT_TOKEN = '[[recipient:{field}]]'
+
+DEFAULT_BULK_EMAIL_SETTINGS = {
+    'CHUNK_SIZE': 100,
+}
+
+
+def get_bulk_email_settings():
+    return {**DEFAULT_BULK_EMAIL_SETTINGS, **getattr(settings, 'BULK_EMAIL', {})}
+
+
+def recipient_placeholder():
+    """Stand-in for the per-recipient `user` in a template context"""
+    return {field: RECIPIENT_TOKEN.format(field=field) for field in RECIPIENT_FIELDS}
+
+
+def personalize(message, recipient, html=False):
+    """
+    Replace the merge tokens of a rendered message with a recipient's values,
+    HTML-escaped when html is set
+    """
+    for field in RECIPIENT_FIELDS:
+        value = recipient.get(field) or ''
+        message = message.replace(RECIPIENT_TOKEN.format(field=field), escape(value) if html else value)
+    return message
+
+
+def dispatch_bulk_email(recipients, email_type, subject, template_path, context, plain_message, render=None):
+    """
+    Render template_path once and enqueue its delivery to every user in
+    recipients (a User queryset). The job is enqueued after the current
+    transaction commits, so callers inside transaction.atomic() only pay
+    for the enqueue. render defaults to render_to_string.
+    Returns the number of recipients.
+    """
+    from users.tasks import send_bulk_email_task
+
+    render = render or render_to_string
+
+    recipient_rows = [
+        {
+            'id': str(user_id),
+            'email': email,
+            'full_name': full_name,
+            'first_name': full_name.split()[0] if full_name else '',
+        }
+        for user_id, email, full_name in recipients.values_list('id', 'email', 'full_name')
+    ]
+    if not recipient_rows:
+        return 0
+
+    html_message = render(template_path, {**context, 'user': recipient_placeholder()})
+
+    transaction.on_commit(lambda: send_bulk_email_task.delay(
+        email_type=email_type,
+        subject=subject,
+        html_message=html_message,
+        plain_message=plain_message,
+        recipients=recipient_rows,
+    ))
+    return len(recipient_rows)
+
+
+def send_bulk_email(email_type, subject, html_message, plain_message, recipients, chunk_size=None):
+    """
+    Send a rendered message to recipients in chunks over a single SMTP
+    connection and log every delivery. Returns the number of messages sent.
+    """
+    from users.models import EmailLog
+
+    chunk_size = chunk_size or get_bulk_email_settings()['CHUNK_SIZE']
+    logs = []
+    sent = 0
+
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+        for start in range(0, len(recipients), chunk_size):
+            chunk = recipients[start:start + chunk_size]
+            messages = []
+            for recipient in chunk:
+                message = EmailMultiAlternatives(
+                    subject=subject,
+                    body=personalize(plain_message, recipient),
+                    from_email=settings.DEFAULT_FROM_EMAIL,
+                    to=[recipient['email']],
+                    connection=connection,
+                )
+                message.attach_alternative(personalize(html_message, recipient, html=True), 'text/html')
+                messages.append(message)
+
+            error_message = None
+            try:
+                connection.send_messages(messages)
+                sent += len(messages)
+            except Exception as e:
+                error_message = str(e)
+                logger.error(f"Bulk email chunk failed ({email_type}): {error_message}")
+                # The connection may be unusable after an SMTP error
+                connection.close()
+                connection.open()
+
+            logs.extend(
+                EmailLog(
+                    user_id=recipient['id'],
+                    email_type=email_type,
+                    recipient_email=recipient['email'],
+                    subject=subject,
+                    success=error_message is None,
+                    error_message=error_message,
+                )
+                for recipient in chunk
+            )
+    finally:
+        connection.close()
+        EmailLog.objects.bulk_create(logs)
+
+    return sent
@@ -7,10 +7,15 @@ from cloudinary.uploader import upload
 from cloudinary.utils import cloudinary_url as build_cloudinary_url
 from cloudinary import api
 import cv2
+import hashlib
 import tempfile
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
 from moviepy import VideoFileClip
+from .media_probe import MediaProbeError, probe_media
 
 # Graceful imports for optional dependencies
 try:
@@ -22,6 +27,12 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_VIDEO_METADATA_SETTINGS = {
+    'MAX_WORKERS': 4,
+    'CACHE_TIMEOUT': 60 * 60 * 24 * 7,
+}
+VIDEO_METADATA_KEY = 'video_metadata_{digest}'
+
 def extract_video_duration(video_url_or_path):
     """
     Extract video duration from URL or file path
@@ -162,149 +173,23 @@ def extract_vimeo_duration(vimeo_url):
 
 
 def extract_cloudinary_duration(cloudinary_url):
-    """Extract duration from Cloudinary video using direct analysis"""
-    try:
-        logger.info(f"Analyzing Cloudinary video directly: {cloudinary_url}")
-        
-        # Try with moviepy first if available
-        if MOVIEPY_AVAILABLE:
-            try:
-                import tempfile
-                import requests
-                
-                # Download first 10MB for analysis
-                response = requests.get(cloudinary_url, stream=True, timeout=30)
-                response.raise_for_status()
-                
-                with tempfile.NamedTemporaryFile(suffix='.mp4', delete=False) as temp_file:
-                    temp_path = temp_file.name
-                    downloaded = 0
-                    for chunk in response.iter_content(chunk_size=8192):
-                        if downloaded >= 10 * 1024 * 1024:  # 10MB limit
-                            break
-                        temp_file.write(chunk)
-                        downloaded += len(chunk)
-                    
-                    temp_file.flush()
-                
-                # Analyze with moviepy
-                try:
-                    with VideoFileClip(temp_path) as video:
-                        duration = video.duration
-                        logger.info(f"MoviePy extracted duration: {duration} seconds")
-                        
-                        # Return immediately - don't worry about cleanup on Windows
-                        if duration:
-                            return int(duration)
-                            
-                except Exception as video_error:
-                    logger.warning(f"VideoFileClip analysis failed: {str(video_error)}")
-                
-                # Try to cleanup, but don't fail if it doesn't work
-                try:
-                    os.unlink(temp_path)
-                except:
-                    pass  # Ignore cleanup failures on Windows
-                        
-            except Exception as moviepy_error:
-                logger.warning(f"MoviePy setup failed: {str(moviepy_error)}")
-        
-        # If MoviePy didn't work, try CV2 (same pattern)
-        try:
-            import cv2
-            import tempfile
-            import requests
-            
-            response = requests.get(cloudinary_url, stream=True, timeout=30)
-            response.raise_for_status()
-            
-            with tempfile.NamedTemporaryFile(suffix='.mp4', delete=False) as temp_file:
-                temp_path = temp_file.name
-                downloaded = 0
-                for chunk in response.iter_content(chunk_size=8192):
-                    if downloaded >= 5 * 1024 * 1024:  # 5MB limit
-                        break
-                    temp_file.write(chunk)
-                    downloaded += len(chunk)
-                
-                temp_file.flush()
-            
-            cap = cv2.VideoCapture(temp_path)
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            frame_count = cap.get(cv2.CAP_PROP_FRAME_COUNT)
-            cap.release()
-            
-            # Try cleanup but ignore errors
-            try:
-                os.unlink(temp_path)
-            except:
-                pass
-            
-            if fps > 0 and frame_count > 0:
-                duration = int(frame_count / fps)
-                logger.info(f"CV2 extracted duration: {duration} seconds")
-                return duration
-                
-        except Exception as cv2_error:
-            logger.warning(f"CV2 analysis failed: {str(cv2_error)}")
-        
-        return None
-        
-    except Exception as e:
-        logger.error(f"Cloudinary duration extraction failed: {str(e)}")
-        return None
+    """Extract duration from Cloudinary video by reading its container headers"""
+    logger.info(f"Probing Cloudinary video: {cloudinary_url}")
+    return extract_direct_video_duration(cloudinary_url)
 
 
 def extract_direct_video_duration(video_url):
-    """Extract duration from direct video URL by downloading headers"""
+    """
+    Extract duration from direct video URL with HTTP Range reads of the
+    container headers (see utils.media_probe)
+    """
     try:
-        # Try to get content info without downloading full video
-        response = requests.head(video_url, timeout=10, allow_redirects=True)
-        
-        if response.status_code == 200:
-            # Check if server supports range requests
-            if 'Accept-Ranges' in response.headers and 'bytes' in response.headers['Accept-Ranges']:
-                # Download first few MB to analyze with ffmpeg/moviepy
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as temp_file:
-                    # Download first 5MB
-                    headers = {'Range': 'bytes=0-5242880'}  # 5MB
-                    partial_response = requests.get(video_url, headers=headers, timeout=30)
-                    
-                    if partial_response.status_code == 206:  # Partial content
-                        temp_file.write(partial_response.content)
-                        temp_file.flush()
-                        
-                        try:
-                            # Try with moviepy first if available
-                            if MOVIEPY_AVAILABLE:
-                                with VideoFileClip(temp_file.name) as video:
-                                    duration = video.duration
-                                
-                                os.unlink(temp_file.name)
-                                return int(duration) if duration else None
-                        
-                        except Exception:
-                            pass
-                        
-                        # Fallback to cv2
-                        try:
-                            cap = cv2.VideoCapture(temp_file.name)
-                            fps = cap.get(cv2.CAP_PROP_FPS)
-                            frame_count = cap.get(cv2.CAP_PROP_FRAME_COUNT)
-                            cap.release()
-                            
-                            os.unlink(temp_file.name)
-                            
-                            if fps > 0 and frame_count > 0:
-                                return int(frame_count / fps)
-                        
-                        except Exception:
-                            pass
-                        
-                        os.unlink(temp_file.name)
-        
-        return None
+        duration = probe_media(video_url)['duration']
+        return int(duration) if duration else None
     
+    except MediaProbeError as e:
+        logger.warning(f"Could not probe video {video_url}: {str(e)}")
+        return None
     except Exception as e:
         logger.error(f"Error extracting direct video duration: {str(e)}")
         return None
@@ -313,7 +198,15 @@ def extract_direct_video_duration(video_url):
 def extract_local_video_duration(file_path):
     """Extract duration from local video file"""
     try:
-        # Try with moviepy first if available
+        # Container headers first; decoders only for formats the probe does not read
+        try:
+            duration = probe_media(file_path)['duration']
+            if duration:
+                return int(duration)
+        except MediaProbeError:
+            pass
+        
+        # Try with moviepy if available
         if MOVIEPY_AVAILABLE:
             try:
                 with VideoFileClip(file_path) as video:
@@ -556,10 +449,17 @@ def generate_direct_video_thumbnail(video_url, lesson_id=None):
         with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as temp_video:
             # Download first 10MB of video
             headers = {'Range': 'bytes=0-10485760'}  # 10MB
-            response = requests.get(video_url, headers=headers, timeout=30)
+            response = requests.get(video_url, headers=headers, stream=True, timeout=30)
             
             if response.status_code in [200, 206]:
-                temp_video.write(response.content)
+                # Stream to disk instead of holding the whole range in memory
+                downloaded = 0
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    temp_video.write(chunk)
+                    downloaded += len(chunk)
+                    if downloaded > 10 * 1024 * 1024:
+                        break
+                response.close()
                 temp_video.flush()
                 
                 # Generate thumbnail at 10% of video
@@ -803,56 +703,136 @@ def cleanup_old_thumbnails(public_ids):
         logger.error(f"Error cleaning up thumbnails: {str(e)}")
 
 
-def batch_process_video_metadata(lesson_ids):
-    """Batch process video metadata for multiple lessons"""
-    from courses.models import CourseLesson
+def get_video_metadata_settings():
+    return {**DEFAULT_VIDEO_METADATA_SETTINGS, **getattr(settings, 'VIDEO_METADATA', {})}
+
+
+def _video_validator(video_url):
+    """
+    ETag or Last-Modified of a direct or Cloudinary video file, read with one
+    HEAD request, so a file replaced under the same URL gets a new cache
+    entry. Empty for platform pages and when the server sends neither header.
+    """
+    if get_video_platform(video_url) not in ('direct', 'cloudinary') or not video_url.startswith(('http://', 'https://')):
+        return ''
+    try:
+        response = requests.head(video_url, allow_redirects=True, timeout=10)
+    except requests.RequestException:
+        return ''
+    return response.headers.get('ETag') or response.headers.get('Last-Modified') or ''
+
+
+def _metadata_cache_key(video_url, validator=''):
+    digest = hashlib.sha1(f'{video_url}|{validator}'.encode()).hexdigest()
+    return VIDEO_METADATA_KEY.format(digest=digest)
+
+
+def process_video_metadata(video_url, lesson_id=None, needs_thumbnail=True, cache_timeout=None):
+    """
+    Duration and thumbnail of one video, cached by URL and the file's ETag or
+    Last-Modified. Only values that were found are cached, so a failed probe
+    is retried on the next run.
+    """
+    key = _metadata_cache_key(video_url, _video_validator(video_url))
+    metadata = cache.get(key) or {}
+
+    if not metadata.get('duration'):
+        metadata['duration'] = extract_video_duration(video_url)
+    if needs_thumbnail and not metadata.get('thumbnail_url'):
+        metadata['thumbnail_url'] = generate_video_thumbnail(video_url, lesson_id)
+
+    found = {name: value for name, value in metadata.items() if value}
+    if found:
+        if cache_timeout is None:
+            cache_timeout = get_video_metadata_settings()['CACHE_TIMEOUT']
+        cache.set(key, found, cache_timeout)
+    return metadata
+
+
+def batch_process_video_metadata(lesson_ids, on_progress=None):
+    """
+    Batch process video metadata for multiple lessons
+
+    Videos are probed concurrently in a bounded thread pool (the work is
+    network bound; OpenCV releases the GIL while decoding thumbnail frames)
+    and all lesson updates are written with one bulk_update. on_progress is
+    called with (processed, total) as lessons finish.
+    """
+    from courses.models import CourseLesson, CourseSection
     
     try:
-        lessons = CourseLesson.objects.filter(
+        lessons = list(CourseLesson.objects.filter(
             id__in=lesson_ids,
             lesson_type='video',
             duration_seconds__isnull=True
-        )
+        ))
+        options = get_video_metadata_settings()
         
-        results = []
+        # Resolve URLs up front: worker threads never touch the database
+        jobs = {lesson: lesson.get_video_url() for lesson in lessons}
+        jobs = {lesson: video_url for lesson, video_url in jobs.items() if video_url}
+        total = len(jobs)
         
-        for lesson in lessons:
-            try:
-                video_url = lesson.get_video_url()
-                if video_url:
-                    # Extract duration
-                    duration = extract_video_duration(video_url)
+        results = []
+        updated_lessons = []
+        update_fields = set()
+        if not jobs:
+            return results
+        
+        with ThreadPoolExecutor(max_workers=min(options['MAX_WORKERS'], total)) as executor:
+            futures = {
+                executor.submit(
+                    process_video_metadata, video_url, str(lesson.id), not lesson.thumbnail, options['CACHE_TIMEOUT']
+                ): lesson
+                for lesson, video_url in jobs.items()
+            }
+            
+            for processed, future in enumerate(as_completed(futures), start=1):
+                lesson = futures[future]
+                try:
+                    metadata = future.result()
+                except Exception as e:
+                    logger.error(f"Error processing lesson {lesson.id}: {str(e)}")
+                    results.append({
+                        'lesson_id': str(lesson.id),
+                        'lesson_title': lesson.title,
+                        'error': str(e)
+                    })
+                else:
+                    duration = metadata['duration']
+                    thumbnail_url = metadata.get('thumbnail_url') if not lesson.thumbnail else None
                     if duration:
                         lesson.duration_seconds = duration
-                        lesson.save(update_fields=['duration_seconds'])
-                    
-                    # Generate thumbnail if missing
-                    if not lesson.thumbnail:
-                        thumbnail_url = generate_video_thumbnail(video_url, str(lesson.id))
-                        if thumbnail_url:
-                            lesson.thumbnail = thumbnail_url
-                            lesson.save(update_fields=['thumbnail'])
+                        update_fields.add('duration_seconds')
+                    if thumbnail_url:
+                        lesson.thumbnail = thumbnail_url
+                        update_fields.add('thumbnail')
+                    if duration or thumbnail_url:
+                        updated_lessons.append(lesson)
                     
                     results.append({
                         'lesson_id': str(lesson.id),
                         'lesson_title': lesson.title,
                         'duration_extracted': duration is not None,
                         'duration_seconds': duration,
-                        'thumbnail_generated': thumbnail_url is not None if 'thumbnail_url' in locals() else False
+                        'thumbnail_generated': thumbnail_url is not None
                     })
-                    
                     logger.info(f"Processed video metadata for lesson: {lesson.title}")
-            
-            except Exception as e:
-                logger.error(f"Error processing lesson {lesson.id}: {str(e)}")
-                results.append({
-                    'lesson_id': str(lesson.id),
-                    'lesson_title': lesson.title,
-                    'error': str(e)
-                })
+                
+                if on_progress:
+                    on_progress(processed, total)
+        
+        if updated_lessons:
+            with transaction.atomic():
+                CourseLesson.objects.bulk_update(updated_lessons, sorted(update_fields))
+                # bulk_update skips CourseLesson.save(), so refresh the totals once per section
+                for section in CourseSection.objects.filter(
+                    id__in={lesson.section_id for lesson in updated_lessons}
+                ).select_related('course'):
+                    section.update_section_totals()
         
         return results
     
     except Exception as e:
         logger.error(f"Error in batch processing: {str(e)}")
-        return []
\ No newline at end of file
+        return []